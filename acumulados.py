@@ -0,0 +1,131 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Ventana de meses (inclusive) expresada como ordinales year * 12 + (mes - 1)
+Window = Tuple[int, int]
+
+
+def period_ordinal(year, month):
+    """Ordinal entero del mes: permite comparar y ordenar periodos sin strings. Acepta escalares o arrays."""
+    return year * 12 + (month - 1)
+
+
+def cumulative_variation(
+    df: pd.DataFrame,
+    windows: Optional[Dict[str, Window]] = None,
+    by: str = "producto",
+):
+    """Variación acumulada (%) por producto: (prod(1 + v/100) - 1) * 100.
+
+    Sin windows retorna una Series indexada por producto sobre todas las filas de df.
+    Con windows ({nombre: (ordinal_inicio, ordinal_fin)}) retorna un DataFrame con una
+    columna por ventana; un producto sin filas en una ventana queda NaN.
+    Los productos conservan el orden de primera aparición en df.
+    """
+    if df.empty:
+        if windows is None: return pd.Series(dtype=float)
+        return pd.DataFrame(columns=list(windows), dtype=float)
+
+    factors = 1.0 + df["variacion"].to_numpy(dtype=float) / 100.0
+    if windows is None:
+        grouped = pd.Series(factors, index=df.index).groupby(df[by], sort=False, observed=True)
+        return (grouped.prod() - 1.0) * 100.0
+
+    index = CumulativeIndex(df, by=by)
+    names = list(windows)
+    values = index.window_matrix([windows[n][0] for n in names], [windows[n][1] for n in names])
+    return pd.DataFrame(values, index=index.products, columns=names)
+
+
+class CumulativeIndex:
+    """Índice de prefijos sobre una matriz densa productos x meses.
+
+    Se construye una vez por dataset. Guarda, por producto, sumas acumuladas de
+    log|1 + v/100| a lo largo de los meses (más contadores de factores negativos,
+    nulos y de meses con dato), de modo que la variación acumulada de cualquier
+    producto sobre cualquier ventana [inicio, fin] es una resta de prefijos: O(1)
+    por producto, vectorizada sobre todos los productos.
+    """
+
+    def __init__(self, df: pd.DataFrame, by: str = "producto"):
+        codes, products = pd.factorize(df[by], sort=False)  # orden de primera aparición
+        self.products = pd.Index(products, name=by)
+        n_products = len(products)
+        if df.empty:
+            self.first_ordinal, n_months = 0, 0
+        else:
+            ordinals = period_ordinal(df["year"].to_numpy(dtype=np.int64), df["mes_num"].to_numpy(dtype=np.int64))
+            self.first_ordinal = int(ordinals.min())
+            n_months = int(ordinals.max()) - self.first_ordinal + 1
+        self.n_months = n_months
+
+        log_abs = np.zeros((n_products, n_months))
+        negatives = np.zeros((n_products, n_months), dtype=np.int32)
+        zeros = np.zeros((n_products, n_months), dtype=np.int32)
+        counts = np.zeros((n_products, n_months), dtype=np.int32)
+        if not df.empty:
+            factors = 1.0 + df["variacion"].to_numpy(dtype=float) / 100.0
+            cols = ordinals - self.first_ordinal
+            with np.errstate(divide="ignore"):
+                logs = np.log(np.abs(factors))
+            logs[factors == 0] = 0.0
+            # add.at acumula correctamente si un (producto, mes) aparece repetido
+            np.add.at(log_abs, (codes, cols), logs)
+            np.add.at(negatives, (codes, cols), factors < 0)
+            np.add.at(zeros, (codes, cols), factors == 0)
+            np.add.at(counts, (codes, cols), 1)
+
+        def prefix(matrix):
+            out = np.zeros((n_products, n_months + 1), dtype=matrix.dtype)
+            np.cumsum(matrix, axis=1, out=out[:, 1:])
+            return out
+
+        self._log = prefix(log_abs)
+        self._neg = prefix(negatives)
+        self._zero = prefix(zeros)
+        self._count = prefix(counts)
+
+    def _bounds(self, starts, ends):
+        lo = np.clip(np.asarray(starts, dtype=np.int64) - self.first_ordinal, 0, self.n_months)
+        hi = np.clip(np.asarray(ends, dtype=np.int64) - self.first_ordinal + 1, 0, self.n_months)
+        return lo, np.maximum(hi, lo)
+
+    def window_matrix(self, starts, ends) -> np.ndarray:
+        """Variación acumulada (%) de cada producto en cada ventana: matriz productos x ventanas (NaN sin datos)."""
+        lo, hi = self._bounds(starts, ends)
+        sums = self._log[:, hi] - self._log[:, lo]
+        negatives = self._neg[:, hi] - self._neg[:, lo]
+        zeros = self._zero[:, hi] - self._zero[:, lo]
+        counts = self._count[:, hi] - self._count[:, lo]
+        return self._to_variation(sums, negatives, zeros, counts)
+
+    def window(self, start: int, end: int) -> pd.Series:
+        """Variación acumulada (%) por producto entre dos ordinales de mes (inclusive)."""
+        return pd.Series(self.window_matrix([start], [end])[:, 0], index=self.products)
+
+    def over_months(self, ordinals) -> pd.Series:
+        """Variación acumulada (%) por producto sobre un conjunto arbitrario de meses.
+
+        El conjunto se descompone en tramos contiguos; cada tramo es una resta de
+        prefijos, así que el costo depende del número de tramos y no de las filas.
+        """
+        ordinals = np.unique(np.asarray(list(ordinals), dtype=np.int64))
+        if ordinals.size == 0:
+            return pd.Series(np.nan, index=self.products)
+        breaks = np.flatnonzero(np.diff(ordinals) != 1)
+        starts = ordinals[np.concatenate(([0], breaks + 1))]
+        ends = ordinals[np.concatenate((breaks, [ordinals.size - 1]))]
+        lo, hi = self._bounds(starts, ends)
+        sums = (self._log[:, hi] - self._log[:, lo]).sum(axis=1)
+        negatives = (self._neg[:, hi] - self._neg[:, lo]).sum(axis=1)
+        zeros = (self._zero[:, hi] - self._zero[:, lo]).sum(axis=1)
+        counts = (self._count[:, hi] - self._count[:, lo]).sum(axis=1)
+        return pd.Series(self._to_variation(sums, negatives, zeros, counts), index=self.products)
+
+    @staticmethod
+    def _to_variation(sums, negatives, zeros, counts):
+        sign = np.where(negatives % 2 == 1, -1.0, 1.0)
+        product = np.where(zeros > 0, 0.0, sign * np.exp(sums))
+        return np.where(counts > 0, (product - 1.0) * 100.0, np.nan)
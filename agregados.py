@@ -0,0 +1,84 @@
+"""Cubo de agregados por categoría y por canasta completa, precalculado por versión del dataset.
+
+Una fila por (categoría, mes) con el número de productos con dato y la
+variación mensual media, mediana, mínima y máxima de sus productos, más un
+índice encadenado (base 100 en el primer mes de la serie) sobre la variación
+media: índice_t = índice_{t-1} * (1 + media_t / 100). La categoría BASKET
+agrega todos los productos.
+
+Se arma una vez al cargar el dataset (CanastaDataset.rollup) y se publica
+junto a su instantánea (instantanea.py), así que los gráficos y KPIs por
+categoría de la app consultan unos pocos miles de filas en vez de agrupar el
+dataset completo en cada rerun.
+"""
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from configuracion import ACTIVE_PRODUCT_CATEGORIES, CATEGORY_OPTIONS
+from datos import PERIOD_COLUMN, PRODUCT_DTYPE
+from metricas import current_metrics
+
+# --- Configuración ---
+BASKET = "Canasta completa"
+CATEGORY_DTYPE = pd.CategoricalDtype(CATEGORY_OPTIONS + [BASKET])
+INDEX_BASE = 100.0
+ROLLUP_COLUMNS = ["categoria", "year", "mes_num", PERIOD_COLUMN, "productos", "media", "mediana", "minimo", "maximo", "indice"]
+
+# Código de categoría por código de producto (-1: producto sin categoría activa)
+_CATEGORY_OF_PRODUCT = np.full(len(PRODUCT_DTYPE.categories), -1, dtype=np.int8)
+for _category, _products in ACTIVE_PRODUCT_CATEGORIES.items():
+    _CATEGORY_OF_PRODUCT[PRODUCT_DTYPE.categories.get_indexer(_products)] = CATEGORY_DTYPE.categories.get_loc(_category)
+
+
+def build_rollup(frame: pd.DataFrame) -> pd.DataFrame:
+    """Cubo (categoría, mes) desde el frame compacto del dataset, ordenado por categoría y periodo."""
+    with current_metrics().timer("cubo", filas=len(frame)):
+        product_codes = frame["producto"].cat.codes.to_numpy()
+        categories = _CATEGORY_OF_PRODUCT[product_codes]
+        known = categories >= 0
+        ordinals = frame[PERIOD_COLUMN].to_numpy(dtype=np.int64)
+        values = frame["variacion"].to_numpy(dtype=np.float64)
+        # Cada fila cuenta en su categoría y en la canasta completa
+        long = pd.DataFrame({
+            "categoria": np.concatenate((categories[known], np.full(len(frame), CATEGORY_DTYPE.categories.get_loc(BASKET), dtype=np.int8))),
+            PERIOD_COLUMN: np.concatenate((ordinals[known], ordinals)),
+            "variacion": np.concatenate((values[known], values)),
+        })
+        stats = long.groupby(["categoria", PERIOD_COLUMN], sort=True)["variacion"].agg(["count", "mean", "median", "min", "max"])
+        index = (1.0 + stats["mean"] / 100.0).groupby(level="categoria").cumprod() * INDEX_BASE
+
+        category_codes = stats.index.get_level_values("categoria").to_numpy()
+        period = stats.index.get_level_values(PERIOD_COLUMN).to_numpy()
+        return pd.DataFrame({
+            "categoria": pd.Categorical.from_codes(category_codes, dtype=CATEGORY_DTYPE),
+            "year": (period // 12).astype(np.int16),
+            "mes_num": (period % 12 + 1).astype(np.int8),
+            PERIOD_COLUMN: period,
+            "productos": stats["count"].to_numpy(dtype=np.int16),
+            "media": stats["mean"].to_numpy(),
+            "mediana": stats["median"].to_numpy(),
+            "minimo": stats["min"].to_numpy(),
+            "maximo": stats["max"].to_numpy(),
+            "indice": index.to_numpy(),
+        }, columns=ROLLUP_COLUMNS)
+
+
+def rollup_months(rollup: pd.DataFrame, ordinals: Iterable[int], categories: Optional[List[str]] = None) -> pd.DataFrame:
+    """Filas del cubo de un conjunto de meses (ordinales) y, opcionalmente, de algunas categorías."""
+    mask = np.isin(rollup[PERIOD_COLUMN].to_numpy(), np.asarray(list(ordinals), dtype=np.int64))
+    if categories is not None:
+        mask &= rollup["categoria"].isin(categories).to_numpy()
+    return rollup[mask]
+
+
+def category_cumulative(rollup: pd.DataFrame) -> pd.Series:
+    """Variación acumulada (%) del índice de cada categoría sobre las filas dadas (p. ej. de rollup_months).
+
+    Encadena la variación media de cada mes presente, así que un conjunto de
+    meses no contiguos se acumula igual que en CumulativeIndex.over_months.
+    """
+    if rollup.empty: return pd.Series(dtype=float)
+    factors = pd.Series(1.0 + rollup["media"].to_numpy() / 100.0, index=rollup.index)
+    return (factors.groupby(rollup["categoria"], observed=True).prod() - 1.0) * 100.0
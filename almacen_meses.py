@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from acumulados import period_ordinal
+from datos import PERIOD_COLUMN, compact_frame, rows_to_frame
+from extraccion_pdf import PARSER_VERSION
+
+# --- Configuración ---
+CACHE_DIR = os.environ.get("CBA_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache"))
+STORE_FILENAME = "meses_parseados.parquet"
+_METADATA_KEY = b"canasta_meses"
+
+MonthKey = Tuple[int, int]
+
+
+def content_hash(pdf_bytes: bytes) -> str:
+    """Huella del PDF de origen; identifica la versión del informe que produjo las filas."""
+    return hashlib.sha256(pdf_bytes).hexdigest()[:16]
+
+
+class ParsedMonthStore:
+    """Filas ya parseadas por (año, mes), persistidas en un único archivo Parquet.
+
+    Los informes publicados no cambian, así que un mes presente en el almacén no
+    se vuelve a descargar ni parsear. El índice de meses (con el hash del PDF de
+    origen) viaja en los metadatos del mismo Parquet: consultarlo sólo lee el
+    esquema, y las filas se leen (una sola lectura columnar) la primera vez que
+    se piden o se agregan meses. Si cambia PARSER_VERSION el almacén se descarta.
+    Las filas se mantienen en el esquema compacto de datos.compact_frame.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(CACHE_DIR, STORE_FILENAME)
+        self._lock = threading.Lock()
+        self._rows: Optional[pd.DataFrame] = None
+        self._months: Optional[Dict[MonthKey, str]] = None
+
+    def _ensure_index(self) -> None:
+        if self._months is not None: return
+        self._months = {}
+        if not os.path.exists(self.path): return
+        try:
+            meta = json.loads((pq.read_schema(self.path).metadata or {}).get(_METADATA_KEY, b"{}"))
+        except Exception: # pylint: disable=broad-except
+            return  # Archivo corrupto o ilegible: se reconstruye desde los PDFs
+        if meta.get("parser_version") != PARSER_VERSION: return
+        self._months = {(y, m): h for y, m, h in meta.get("months", [])}
+
+    def _ensure_loaded(self) -> None:
+        self._ensure_index()
+        if self._rows is not None: return
+        self._rows = compact_frame(pd.DataFrame())
+        if not self._months: return
+        try:
+            self._rows = compact_frame(pq.read_table(self.path).to_pandas())
+        except Exception: # pylint: disable=broad-except
+            self._months = {}  # Filas ilegibles: el índice tampoco vale
+
+    def has(self, year: int, month: int) -> bool:
+        with self._lock:
+            self._ensure_index()
+            return (year, month) in self._months
+
+    def months(self) -> List[MonthKey]:
+        with self._lock:
+            self._ensure_index()
+            return sorted(self._months)
+
+    def source_hash(self, year: int, month: int) -> Optional[str]:
+        with self._lock:
+            self._ensure_index()
+            return self._months.get((year, month))
+
+    def fingerprint(self, months: Iterable[MonthKey]) -> str:
+        """Huella de los meses pedidos (los presentes y el PDF de origen de cada uno), sin leer filas.
+
+        Cambia cuando se agrega o reemplaza alguno de esos meses; instantanea.py la
+        usa para saber si la instantánea publicada sigue correspondiendo al almacén.
+        """
+        with self._lock:
+            self._ensure_index()
+            entries = [[y, m, self._months[(y, m)]] for y, m in sorted(set(months)) if (y, m) in self._months]
+        payload = json.dumps([PARSER_VERSION, entries])
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    def get_rows(self, months: Iterable[MonthKey]) -> pd.DataFrame:
+        """Filas de los meses pedidos, en orden cronológico y con el orden original dentro de cada mes."""
+        wanted = {period_ordinal(y, m) for y, m in months}
+        with self._lock:
+            self._ensure_loaded()
+            rows = self._rows
+        if rows.empty or not wanted:
+            return rows.iloc[0:0]
+        selected = rows[rows[PERIOD_COLUMN].isin(wanted)]
+        return selected.sort_values(PERIOD_COLUMN, kind="stable").reset_index(drop=True)
+
+    def put_months(self, parsed: Iterable[Tuple[MonthKey, str, List[Dict]]]) -> None:
+        """Agrega (o reemplaza) meses parseados: ((año, mes), hash del PDF, filas)."""
+        parsed = list(parsed)
+        if not parsed: return
+        with self._lock:
+            self._ensure_loaded()
+            replaced = {period_ordinal(y, m) for (y, m), _, _ in parsed}
+            kept = self._rows[~self._rows[PERIOD_COLUMN].isin(replaced)]
+            new_rows = rows_to_frame([rows for _, _, rows in parsed])
+            frames = [df for df in (kept, new_rows) if not df.empty]
+            self._rows = pd.concat(frames, ignore_index=True) if frames else new_rows
+            for key, source_hash, _ in parsed:
+                self._months[key] = source_hash
+            self._write()
+
+    def _write(self) -> None:
+        try:
+            table = pa.Table.from_pandas(self._rows, preserve_index=False)
+            meta = {
+                "parser_version": PARSER_VERSION,
+                "months": [[y, m, h] for (y, m), h in sorted(self._months.items())],
+            }
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), _METADATA_KEY: json.dumps(meta).encode()})
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp-{os.getpid()}"
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, self.path)  # reemplazo atómico: un lector nunca ve un archivo a medias
+        except OSError:
+            pass  # Sistema de archivos de solo lectura: el almacén sigue funcionando en memoria
@@ -1,30 +1,152 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+"""Genera un gráfico de variación mensual por producto en output/graficas.
+
+Los gráficos se dibujan con la API orientada a objetos de matplotlib (Figure +
+backend Agg, sin el estado global de pyplot) y los productos se reparten entre
+procesos; cada proceso reutiliza una sola figura para todos sus productos. Un
+manifiesto (output/graficas/manifiesto.json) guarda el hash de los datos de
+cada producto, así que sólo se redibujan los productos cuyo tramo cambió desde
+la corrida anterior.
+
+Uso: python analisis_variaciones.py [--output-dir output/graficas] [--workers N] [--forzar]
+"""
+import argparse
+import hashlib
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from acumulados import period_ordinal
+from datos import period_labels
+from deteccion_anomalias import history_from_output
+from salidas import OUTPUT_DIR as DATA_DIR
 
 # --- Configuración ---
-CSV_PATH    = 'output/variaciones_productos.csv'
 OUTPUT_DIR  = 'output/graficas'
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-# --- Carga y pre-procesamiento ---
-df = pd.read_csv(CSV_PATH)
-# Extraer mes de la columna file
-df['mes'] = (
-    df['file']
-      .str.extract(r'_(ENE|FEB|MAR)_')[0]
-      .map({'ENE':'Enero','FEB':'Febrero','MAR':'Marzo'})
-)
-
-# --- Graficar por producto ---
-for producto, grupo in df.groupby('producto'):
-    plt.figure()
-    plt.plot(grupo['mes'], grupo['variacion'], marker='o')
-    plt.title(f'Variación mensual: {producto}')
-    plt.xlabel('Mes')
-    plt.ylabel('% Variación')
-    plt.grid(True)
-    # Guardar cada gráfico en output/graficas
+MANIFEST_FILENAME = 'manifiesto.json'
+RENDER_VERSION = 2  # Subir al cambiar el estilo de los gráficos para redibujarlos todos
+max_workers = os.cpu_count() or 1  # Procesos para dibujar (1 = secuencial)
+
+# (producto, meses, variaciones, ruta del PNG)
+ChartJob = Tuple[str, List, List[float], str]
+
+
+def load_variations(output_dir: str = DATA_DIR) -> pd.DataFrame:
+    """Variaciones de parser_canasta2.py (CSV o Parquet) con year y mes_num deducidos del nombre de cada PDF."""
+    return history_from_output(output_dir)
+
+
+def chart_path(output_dir: str, producto: str) -> str:
     safe_name = producto.replace(' ', '_').replace('/', '_')
-    plt.savefig(f'{OUTPUT_DIR}/{safe_name}_variacion.png')
-    plt.close()
+    return os.path.join(output_dir, f'{safe_name}_variacion.png')
+
+
+def slice_hash(producto: str, meses: List, valores: List[float]) -> str:
+    """Hash de los datos que determinan el gráfico de un producto."""
+    payload = json.dumps([RENDER_VERSION, producto, meses, valores], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def load_manifest(output_dir: str) -> Dict[str, str]:
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILENAME), encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(output_dir: str, manifest: Dict[str, str]) -> None:
+    path = os.path.join(output_dir, MANIFEST_FILENAME)
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, indent=1, sort_keys=True, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+# --- Dibujo (se ejecuta en cada proceso) ---
+_figure: Optional[Figure] = None  # Plantilla reutilizada por proceso
+
+
+def _chart_template() -> Figure:
+    global _figure
+    if _figure is None:
+        _figure = Figure()
+        FigureCanvasAgg(_figure)
+        _figure.add_subplot()
+    return _figure
+
+
+def render_chart(job: ChartJob) -> None:
+    producto, meses, valores, path = job
+    fig = _chart_template()
+    ax = fig.axes[0]
+    ax.cla()  # También reinicia las categorías del eje x del producto anterior
+    ax.plot(meses, valores, marker='o')
+    ax.set_title(f'Variación mensual: {producto}')
+    ax.set_xlabel('Período')
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.set_ylabel('% Variación')
+    ax.grid(True)
+    fig.savefig(path)
+
+
+def _render_chunk(jobs: List[ChartJob]) -> int:
+    for job in jobs:
+        render_chart(job)
+    return len(jobs)
+
+
+def chart_jobs(df: pd.DataFrame, output_dir: str) -> List[Tuple[str, ChartJob]]:
+    """(hash, job) por producto, en orden alfabético; los meses de cada producto en orden cronológico.
+
+    El eje x lleva año y mes ("2025 Enero"): meses iguales de años distintos no se superponen.
+    """
+    ordinals = period_ordinal(df['year'].to_numpy(dtype='int64'), df['mes_num'].to_numpy(dtype='int64'))
+    df = df.assign(periodo_ord=ordinals).sort_values(['producto', 'periodo_ord'], kind='stable')
+    jobs = []
+    for producto, grupo in df.groupby('producto', sort=True):
+        meses, valores = period_labels(grupo['periodo_ord'].tolist()), grupo['variacion'].tolist()
+        jobs.append((slice_hash(producto, meses, valores), (producto, meses, valores, chart_path(output_dir, producto))))
+    return jobs
+
+
+def render_charts(df: pd.DataFrame, output_dir: str = OUTPUT_DIR, workers: int = max_workers, force: bool = False) -> Tuple[int, int]:
+    """Dibuja los gráficos cuyo tramo cambió. Retorna (dibujados, omitidos)."""
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {} if force else load_manifest(output_dir)
+    pending = [
+        (digest, job) for digest, job in chart_jobs(df, output_dir)
+        if force or manifest.get(job[0]) != digest or not os.path.exists(job[3])
+    ]
+    n_skipped = df['producto'].nunique() - len(pending)
+    jobs = [job for _, job in pending]
+    if workers <= 1 or len(jobs) <= 1:
+        _render_chunk(jobs)
+    else:
+        # Un lote por proceso: cada uno crea su figura una sola vez
+        n_chunks = min(workers, len(jobs))
+        chunks = [jobs[i::n_chunks] for i in range(n_chunks)]
+        with ProcessPoolExecutor(max_workers=n_chunks) as pool:
+            list(pool.map(_render_chunk, chunks))
+    manifest.update({job[0]: digest for digest, job in pending})
+    save_manifest(output_dir, manifest)
+    return len(jobs), n_skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help='carpeta de los gráficos')
+    parser.add_argument('--workers', type=int, default=max_workers, help='procesos para dibujar (1 = secuencial)')
+    parser.add_argument('--forzar', action='store_true', help='redibujar todos los productos aunque no hayan cambiado')
+    args = parser.parse_args()
+
+    n_rendered, n_skipped = render_charts(load_variations(), args.output_dir, args.workers, args.forzar)
+    print(f"✅ {n_rendered} gráficos dibujados, {n_skipped} sin cambios, en {args.output_dir}/")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Microbenchmark: variación acumulada por producto con bucles Python vs. el motor vectorizado y el índice de prefijos de acumulados.py.
+
+Replica el cálculo de get_presidential_kpis (promedio de productos seleccionados +
+mayor alza/baja sobre toda la canasta) con datos sintéticos.
+
+Uso: python benchmarks/bench_acumulados.py [--products 80] [--months 120] [--scale 1 100]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from acumulados import CumulativeIndex, cumulative_variation  # noqa: E402
+
+
+def synthetic_dataset(n_products: int, n_months: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    ordinals = np.arange(n_months) + 2015 * 12
+    df = pd.DataFrame({
+        'year': np.repeat(ordinals // 12, n_products),
+        'mes_num': np.repeat(ordinals % 12 + 1, n_products),
+        'producto': np.tile([f"Producto {i:04d}" for i in range(n_products)], n_months),
+        'variacion': rng.normal(0.3, 2.5, n_months * n_products).round(1),
+    })
+    return df
+
+
+def loop_kpis(df, selected):
+    """Implementación previa: un slice booleano y un for por producto."""
+    def cumulative(df_prod):
+        factor = 1.0
+        for v in df_prod.sort_values(['year', 'mes_num'])['variacion']:
+            factor *= (1 + v / 100.0)
+        return (factor - 1) * 100.0
+
+    avg = [cumulative(df[df['producto'] == p]) for p in selected]
+    per_product = {p: cumulative(df[df['producto'] == p]) for p in df['producto'].unique()}
+    return (sum(avg) / len(avg),
+            max(per_product, key=per_product.get), min(per_product, key=per_product.get))
+
+
+def vectorized_kpis(df, selected):
+    selected_cum = cumulative_variation(df[df['producto'].isin(selected)])
+    per_product = cumulative_variation(df)
+    return selected_cum.mean(), per_product.idxmax(), per_product.idxmin()
+
+
+def indexed_kpis(index, selected, start, end):
+    window = index.window(start, end)
+    selected_cum = window[window.index.isin(selected)].dropna()
+    return selected_cum.mean(), window.idxmax(), window.idxmin()
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - t0, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--products', type=int, default=80)
+    parser.add_argument('--months', type=int, default=120)
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 100],
+                        help='multiplicadores de la historia (meses)')
+    args = parser.parse_args()
+
+    for scale in args.scale:
+        df = synthetic_dataset(args.products, args.months * scale)
+        selected = sorted(df['producto'].unique())[:14]
+        t_loop, loop = timed(loop_kpis, df, selected)
+        t_vec, vec = timed(vectorized_kpis, df, selected)
+        assert np.isclose(loop[0], vec[0]) and loop[1:] == vec[1:], "los KPIs no coinciden"
+
+        t_build, index = timed(CumulativeIndex, df)
+        first, last = int(df['year'].min()) * 12, int(df['year'].max()) * 12 + 11
+        t_query, idx = timed(indexed_kpis, index, selected, first, last)
+        assert np.isclose(idx[0], vec[0]) and idx[1:] == vec[1:], "los KPIs del índice no coinciden"
+
+        windows = {f"{y}": (y * 12, y * 12 + 11) for y in range(2015, 2015 + args.months * scale // 12)}
+        t_win, _ = timed(cumulative_variation, df, windows)
+        print(f"{args.products} productos x {args.months * scale} meses ({len(df):,} filas): "
+              f"bucle {t_loop:7.3f} s | vectorizado {t_vec:7.4f} s (x{t_loop / t_vec:,.0f}) | "
+              f"{len(windows)} ventanas anuales en una pasada {t_win:7.4f} s")
+        print(f"  índice de prefijos: construcción {t_build:7.4f} s (una vez) | KPIs por cambio de filtro {t_query * 1000:6.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
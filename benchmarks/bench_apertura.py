@@ -0,0 +1,88 @@
+"""Benchmark: resumen + variaciones abriendo cada PDF dos veces vs. una sola pasada (extract_report).
+
+Mide por informe el tiempo y el pico de memoria Python (tracemalloc) de ambos
+caminos, y luego recorre una carpeta con los PDFs de pdf/ replicados en
+secuencial y en paralelo con iter_report_dir.
+
+Uso: python benchmarks/bench_apertura.py [--repeat 3] [--copies 4] [--workers N]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraccion_pdf import extract_report, extract_summary, iter_annex_records, iter_report_dir  # noqa: E402
+from servidor_local import PDF_DIR  # noqa: E402
+
+
+def two_opens(path):
+    """Camino previo: extract_summary y el anexo abren el documento por separado."""
+    return extract_summary(path), list(iter_annex_records(path))
+
+
+def single_open(path):
+    summary, records = extract_report(path)
+    return summary, list(records)
+
+
+def measure(repeat, fn, *args):
+    """(mejor tiempo, pico de memoria en la última corrida, resultado)."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def walk(pdf_dir, workers):
+    t0 = time.perf_counter()
+    n_records = sum(len(list(records)) for _, _, records in iter_report_dir(pdf_dir, workers))
+    return time.perf_counter() - t0, n_records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--copies', type=int, default=4, help='réplicas de pdf/ para el recorrido de carpeta')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    names = sorted(f for f in os.listdir(PDF_DIR) if f.lower().endswith('.pdf'))
+    total_two = total_one = 0.0
+    for name in names:
+        path = os.path.join(PDF_DIR, name)
+        t_two, mem_two, res_two = measure(args.repeat, two_opens, path)
+        t_one, mem_one, res_one = measure(args.repeat, single_open, path)
+        assert res_two == res_one, f"{name}: la pasada única cambió el resultado"
+        total_two += t_two
+        total_one += t_one
+        print(f"{name}: dos aperturas {t_two:5.2f} s / {mem_two / 2**20:6.1f} MiB | "
+              f"una pasada {t_one:5.2f} s / {mem_one / 2**20:6.1f} MiB | {len(res_one[1])} variaciones")
+    print(f"Total: {total_two:.2f} s -> {total_one:.2f} s (x{total_two / total_one:.2f})")
+
+    tmp_dir = tempfile.mkdtemp(prefix='bench_apertura_')
+    try:
+        for copy in range(args.copies):
+            for name in names:
+                shutil.copy(os.path.join(PDF_DIR, name), os.path.join(tmp_dir, f"{copy:03d}_{name}"))
+        t_serial, n_serial = walk(tmp_dir, 1)
+        t_parallel, n_parallel = walk(tmp_dir, args.workers)
+        assert n_serial == n_parallel, "el recorrido paralelo cambió el número de variaciones"
+        print(f"Carpeta de {args.copies * len(names)} PDFs: secuencial {t_serial:.2f} s | "
+              f"{args.workers} proceso(s) {t_parallel:.2f} s (x{t_serial / t_parallel:.2f})")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark: arranque en frío y costo por rerun de streamlit_app.py.
+
+1. Arranque: en un intérprete nuevo ejecuta sólo las importaciones de cabecera
+   de streamlit_app.py con `python -X importtime` y reporta el tiempo total,
+   los módulos más costosos y qué dependencias pesadas quedaron cargadas.
+2. Rerun: con AppTest y el servidor local de informes (benchmarks/servidor_local.py)
+   mide reruns sin cambios de filtros, una vez que el dataset está en caché.
+
+Uso: python benchmarks/bench_arranque.py [--repeat 5] [--reruns 10] [--top 8]
+"""
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, 'streamlit_app.py')
+HEAVY_MODULES = ['sklearn', 'pdfplumber', 'pypdfium2', 'requests', 'plotly.express']
+
+
+def header_imports(path: str) -> str:
+    """Código de las importaciones con que abre el script (hasta la primera otra sentencia)."""
+    with open(path, encoding='utf-8') as fh:
+        source = fh.read()
+    nodes = []
+    for node in ast.parse(source).body:
+        if not isinstance(node, (ast.Import, ast.ImportFrom)): break
+        nodes.append(ast.get_source_segment(source, node))
+    return '\n'.join(nodes)
+
+
+def cold_import(code: str):
+    """(segundos, {módulo: µs acumulados}, dependencias pesadas cargadas) en un proceso nuevo."""
+    probe = code + '\nimport sys\nprint(",".join(m for m in %r if m in sys.modules))' % HEAVY_MODULES
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', probe], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - t0
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line: continue
+        _, cum, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        if cum.isdigit() and '.' not in name.strip():  # sólo paquetes de primer nivel
+            cumulative[name.strip()] = int(cum)
+    loaded = proc.stdout.strip().splitlines()[-1] if proc.stdout.strip() else ''
+    return elapsed, cumulative, loaded
+
+
+def rerun_times(n_reruns: int):
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+    from servidor_local import LocalReportServer
+    from streamlit.testing.v1 import AppTest
+
+    with LocalReportServer(latency=0.0) as server:
+        os.environ['CBA_BASE_URL'] = server.base_url
+        os.chdir(ROOT)
+        at = AppTest.from_file(APP_PATH, default_timeout=900)
+        t0 = time.perf_counter()
+        at.run()
+        first = time.perf_counter() - t0
+        times = []
+        for _ in range(n_reruns):
+            t0 = time.perf_counter()
+            at.run()
+            times.append(time.perf_counter() - t0)
+        assert not at.exception, at.exception
+    return first, times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5, help='arranques en frío a medir')
+    parser.add_argument('--reruns', type=int, default=10)
+    parser.add_argument('--top', type=int, default=8, help='módulos más costosos a listar')
+    args = parser.parse_args()
+
+    code = header_imports(APP_PATH)
+    runs = [cold_import(code) for _ in range(args.repeat)]
+    best = min(runs, key=lambda run: run[0])
+    print(f"Importaciones de cabecera (mejor de {args.repeat}): {best[0]:.2f} s "
+          f"(mediana {statistics.median(run[0] for run in runs):.2f} s)")
+    for name, micros in sorted(best[1].items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<24} {micros / 1000:8.1f} ms")
+    print(f"  dependencias pesadas cargadas: {best[2] or 'ninguna'}")
+
+    first, times = rerun_times(args.reruns)
+    print(f"Primera corrida (dataset en caché de disco): {first:.2f} s | rerun sin cambios: "
+          f"mediana {statistics.median(times) * 1000:.0f} ms, mínimo {min(times) * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
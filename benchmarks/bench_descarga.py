@@ -0,0 +1,62 @@
+"""Benchmark: descarga secuencial vs. pool concurrente (PdfFetcher) contra un servidor local.
+
+Uso: python benchmarks/bench_descarga.py [--months 120] [--latency 0.2] [--workers 8]
+"""
+import argparse
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from descarga_pdf import PdfFetcher, build_report_url  # noqa: E402
+from servidor_local import LocalReportServer  # noqa: E402
+
+
+def month_keys(n_months: int, start_year: int = 2015):
+    return [(str(start_year + i // 12), f"{i % 12 + 1:02d}") for i in range(n_months)]
+
+
+def sequential(urls):
+    contents = []
+    for url in urls:
+        try:
+            r = requests.get(url, timeout=20)
+            r.raise_for_status()
+            contents.append(r.content)
+        except requests.exceptions.RequestException:
+            contents.append(None)
+    return contents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--months', type=int, default=120)
+    parser.add_argument('--latency', type=float, default=0.2, help='latencia artificial por solicitud (s)')
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    with LocalReportServer(latency=args.latency) as server:
+        urls = [build_report_url(y, m, base_url=server.base_url) for y, m in month_keys(args.months)]
+
+        t0 = time.perf_counter()
+        seq = sequential(urls)
+        t_seq = time.perf_counter() - t0
+
+        fetcher = PdfFetcher(max_workers=args.workers)
+        t0 = time.perf_counter()
+        conc = fetcher.fetch_many(urls)
+        t_conc = time.perf_counter() - t0
+        fetcher.close()
+
+    assert seq == list(conc.values()), "el pool concurrente devolvió contenidos distintos"
+    total_mb = sum(len(c) for c in seq if c) / 1e6
+    print(f"{args.months} PDFs ({total_mb:.1f} MB), latencia {args.latency * 1000:.0f} ms")
+    print(f"  secuencial (requests.get)     : {t_seq:7.2f} s")
+    print(f"  PdfFetcher ({args.workers:2d} hilos, 1 sesión): {t_conc:7.2f} s  (x{t_seq / t_conc:.1f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark: gráficos por producto con pyplot en serie vs. render_charts (Figure/Agg, procesos, hash).
+
+Datos sintéticos de 80 productos x N años (un CSV como el de
+parser_canasta2.py, leído con load_variations); mide el bucle previo de
+analisis_variaciones.py, la primera corrida de render_charts (secuencial y en
+paralelo) y una segunda corrida sin cambios (todos los productos se omiten).
+
+Uso: python benchmarks/bench_graficas.py [--years 5] [--products 80] [--workers N]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analisis_variaciones import load_variations, render_charts  # noqa: E402
+from deteccion_anomalias import FILE_MONTHS  # noqa: E402
+
+def synthetic_variations(n_years: int, n_products: int, seed: int = 42) -> pd.DataFrame:
+    """Filas como las de output/variaciones_productos.csv: un PDF por mes, en orden aleatorio."""
+    rng = np.random.default_rng(seed)
+    n_months = n_years * 12
+    files = [f"Valor_cb_{list(FILE_MONTHS)[m % 12]}_{2015 + m // 12}.pdf" for m in range(n_months)]
+    df = pd.DataFrame({
+        'producto': np.repeat([f"Producto {i:03d}" for i in range(n_products)], n_months),
+        'variacion': rng.normal(0.3, 2.5, n_months * n_products).round(1),
+        'file': np.tile(files, n_products),
+    })
+    return df.sample(frac=1.0, random_state=seed).reset_index(drop=True)
+
+
+def previous_loop(df, output_dir):
+    """Bucle previo de analisis_variaciones.py (máquina de estados de pyplot)."""
+    for producto, grupo in df.groupby('producto'):
+        plt.figure()
+        plt.plot(grupo['mes'], grupo['variacion'], marker='o')
+        plt.title(f'Variación mensual: {producto}')
+        plt.xlabel('Mes')
+        plt.ylabel('% Variación')
+        plt.grid(True)
+        safe_name = producto.replace(' ', '_').replace('/', '_')
+        plt.savefig(f'{output_dir}/{safe_name}_variacion.png')
+        plt.close()
+
+
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - t0, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--products', type=int, default=80)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='bench_graficas_')
+    try:
+        # Mismo camino que analisis_variaciones.py: CSV de salida -> load_variations
+        synthetic_variations(args.years, args.products).to_csv(os.path.join(tmp_dir, 'variaciones_productos.csv'), index=False)
+        df = load_variations(tmp_dir)
+        dirs = {name: os.path.join(tmp_dir, name) for name in ('previo', 'secuencial', 'paralelo')}
+        os.makedirs(dirs['previo'])
+        t_prev, _ = timed(previous_loop, df, dirs['previo'])
+        t_serial, (n_serial, _) = timed(render_charts, df, dirs['secuencial'], workers=1)
+        t_parallel, (n_parallel, _) = timed(render_charts, df, dirs['paralelo'], workers=args.workers)
+        t_warm, (n_warm, n_skipped) = timed(render_charts, df, dirs['paralelo'], workers=args.workers)
+        assert n_serial == n_parallel == args.products and n_warm == 0 and n_skipped == args.products
+        df.loc[df['producto'] == df['producto'].iloc[0], 'variacion'] += 0.1
+        t_one, (n_one, _) = timed(render_charts, df, dirs['paralelo'], workers=args.workers)
+        assert n_one == 1, "sólo el producto modificado debe redibujarse"
+
+        print(f"{args.products} productos x {args.years} años ({len(df):,} filas):")
+        print(f"  pyplot en serie     {t_prev:6.2f} s")
+        print(f"  Figure/Agg, 1 proc. {t_serial:6.2f} s (x{t_prev / t_serial:.2f})")
+        print(f"  Figure/Agg, {args.workers} proc. {t_parallel:6.2f} s (x{t_prev / t_parallel:.2f})")
+        print(f"  sin cambios         {t_warm:6.2f} s | 1 producto modificado {t_one:6.2f} s")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Benchmark: memoria de K procesos que cargan el dataset desde Parquet vs. la instantánea Arrow mapeada.
+
+Cada proceso hijo carga la historia sintética (suite.synthetic_history) y
+recorre todas sus columnas. Con Parquet arma su propia copia, como el almacén
+de meses. Con la instantánea (instantanea.open_snapshot) mapea el mismo archivo.
+Con los K procesos vivos, cada uno reporta cuánto creció su Pss (memoria
+proporcional: las páginas compartidas se reparten entre quienes las mapean).
+La suma de los K es la memoria total que agrega el dataset.
+
+Las sesiones de un mismo proceso ya comparten un solo objeto vía
+st.cache_resource; esto mide lo que se agrega entre procesos (réplicas,
+workers, reinicios). Requiere Linux (/proc/self/smaps_rollup).
+
+Uso: python benchmarks/bench_instantanea.py [--years 1000] [--procesos 1 4 8]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from suite import synthetic_history  # noqa: E402
+
+
+def pss_kib() -> int:
+    with open('/proc/self/smaps_rollup') as fh:
+        for line in fh:
+            if line.startswith('Pss:'):
+                return int(line.split()[1])
+    raise RuntimeError('smaps_rollup sin Pss')
+
+
+def child(mode: str, path: str) -> None:
+    """Carga el dataset, toca todas sus páginas, avisa y espera a que el padre pida la medición."""
+    from datos import CanastaDataset, compact_frame  # importaciones antes de la medición base
+    from instantanea import open_snapshot
+
+    before = pss_kib()
+    t0 = time.perf_counter()
+    if mode == 'parquet':
+        dataset = CanastaDataset(compact_frame(pq.read_table(path).to_pandas()))
+    else:
+        dataset = open_snapshot(path)
+    checksum = 0.0
+    for column in dataset.frame.columns:
+        values = dataset.frame[column]
+        values = values.cat.codes if values.dtype == 'category' else values
+        checksum += float(np.asarray(values).sum(dtype=np.float64))
+    elapsed = time.perf_counter() - t0
+    print(f"listo {elapsed:.4f} {checksum:.6g}", flush=True)
+    sys.stdin.readline()
+    print(pss_kib() - before, flush=True)
+
+
+def run_processes(mode: str, path: str, n: int):
+    """(suma de Pss agregado en MiB, carga media en s, checksums) con n procesos vivos a la vez."""
+    procs = [
+        subprocess.Popen([sys.executable, __file__, '--hijo', mode, path],
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for _ in range(n)
+    ]
+    ready = [p.stdout.readline().split() for p in procs]  # todos cargados antes de medir
+    for p in procs:
+        p.stdin.write('\n')
+        p.stdin.flush()
+    deltas = [int(p.stdout.readline()) for p in procs]
+    for p in procs:
+        p.wait()
+    return sum(deltas) / 1024, sum(float(r[1]) for r in ready) / n, {r[2] for r in ready}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=int, default=1000, help='años de historia sintética')
+    parser.add_argument('--procesos', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--hijo', nargs=2, metavar=('MODO', 'RUTA'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.hijo:
+        child(*args.hijo)
+        return
+
+    from datos import CanastaDataset
+    from instantanea import publish_snapshot
+
+    dataset = CanastaDataset(synthetic_history(args.years))
+    with tempfile.TemporaryDirectory(prefix='bench_instantanea_') as tmp_dir:
+        parquet_path = os.path.join(tmp_dir, 'meses.parquet')
+        pq.write_table(pa.Table.from_pandas(dataset.frame, preserve_index=False), parquet_path)
+        snapshot_path = publish_snapshot(dataset, tmp_dir)
+        size_mib = os.path.getsize(snapshot_path) / 2**20
+        print(f"{len(dataset.frame):,} filas | instantánea {size_mib:.1f} MiB | Parquet {os.path.getsize(parquet_path) / 2**20:.1f} MiB")
+        for n in args.procesos:
+            pq_mib, pq_s, pq_sums = run_processes('parquet', parquet_path, n)
+            ar_mib, ar_s, ar_sums = run_processes('instantanea', snapshot_path, n)
+            assert pq_sums == ar_sums and len(pq_sums) == 1, "los procesos no leyeron los mismos datos"
+            print(f"  {n:>2} proceso(s): Parquet {pq_mib:7.1f} MiB en total (carga {pq_s * 1000:6.1f} ms) | "
+                  f"instantánea {ar_mib:6.1f} MiB (apertura {ar_s * 1000:5.1f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Microbenchmark: memoria y orden de periodos del dataset con filas de dicts vs. el esquema compacto de datos.py.
+
+La representación previa arma un DataFrame desde una lista de dicts (producto y
+mes como texto, year/mes_num int64, variacion float64) y ordena los periodos
+"2024 Enero" con una lambda que busca el mes en NUM2MONTH. La compacta llena
+arreglos prealocados (categóricos, int16/int8, float32) y ordena/pivotea por el
+ordinal entero del periodo.
+
+Uso: python benchmarks/bench_memoria.py [--years 10] [--scale 1 10 100]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datos import PERIOD_COLUMN, period_labels, rows_to_frame  # noqa: E402
+from extraccion_pdf import FIXED_PRODUCTS, NUM2MONTH  # noqa: E402
+
+
+def synthetic_batches(n_years: int, seed: int = 42):
+    """Un lote de filas del parser por mes, con todos los productos de la canasta."""
+    rng = np.random.default_rng(seed)
+    batches = []
+    for year in range(2015, 2015 + n_years):
+        for mm_str, month_name in NUM2MONTH.items():
+            values = rng.normal(0.3, 2.5, len(FIXED_PRODUCTS)).round(1)
+            batches.append([
+                {"year": year, "mes_num": int(mm_str), "mes": month_name, "producto": p, "variacion": float(v)}
+                for p, v in zip(FIXED_PRODUCTS, values)
+            ])
+    return batches
+
+
+def legacy_frame(batches):
+    return pd.DataFrame([row for batch in batches for row in batch])
+
+
+def legacy_pivot(df):
+    df = df.copy()
+    df["periodo"] = df["year"].astype(str) + " " + df["mes"]
+    ordered = sorted(df["periodo"].unique(), key=lambda x: (int(x.split()[0]), list(NUM2MONTH.values()).index(x.split()[1])))
+    df["periodo"] = pd.Categorical(df["periodo"], categories=ordered, ordered=True)
+    return df.pivot_table(index="periodo", columns="producto", values="variacion", aggfunc="mean", observed=True)
+
+
+def compact_pivot(df):
+    pivot = df.pivot_table(index=PERIOD_COLUMN, columns="producto", values="variacion", aggfunc="mean", observed=True)
+    pivot.index = pd.Index(period_labels(pivot.index), name="periodo")
+    return pivot
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - t0, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--years', type=int, default=10, help='años de historia base')
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 10, 100],
+                        help='multiplicadores de la historia')
+    args = parser.parse_args()
+
+    for scale in args.scale:
+        batches = synthetic_batches(args.years * scale)
+        t_legacy, legacy = timed(legacy_frame, batches)
+        t_compact, compact = timed(rows_to_frame, batches)
+        mem_legacy = legacy.memory_usage(deep=True).sum()
+        mem_compact = compact.memory_usage(deep=True).sum()
+
+        t_piv_legacy, piv_legacy = timed(legacy_pivot, legacy)
+        t_piv_compact, piv_compact = timed(compact_pivot, compact)
+        assert list(piv_legacy.index.astype(str)) == list(piv_compact.index), "el orden de periodos no coincide"
+        assert np.allclose(piv_legacy.sort_index(axis=1).to_numpy(),
+                           piv_compact.rename(columns=str).sort_index(axis=1).to_numpy(), atol=1e-4), "los pivotes no coinciden"
+
+        print(f"{len(compact):,} filas: memoria {mem_legacy / 2**20:8.2f} MiB -> {mem_compact / 2**20:7.2f} MiB "
+              f"(x{mem_legacy / mem_compact:.1f}) | construcción {t_legacy:6.3f} s -> {t_compact:6.3f} s | "
+              f"orden+pivote {t_piv_legacy:6.3f} s -> {t_piv_compact:6.3f} s")
+
+
+if __name__ == '__main__':
+    main()
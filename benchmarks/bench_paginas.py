@@ -0,0 +1,46 @@
+"""Benchmark: extracción de todas las páginas vs. sólo las del 'Anexo 2' ubicadas por locate_annex_pages.
+
+Uso: python benchmarks/bench_paginas.py [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraccion_pdf import locate_annex_pages, parse_month_pdf  # noqa: E402
+from servidor_local import PDF_DIR  # noqa: E402
+
+
+def best_of(repeat, fn, *args, **kwargs):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    total_full = total_located = 0.0
+    for name in sorted(f for f in os.listdir(PDF_DIR) if f.lower().endswith('.pdf')):
+        with open(os.path.join(PDF_DIR, name), 'rb') as fh:
+            pdf_bytes = fh.read()
+        t_probe, pages = best_of(args.repeat, locate_annex_pages, pdf_bytes)
+        t_full, rows_full = best_of(args.repeat, parse_month_pdf, pdf_bytes, '2025', '01', locate_pages=False)
+        t_loc, rows_loc = best_of(args.repeat, parse_month_pdf, pdf_bytes, '2025', '01')
+        assert rows_full == rows_loc, f"{name}: la extracción dirigida cambió las filas"
+        total_full += t_full
+        total_located += t_loc
+        print(f"{name}: páginas {pages.start + 1}-{pages.stop} | sondeo {t_probe * 1000:5.1f} ms | "
+              f"todas {t_full:5.2f} s | anexo {t_loc:5.2f} s (x{t_full / t_loc:.1f}) | {len(rows_loc)} filas")
+    print(f"Total: {total_full:.2f} s -> {total_located:.2f} s (x{total_full / total_located:.1f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Benchmark: escalamiento del parseo de PDFs con ProcessPoolExecutor.
+
+Replica los PDFs de pdf/ N veces y mide extraccion_pdf.parse_month_pdfs con
+distinta cantidad de procesos, verificando que la salida sea idéntica.
+
+Uso: python benchmarks/bench_parseo.py [--copies 4] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraccion_pdf import parse_month_pdfs  # noqa: E402
+from servidor_local import load_bundled_pdfs  # noqa: E402
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--copies', type=int, default=4, help='veces que se replican los PDFs de pdf/')
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({w for w in (1, 2, 4, 8, cpus) if w <= cpus}))
+    args = parser.parse_args()
+
+    pdfs = load_bundled_pdfs() * args.copies
+    jobs = [(str(2015 + i // 12), f"{i % 12 + 1:02d}", pdf) for i, pdf in enumerate(pdfs)]
+    print(f"{len(jobs)} PDFs, {cpus} CPU(s) disponibles")
+
+    reference = None
+    baseline = None
+    for workers in args.workers:
+        t0 = time.perf_counter()
+        batches = parse_month_pdfs(jobs, max_workers=workers)
+        elapsed = time.perf_counter() - t0
+        if reference is None:
+            reference, baseline = batches, elapsed
+        assert batches == reference, f"salida distinta con {workers} procesos"
+        n_rows = sum(len(b) for b in batches)
+        print(f"  {workers:2d} proceso(s): {elapsed:7.2f} s  {len(jobs) / elapsed:6.2f} PDF/s  "
+              f"{n_rows} filas  (x{baseline / elapsed:.2f})")
+
+
+if __name__ == '__main__':
+    main()
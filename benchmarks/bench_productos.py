@@ -0,0 +1,74 @@
+"""Microbenchmark: reconocimiento de productos con LINE_REGEX + `in FIXED_PRODUCTS` vs. ProductMatcher.
+
+Usa el texto de las páginas del anexo de los PDFs de pdf/ (extraído una vez) y
+mide líneas por segundo de cada camino y el recall: productos de FIXED_PRODUCTS
+reconocidos en cada informe (todos los informes listan la canasta completa).
+
+Uso: python benchmarks/bench_productos.py [--repeat 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraccion_pdf import (  # noqa: E402
+    FIXED_PRODUCTS, LINE_REGEX, MAX_ABS_VARIATION, PRODUCT_MATCHER, iter_page_texts, locate_annex_pages,
+)
+from servidor_local import PDF_DIR  # noqa: E402
+
+
+def list_scan(lines):
+    """Camino previo: regex por línea y búsqueda lineal en la lista de productos."""
+    out = []
+    for line in lines:
+        match = LINE_REGEX.match(line.strip())
+        if not match: continue
+        product_name = match.group(1).strip()
+        try:
+            value = float(match.group(2).replace(",", "."))
+        except ValueError: continue
+        if product_name.lower() == "cba": continue
+        if product_name not in FIXED_PRODUCTS: continue
+        if abs(value) > MAX_ABS_VARIATION: continue
+        out.append((product_name, value))
+    return out
+
+
+def matcher_scan(lines):
+    return [(p, v) for p, v in PRODUCT_MATCHER.iter_matches(lines) if abs(v) <= MAX_ABS_VARIATION]
+
+
+def lines_per_second(repeat, fn, lines):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(lines)
+    return repeat * len(lines) / (time.perf_counter() - t0), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    all_lines = []
+    for name in sorted(f for f in os.listdir(PDF_DIR) if f.lower().endswith('.pdf')):
+        path = os.path.join(PDF_DIR, name)
+        pages = locate_annex_pages(path)
+        lines = [line for text in iter_page_texts(path, pages.start if pages else 0) for line in text.split("\n")]
+        all_lines.extend(lines)
+
+        old, new = list_scan(lines), matcher_scan(lines)
+        assert set(old) <= set(new), f"{name}: el matcher perdió filas del camino previo"
+        print(f"{name}: recall {len({p for p, _ in old})}/{len(FIXED_PRODUCTS)} -> "
+              f"{len({p for p, _ in new})}/{len(FIXED_PRODUCTS)}")
+
+    lps_old, _ = lines_per_second(args.repeat, list_scan, all_lines)
+    lps_new, _ = lines_per_second(args.repeat, matcher_scan, all_lines)
+    print(f"{len(all_lines)} líneas x {args.repeat}: lista {lps_old:,.0f} líneas/s | "
+          f"matcher {lps_new:,.0f} líneas/s (x{lps_new / lps_old:.2f})")
+
+
+if __name__ == '__main__':
+    main()
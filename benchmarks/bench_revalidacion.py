@@ -0,0 +1,46 @@
+"""Benchmark: caché de PDFs con revalidación condicional (ETag/Last-Modified) contra un servidor local.
+
+Tres pasadas sobre los mismos meses:
+  1. caché vacía: todo se descarga (misses);
+  2. caché vigente (max_age): ninguna solicitud (hits);
+  3. caché vencida (max_age=0): solicitudes condicionales que responden 304 (revalidated).
+
+Uso: python benchmarks/bench_revalidacion.py [--months 60] [--latency 0.05]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from descarga_pdf import PdfBlobCache, PdfFetcher, build_report_url  # noqa: E402
+from servidor_local import LocalReportServer  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--months', type=int, default=60)
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir, LocalReportServer(latency=args.latency) as server:
+        urls = [build_report_url(str(2015 + i // 12), f"{i % 12 + 1:02d}", base_url=server.base_url)
+                for i in range(args.months)]
+        reference = None
+        for label, max_age in (("caché vacía", 3600), ("caché vigente", 3600), ("caché vencida", 0)):
+            fetcher = PdfFetcher(cache=PdfBlobCache(cache_dir, max_age=max_age))
+            served, not_modified = server.requests_served, server.not_modified_served
+            t0 = time.perf_counter()
+            contents = fetcher.fetch_many(urls)
+            elapsed = time.perf_counter() - t0
+            fetcher.close()
+            reference = reference or contents
+            assert contents == reference, "la caché entregó contenidos distintos"
+            print(f"{label:14s}: {elapsed:6.2f} s | solicitudes {server.requests_served - served:3d} "
+                  f"(304: {server.not_modified_served - not_modified:3d}) | {fetcher.cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Servidor HTTP local que imita al del Observatorio Social usando los PDFs de pdf/.
+
+Responde cualquier URL con la estructura del ministerio
+(/storage/docs/cba/nueva_serie/{año}/Valor_CBA_y_LPs_{aa}.{mm}.pdf) entregando
+uno de los PDFs incluidos en el repositorio, con una latencia artificial.
+Emite ETag y Last-Modified y responde 304 a solicitudes condicionales vigentes.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable, List, Optional, Set, Tuple
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PDF_DIR = os.path.join(REPO_DIR, 'pdf')
+LAST_MODIFIED = 'Thu, 22 May 2025 12:00:00 GMT'
+URL_REGEX = re.compile(r"^/storage/docs/cba/nueva_serie/(\d{4})/Valor_CBA_y_LPs_(\d{2})\.(\d{2})\.pdf$")
+
+
+def load_bundled_pdfs(directory: str = PDF_DIR) -> List[bytes]:
+    pdf_files = [f for f in sorted(os.listdir(directory)) if f.lower().endswith('.pdf')]
+    pdfs = []
+    for name in pdf_files:
+        with open(os.path.join(directory, name), 'rb') as fh:
+            pdfs.append(fh.read())
+    return pdfs
+
+
+class LocalReportServer:
+    """Servidor en un hilo de fondo. Usar como context manager; base_url apunta a él."""
+
+    def __init__(self, latency: float = 0.05, missing: Optional[Iterable[Tuple[int, int]]] = None):
+        self.latency = latency
+        self.missing: Set[Tuple[int, int]] = set(missing or [])
+        self.pdfs = load_bundled_pdfs()
+        self.requests_served = 0
+        self.not_modified_served = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def pdf_for(self, year: int, month: int) -> bytes:
+        return self.pdfs[(year * 12 + month) % len(self.pdfs)]
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, como el servidor real
+
+            def do_GET(self):
+                self._respond(send_body=True)
+
+            def do_HEAD(self):
+                self._respond(send_body=False)
+
+            def _respond(self, send_body: bool):
+                with server._lock:
+                    server.requests_served += 1
+                time.sleep(server.latency)
+                match = URL_REGEX.match(self.path)
+                if not match or (int(match.group(1)), int(match.group(3))) in server.missing:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = server.pdf_for(int(match.group(1)), int(match.group(3)))
+                etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+                if self.headers.get('If-None-Match') == etag or (
+                        'If-None-Match' not in self.headers and self.headers.get('If-Modified-Since') == LAST_MODIFIED):
+                    with server._lock:
+                        server.not_modified_served += 1
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', LAST_MODIFIED)
+                self.send_header('Content-Type', 'application/pdf')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+
+            def log_message(self, format, *args):  # silenciar el log por solicitud
+                pass
+
+        return Handler
+
+    def __enter__(self) -> 'LocalReportServer':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,342 @@
+"""Suite offline de los caminos críticos: tiempos, memoria pico, filas/s, líneas base y salidas de referencia.
+
+Casos (todos sin red: PDFs de pdf/, servidor_local.py y datos sintéticos):
+  extraccion  extraccion_pdf.iter_report_dir sobre los PDFs de pdf/ (lo que recorre parser_canasta2.py)
+  carga       ingesta.load_months (ingesta y lectura de get_dataset) con almacén vacío, contra el servidor local
+  acumulada   variación acumulada del año por producto (KPI anual de la app): CumulativeIndex.over_months
+              sobre los meses del último año, con el índice ya construido (cada rerun)
+  indice      acumulados.CumulativeIndex sobre todo el dataset (una vez por versión de los datos)
+  kpis        indicadores.get_presidential_kpis con el índice ya construido (cada rerun)
+  cubo        agregados.build_rollup sobre todo el dataset (una vez por versión de los datos)
+  categorias  variación acumulada por categoría y canasta desde el cubo ya armado (cada rerun)
+  anomalias   deteccion_anomalias.detect_anomalies (z-score, línea base móvil, IsolationForest)
+
+Los casos sintéticos usan BASE_YEARS años de historia con los productos de la
+canasta, multiplicados por cada --escalas (10x = 100 años, 100x = 1.000 años).
+
+Por caso se reporta el mejor tiempo de --repeat corridas, la memoria pico de una
+corrida aparte con tracemalloc (objetos Python y arreglos NumPy/pandas; no ve la
+memoria nativa de pypdfium2) y filas por segundo. El tiempo se compara con
+benchmarks/lineas_base.json y la salida con benchmarks/referencia.json: una
+optimización que cambie los números extraídos o calculados falla la suite
+(código de salida 1). --actualizar reescribe ambos archivos para los casos
+ejecutados; hacerlo sólo cuando un cambio de salida es intencional.
+
+Uso: python benchmarks/suite.py [--casos extraccion carga ...] [--escalas 1 10 100] [--repeat 3]
+                                [--meses 24] [--tolerancia 1.5] [--estricto] [--actualizar]
+"""
+import argparse
+import gc
+import hashlib
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from servidor_local import PDF_DIR, LocalReportServer  # noqa: E402
+
+# --- Configuración ---
+BASELINES_PATH = os.path.join(BENCH_DIR, 'lineas_base.json')
+REFERENCE_PATH = os.path.join(BENCH_DIR, 'referencia.json')
+BASE_YEARS = 10          # historia base de los casos sintéticos (la serie publicada parte en 2015)
+FIRST_YEAR = 2015
+SELECTED_PRODUCTS = 14   # productos "seleccionados" en los KPIs (los de las categorías por defecto)
+PRESIDENCY_MONTHS = 48   # ventana de los KPIs: los últimos 4 años de la historia
+SIGNIFICANT_DIGITS = 10  # dígitos con que se comparan los números de salida
+
+# (función a medir, filas que procesa: un número o una función del resultado)
+Prepared = Tuple[Callable[[], Any], Union[int, Callable[[Any], int]]]
+
+
+class Case(NamedTuple):
+    name: str
+    scaled: bool                           # ¿se repite por cada escala de historia?
+    prepare: Callable[..., Prepared]       # (escala, args) -> Prepared; fuera de la medición
+    summarize: Callable[[Any], Dict]       # resultado -> resumen JSON comparable con la referencia
+
+
+# --- Datos ---
+def synthetic_history(n_years: int, seed: int = 42) -> pd.DataFrame:
+    """Frame compacto (datos.CanastaDataset) con todos los productos de la canasta, n_years años."""
+    from datos import CanastaDataset, compact_frame
+    from extraccion_pdf import FIXED_PRODUCTS
+
+    rng = np.random.default_rng(seed)
+    ordinals = np.arange(n_years * 12) + FIRST_YEAR * 12
+    n_products = len(FIXED_PRODUCTS)
+    df = pd.DataFrame({
+        'year': np.repeat(ordinals // 12, n_products),
+        'mes_num': np.repeat(ordinals % 12 + 1, n_products),
+        'producto': np.tile(FIXED_PRODUCTS, ordinals.size),
+        'variacion': rng.normal(0.3, 2.5, ordinals.size * n_products).round(1),
+    })
+    return CanastaDataset(compact_frame(df)).frame
+
+
+def canonical(value):
+    """Números redondeados a SIGNIFICANT_DIGITS y NaN como None: comparables entre corridas."""
+    if isinstance(value, dict): return {str(k): canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)): return [canonical(v) for v in value]
+    if isinstance(value, (np.generic,)): value = value.item()
+    if isinstance(value, float):
+        if math.isnan(value): return None
+        return float(f"{value:.{SIGNIFICANT_DIGITS}g}")
+    return value
+
+
+def fingerprint(rows: List) -> str:
+    payload = json.dumps(canonical(rows), ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+# --- Casos ---
+def prepare_extraction(scale: int, args) -> Prepared:
+    import pdfplumber, pypdfium2  # noqa: F401,E401 (importaciones diferidas de extraccion_pdf: fuera de la medición)
+    from extraccion_pdf import iter_report_dir
+
+    def run():
+        return [
+            (os.path.basename(name), summary, [(r['producto'], r['variacion']) for r in records])
+            for name, summary, records in iter_report_dir([PDF_DIR], max_workers=1)
+        ]
+    return run, lambda reports: sum(len(rows) for _, _, rows in reports)
+
+
+def summarize_extraction(reports) -> Dict:
+    return {
+        name: {'resumen': canonical(summary), 'variaciones': len(rows), 'huella': fingerprint(rows)}
+        for name, summary, rows in reports
+    }
+
+
+def prepare_load(scale: int, args) -> Prepared:
+    # descarga_pdf lee CBA_BASE_URL al importarse: main() ya apuntó la variable al servidor local
+    import pdfplumber, pypdfium2, requests  # noqa: F401,E401 (importaciones diferidas: fuera de la medición)
+    from almacen_meses import ParsedMonthStore
+    from descarga_pdf import PdfFetcher
+    from ingesta import IngestionLedger, load_months
+
+    months = [(FIRST_YEAR + i // 12, i % 12 + 1) for i in range(args.meses)]
+
+    def run():
+        tmp_dir = tempfile.mkdtemp(prefix='suite_carga_')
+        fetcher = PdfFetcher(cache=None)
+        try:
+            store = ParsedMonthStore(os.path.join(tmp_dir, 'meses.parquet'))
+            ledger = IngestionLedger(os.path.join(tmp_dir, 'ingesta.json'))
+            return load_months(months, fetcher.fetch, store, ledger, fetcher.max_workers)
+        finally:
+            fetcher.close()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    return run, len
+
+
+def summarize_load(df: pd.DataFrame) -> Dict:
+    rows = sorted(zip(df['year'].tolist(), df['mes_num'].tolist(), df['producto'].astype(str), df['variacion'].astype(float)))
+    return {'filas': len(rows), 'meses': int(df.groupby(['year', 'mes_num']).ngroups), 'huella': fingerprint(rows)}
+
+
+def prepare_cumulative(scale: int, args) -> Prepared:
+    from acumulados import CumulativeIndex
+    from indicadores import months_in
+
+    df = synthetic_history(BASE_YEARS * scale)
+    index = CumulativeIndex(df)
+    current_year = df[df['year'] == df['year'].max()]
+    return (lambda: index.over_months(months_in(current_year)).dropna().to_dict()), len(current_year)
+
+
+def summarize_by_product(values: Dict[str, float]) -> Dict:
+    ordered = sorted(values.items())
+    return {'productos': len(ordered), 'huella': fingerprint(ordered), 'primero': canonical(list(ordered[0]))}
+
+
+def prepare_index(scale: int, args) -> Prepared:
+    from acumulados import CumulativeIndex
+
+    df = synthetic_history(BASE_YEARS * scale)
+    first, last = int(df['year'].min()) * 12, int(df['year'].max()) * 12 + 11
+    return (lambda: CumulativeIndex(df).window(first, last).to_dict()), len(df)
+
+
+def prepare_kpis(scale: int, args) -> Prepared:
+    from acumulados import CumulativeIndex
+    from datos import PERIOD_COLUMN
+    from indicadores import get_presidential_kpis
+
+    df = synthetic_history(BASE_YEARS * scale)
+    index = CumulativeIndex(df)
+    selected = sorted(df['producto'].astype(str).unique())[:SELECTED_PRODUCTS]
+    scope = df[df[PERIOD_COLUMN] > df[PERIOD_COLUMN].max() - PRESIDENCY_MONTHS]
+    presidency = scope[scope['producto'].isin(selected)]
+    return (lambda: get_presidential_kpis(presidency, scope, selected, index)), len(scope)
+
+
+def prepare_rollup(scale: int, args) -> Prepared:
+    from agregados import build_rollup
+
+    df = synthetic_history(BASE_YEARS * scale)
+    return (lambda: build_rollup(df)), len(df)
+
+
+def summarize_rollup(cube: pd.DataFrame) -> Dict:
+    rows = list(zip(cube['categoria'].astype(str), cube['periodo_ord'].tolist(), cube['productos'].tolist(),
+                    *(cube[c].round(8).tolist() for c in ['media', 'mediana', 'minimo', 'maximo', 'indice'])))
+    return {'filas': len(rows), 'huella': fingerprint(rows), 'ultimo': canonical(list(rows[-1]))}
+
+
+def prepare_categories(scale: int, args) -> Prepared:
+    from agregados import build_rollup, category_cumulative, rollup_months
+    from datos import PERIOD_COLUMN
+
+    df = synthetic_history(BASE_YEARS * scale)
+    cube = build_rollup(df)
+    last = int(df[PERIOD_COLUMN].max())
+    months = range(last - PRESIDENCY_MONTHS + 1, last + 1)
+    return (lambda: category_cumulative(rollup_months(cube, months)).to_dict()), len(cube)
+
+
+def prepare_anomalies(scale: int, args) -> Prepared:
+    import sklearn.ensemble  # noqa: F401 (importación diferida de detect_anomalies: fuera de la medición)
+    from deteccion_anomalias import detect_anomalies
+
+    df = synthetic_history(BASE_YEARS * scale)[['year', 'mes_num', 'producto', 'variacion']]
+    return (lambda: detect_anomalies(df)), len(df)
+
+
+def summarize_anomalies(df: pd.DataFrame) -> Dict:
+    from deteccion_anomalias import ANOMALY_FLAGS
+
+    votes = df['anomaly_votes'].to_numpy(dtype=np.int8)
+    return {
+        **{flag: int(df[flag].sum()) for flag in ANOMALY_FLAGS},
+        'votos': {str(v): int(n) for v, n in zip(*np.unique(votes, return_counts=True))},
+        'huella': hashlib.sha256(votes.tobytes()).hexdigest()[:16],
+        'z_score': fingerprint(df['z_score'].round(8).tolist()),
+    }
+
+
+CASES = [
+    Case('extraccion', False, prepare_extraction, summarize_extraction),
+    Case('carga', False, prepare_load, summarize_load),
+    Case('acumulada', True, prepare_cumulative, summarize_by_product),
+    Case('indice', True, prepare_index, summarize_by_product),
+    Case('kpis', True, prepare_kpis, canonical),
+    Case('cubo', True, prepare_rollup, summarize_rollup),
+    Case('categorias', True, prepare_categories, summarize_by_product),
+    Case('anomalias', True, prepare_anomalies, summarize_anomalies),
+]
+
+
+# --- Medición ---
+def measure(fn: Callable[[], Any], repeat: int) -> Tuple[float, float, Any]:
+    """(mejor tiempo en s, memoria pico en MiB, resultado). La memoria se mide en una corrida aparte."""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(times), peak / 2**20, result
+
+
+def differences(expected, actual, path: str = '') -> List[str]:
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        out = []
+        for key in sorted(set(expected) | set(actual)):
+            out += differences(expected.get(key), actual.get(key), f"{path}/{key}")
+        return out
+    return [] if expected == actual else [f"{path or '/'}: {expected!r} -> {actual!r}"]
+
+
+def load_json(path: str) -> Dict:
+    try:
+        with open(path, encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_json(path: str, data: Dict) -> None:
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(data, fh, indent=1, sort_keys=True, ensure_ascii=False)
+        fh.write('\n')
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--casos', nargs='+', choices=[c.name for c in CASES], default=[c.name for c in CASES])
+    parser.add_argument('--escalas', type=int, nargs='+', default=[1, 10, 100], help='multiplicadores de la historia sintética')
+    parser.add_argument('--repeat', type=int, default=3, help='corridas medidas por caso (se reporta la mejor)')
+    parser.add_argument('--meses', type=int, default=24, help='meses que descarga y parsea el caso carga')
+    parser.add_argument('--tolerancia', type=float, default=1.5, help='razón tiempo/línea base que se marca como regresión')
+    parser.add_argument('--estricto', action='store_true', help='las regresiones de tiempo también fallan la suite')
+    parser.add_argument('--actualizar', action='store_true', help='reescribir líneas base y referencias de los casos ejecutados')
+    args = parser.parse_args()
+
+    baselines = load_json(BASELINES_PATH)
+    references = load_json(REFERENCE_PATH)
+    failures = regressions = 0
+    print(f"{'caso':<16} {'filas':>10} {'tiempo':>10} {'filas/s':>12} {'pico MiB':>9} {'vs base':>8}  salida")
+    with LocalReportServer(latency=0.0) as server:
+        os.environ['CBA_BASE_URL'] = server.base_url
+        for case in (c for c in CASES if c.name in args.casos):
+            for scale in (args.escalas if case.scaled else [1]):
+                key = f"{case.name}@{scale}x" if case.scaled else case.name
+                fn, n_rows = case.prepare(scale, args)
+                seconds, peak_mib, result = measure(fn, args.repeat)
+                if callable(n_rows): n_rows = n_rows(result)
+                summary = canonical(case.summarize(result))
+
+                base = baselines.get('casos', {}).get(key)
+                ratio = seconds / base['s'] if base else None
+                slower = ratio is not None and ratio > args.tolerancia
+                regressions += slower
+                diffs = differences(references[key], summary) if key in references else []
+                status = 'sin referencia' if key not in references else ('ok' if not diffs else f"DISTINTA ({len(diffs)})")
+                failures += bool(diffs)
+                ratio_text = f"x{ratio:.2f}{' ⚠️' if slower else ''}" if ratio is not None else '-'
+                print(f"{key:<16} {n_rows:>10,} {seconds * 1000:>8.1f}ms {n_rows / seconds:>12,.0f} "
+                      f"{peak_mib:>9.1f} {ratio_text:>8}  {status}")
+                for line in diffs[:5]:
+                    print(f"    {line}")
+
+                if args.actualizar:
+                    baselines.setdefault('casos', {})[key] = {
+                        's': round(seconds, 6), 'pico_mib': round(peak_mib, 2), 'filas_s': round(n_rows / seconds)
+                    }
+                    references[key] = summary
+
+    if args.actualizar:
+        baselines['maquina'] = f"{platform.machine()} {platform.python_version()} {os.cpu_count()} CPU(s)"
+        save_json(BASELINES_PATH, baselines)
+        save_json(REFERENCE_PATH, references)
+        print(f"✅ Líneas base y referencias actualizadas ({BASELINES_PATH}, {REFERENCE_PATH})")
+    if failures or (args.estricto and regressions):
+        print(f"❌ {failures} salida(s) distinta(s) de la referencia, {regressions} regresión(es) de tiempo")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
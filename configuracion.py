@@ -0,0 +1,109 @@
+"""Configuración estática del dashboard, derivada una sola vez por proceso.
+
+Las categorías de productos y sus listas ordenadas no dependen de los filtros:
+se arman al importar el módulo. Lo que depende de la fecha (meses publicados,
+periodo presidencial en curso) se calcula por día con lru_cache, así que un
+rerun de streamlit_app.py sólo consulta estructuras ya construidas. Los dicts
+y listas retornados se comparten entre reruns y sesiones: no modificarlos.
+"""
+import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from extraccion_pdf import FIXED_PRODUCTS
+
+START_YEAR_DATA = 2015
+DATA_AVAILABLE_DAY = 20 # Asumir que los datos del mes anterior están disponibles después del día 20
+
+PRODUCT_CATEGORIES = {
+    "Cereales y Harinas": ["Arroz", "Harina de trigo", "Avena", "Espiral"],
+    "Panadería y Masas": ["Pan corriente sin envasar", "Torta 15 o 20 personas", "Prepizza familiar", "Biscochos dulces y medialunas", "Tostadas (palta o mantequilla o mermelada o mezcla de estas)"],
+    "Carnes Rojas y Procesados": ["Carne molida", "Chuleta de cerdo centro o vetada", "Costillar de cerdo", "Pulpa de cerdo", "Jamón de cerdo", "Longaniza", "Salchicha y vienesa tradicional", "Pate", "Aliado (jamón queso) o Barros Jarpa", "Asiento"],
+    "Aves y Derivados": ["Pollo entero", "Pechuga de pollo", "Trutro de pollo", "Carne de pavo molida", "Salchicha y vienesa de ave", "Pollo asado entero"],
+    "Cordero": ["Pulpa de cordero fresco o refrigerado"],
+    "Pescados y Mariscos": ["Merluza fresca o refrigerada", "Choritos frescos o refrigerados en su concha", "Jurel en conserva", "Surtido en conserva"],
+    "Lácteos y Huevos": ["Leche líquida entera", "Leche en polvo entera instantánea", "Yogurt", "Queso Gouda", "Quesillo y queso fresco con sal", "Queso crema", "Mantequilla con sal", "Margarina", "Huevo de gallina"],
+    "Aceites y Grasas": ["Aceite vegetal combinado o puro"],
+    "Frutas": ["Plátano", "Manzana", "Limón", "Palta"],
+    "Legumbres y Frutos Secos": ["Poroto", "Lenteja", "Maní salado"],
+    "Verduras y Tubérculos": ["Lechuga", "Zapallo", "Tomate", "Zanahoria", "Cebolla nueva", "Papa de guarda", "Choclo congelado"],
+    "Azúcares y Dulces": ["Azúcar", "Chocolate", "Caramelo", "Helado familiar un sabor", "Galleta dulce"],
+    "Snacks Salados": ["Galleta no dulce", "Papas fritas"],
+    "Salsas y Condimentos": ["Salsa de tomate"],
+    "Bebestibles (Café, Té)": ["Sucedáneo de café", "Te para preparar", "Té corriente"],
+    "Bebidas Frías y Refrescos": ["Agua mineral", "Bebida gaseosa tradicional", "Bebida energizante", "Refresco isotónico", "Jugo líquido", "Néctar líquido", "Refresco en polvo"],
+    "Comidas Preparadas y Rápidas": ["Completo", "Entrada (ensalada o sopa)", "Postre para almuerzo", "Promoción de comida rápida", "Empanada de horno", "Colación o menú del día o almuerzo ejecutivo", "Plato de fondo para almuerzo"],
+    "Sin Categoría": [] # Se pobla más abajo con los productos no categorizados
+}
+
+
+# Poblar "Sin Categoría"
+_categorized_products = {prod for cat_prods in PRODUCT_CATEGORIES.values() for prod in cat_prods}
+PRODUCT_CATEGORIES["Sin Categoría"] = sorted(p for p in FIXED_PRODUCTS if p not in _categorized_products)
+
+# Categorías activas (con productos presentes en FIXED_PRODUCTS)
+ACTIVE_PRODUCT_CATEGORIES: Dict[str, List[str]] = {
+    cat: prods for cat, prods in (
+        (cat, sorted(p for p in prods if p in FIXED_PRODUCTS)) for cat, prods in PRODUCT_CATEGORIES.items()
+    ) if prods
+}
+CATEGORY_OPTIONS = sorted(ACTIVE_PRODUCT_CATEGORIES)
+DEFAULT_CATEGORIES = [cat for cat in ["Panadería y Masas", "Lácteos y Huevos"] if cat in CATEGORY_OPTIONS]
+ALL_PRODUCTS = sorted(FIXED_PRODUCTS)
+
+
+@lru_cache(maxsize=256)
+def products_for_categories(categories: Tuple[str, ...]) -> List[str]:
+    """Productos (ordenados, sin repetir) de las categorías elegidas; todos si no hay ninguna."""
+    if not categories: return ALL_PRODUCTS
+    return sorted({p for cat in categories for p in ACTIVE_PRODUCT_CATEGORIES.get(cat, [])})
+
+
+@lru_cache(maxsize=2)
+def max_years_config(today: datetime.date) -> Dict[str, List[str]]:
+    """{año: [meses "MM"]} con todos los meses que pueden estar publicados a la fecha."""
+    current_year = today.year
+    config: Dict[str, List[str]] = {}
+    for year_num in range(START_YEAR_DATA, current_year + 1):
+        year_str = str(year_num)
+        if year_num < current_year:
+            config[year_str] = [f"{i:02d}" for i in range(1, 13)]
+        else:
+            current_month_for_data = today.month
+            if today.day < DATA_AVAILABLE_DAY:
+                current_month_for_data -= 1
+            if current_month_for_data == 0:
+                if str(current_year - 1) in config:
+                     config[str(current_year - 1)] = [f"{i:02d}" for i in range(1, 13)]
+                config[year_str] = [] # No agregar meses para el año actual si es Enero muy temprano
+            else:
+                config[year_str] = [f"{i:02d}" for i in range(1, current_month_for_data + 1)]
+    return config
+
+
+def presidential_periods(today: datetime.date) -> Dict[str, Optional[Dict]]:
+    return {
+        "Todos los Periodos": None,
+        "Gabriel Boric (Mar 2022 - Actualidad)": {"start_year": 2022, "start_month": 3, "end_year": today.year, "end_month": today.month},
+        "Sebastián Piñera II (Mar 2018 - Mar 2022)": {"start_year": 2018, "start_month": 3, "end_year": 2022, "end_month": 3},
+        "Michelle Bachelet II (Mar 2014 - Mar 2018)": {"start_year": 2014, "start_month": 3, "end_year": 2018, "end_month": 3},
+        # Añadir más periodos si START_YEAR_DATA lo permite y se tienen los datos
+    }
+
+
+@lru_cache(maxsize=2)
+def valid_presidential_periods(today: datetime.date) -> Dict[str, Optional[Dict]]:
+    """Periodos presidenciales recortados a los años desde START_YEAR_DATA."""
+    valid = {"Todos los Periodos": None}
+    for name, details in presidential_periods(today).items():
+        if name == "Todos los Periodos": continue
+        if details and details["end_year"] >= START_YEAR_DATA:
+            # Ajustar el año de inicio si es anterior a START_YEAR_DATA
+            if details["start_year"] < START_YEAR_DATA:
+                adjusted_details = details.copy()
+                adjusted_details["start_year"] = START_YEAR_DATA
+                adjusted_details["start_month"] = 1 # Empezar desde enero del START_YEAR_DATA
+                valid[name] = adjusted_details
+            else:
+                valid[name] = details
+    return valid
@@ -0,0 +1,209 @@
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from acumulados import CumulativeIndex, period_ordinal
+from extraccion_pdf import FIXED_PRODUCTS, NUM2MONTH
+from metricas import current_metrics
+
+# --- Esquema compacto en memoria ---
+# Categorías en orden alfabético: ordenar o agrupar por código da el mismo orden que por texto
+PRODUCT_DTYPE = pd.CategoricalDtype(sorted(FIXED_PRODUCTS))
+MONTH_NAMES = list(NUM2MONTH.values())
+MONTH_DTYPE = pd.CategoricalDtype(MONTH_NAMES, ordered=True)
+PERIOD_COLUMN = "periodo_ord"  # ordinal entero del mes (year * 12 + mes - 1)
+COMPACT_COLUMNS = ["year", "mes_num", "mes", "producto", "variacion", PERIOD_COLUMN]
+
+
+def _frame_from_arrays(years, months, product_codes, values) -> pd.DataFrame:
+    return pd.DataFrame({
+        "year": years,
+        "mes_num": months,
+        "mes": pd.Categorical.from_codes(months.astype(np.int8) - 1, dtype=MONTH_DTYPE),
+        "producto": pd.Categorical.from_codes(product_codes, dtype=PRODUCT_DTYPE),
+        "variacion": values,
+        PERIOD_COLUMN: period_ordinal(years.astype(np.int32), months.astype(np.int32)),
+    })
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Convierte filas (year, mes_num, mes, producto, variacion) al esquema compacto.
+
+    producto y mes pasan a categóricos, year/mes_num a int16/int8, variacion a
+    float32, y se agrega el ordinal entero del periodo. Un producto fuera de
+    FIXED_PRODUCTS se descarta (el parser nunca los emite).
+    """
+    if df.empty:
+        return _frame_from_arrays(np.empty(0, np.int16), np.empty(0, np.int8),
+                                  np.empty(0, np.int8), np.empty(0, np.float32))
+    codes = pd.Categorical(df["producto"], dtype=PRODUCT_DTYPE).codes
+    known = codes >= 0
+    return _frame_from_arrays(
+        df["year"].to_numpy(dtype=np.int16)[known],
+        df["mes_num"].to_numpy(dtype=np.int8)[known],
+        codes[known],
+        df["variacion"].to_numpy(dtype=np.float32)[known],
+    )
+
+
+def rows_to_frame(batches: Sequence[List[Dict]]) -> pd.DataFrame:
+    """Arma el frame compacto desde lotes de filas del parser, llenando arreglos prealocados.
+
+    Evita el DataFrame intermedio de dicts (una columna object por campo): el
+    tamaño total se conoce de antemano y cada fila se escribe en su posición.
+    """
+    n_rows = sum(len(batch) for batch in batches)
+    years = np.empty(n_rows, dtype=np.int16)
+    months = np.empty(n_rows, dtype=np.int8)
+    product_codes = np.empty(n_rows, dtype=np.int8)
+    values = np.empty(n_rows, dtype=np.float32)
+    code_of = {name: code for code, name in enumerate(PRODUCT_DTYPE.categories)}
+    i = 0
+    with current_metrics().timer("armado_frame", filas=n_rows):
+        for batch in batches:
+            for row in batch:
+                code = code_of.get(row["producto"])
+                if code is None: continue
+                years[i] = row["year"]
+                months[i] = row["mes_num"]
+                product_codes[i] = code
+                values[i] = row["variacion"]
+                i += 1
+        return _frame_from_arrays(years[:i], months[:i], product_codes[:i], values[:i])
+
+
+def period_labels(ordinals: Iterable[int]) -> List[str]:
+    """Etiquetas "2024 Enero" para ordinales de mes; sólo para mostrar, el orden va por el ordinal."""
+    return [f"{o // 12} {MONTH_NAMES[o % 12]}" for o in ordinals]
+
+
+class CanastaDataset:
+    """Dataset normalizado completo, cargado una vez por proceso y consultado en memoria.
+
+    Las filas se guardan en el esquema compacto (ver compact_frame) ordenadas
+    por el ordinal del mes, así que un rango de meses es un slice posicional
+    (searchsorted), una vista sin copia. Los filtros de la barra lateral
+    (periodo presidencial, años, meses, productos) se aplican en un solo paso
+    sobre esa vista (filter): sólo se materializan las filas filtradas, sin
+    volver a cargar ni generar nuevas entradas de caché.
+    """
+
+    def __init__(self, df: pd.DataFrame, version: Optional[str] = None, rollup: Optional[pd.DataFrame] = None):
+        with current_metrics().timer("dataset", filas=len(df)):
+            if PERIOD_COLUMN not in df.columns:
+                df = compact_frame(df)
+            ordinals = df[PERIOD_COLUMN].to_numpy()
+            if (np.diff(ordinals) < 0).any():
+                order = np.argsort(ordinals, kind="stable")  # conserva el orden original dentro de cada mes
+                df, ordinals = df.iloc[order], ordinals[order]
+            if not df.index.equals(pd.RangeIndex(len(df))):
+                df = df.reset_index(drop=True)
+            # Un frame ya ordenado (p. ej. una instantánea mapeada en memoria) se usa tal cual, sin copiar
+            self.frame = df
+            self._ordinals = ordinals
+        self._cumulative_index = None
+        self._anomaly_scores = None
+        self._anomaly_lock = threading.Lock()
+        self._rollup = rollup
+        self._version = version
+
+    @property
+    def empty(self) -> bool:
+        return self.frame.empty
+
+    @property
+    def version(self) -> str:
+        """Hash estable del contenido: identifica esta versión del dataset en claves de caché e instantáneas."""
+        if self._version is None:
+            row_hashes = pd.util.hash_pandas_object(self.frame, index=False).to_numpy()
+            self._version = hashlib.sha256(row_hashes.tobytes()).hexdigest()[:16]
+        return self._version
+
+    @property
+    def cumulative_index(self) -> CumulativeIndex:
+        """Índice de prefijos sobre todo el dataset (se construye en el primer uso)."""
+        if self._cumulative_index is None:
+            self._cumulative_index = CumulativeIndex(self.frame)
+        return self._cumulative_index
+
+    @property
+    def rollup(self) -> pd.DataFrame:
+        """Cubo de agregados por categoría y canasta completa (agregados.build_rollup), uno por versión.
+
+        Lo arma el primer uso o lo trae la instantánea publicada junto al dataset.
+        """
+        if self._rollup is None:
+            from agregados import build_rollup  # agregados importa este módulo
+            self._rollup = build_rollup(self.frame)
+        return self._rollup
+
+    @property
+    def anomaly_scores(self) -> pd.DataFrame:
+        """Puntajes y flags de deteccion_anomalias por fila del frame (se calculan en el primer uso).
+
+        Como el dataset vive en st.cache_resource, IsolationForest se ajusta una
+        vez por versión del dataset: en el rerun de la primera sesión que activa
+        la capa (~0,5 s con la historia real, más la importación de
+        scikit-learn). Las demás sesiones que la pidan a la vez esperan ese
+        ajuste en vez de repetirlo. Se alinea con las vistas por índice:
+        scores.loc[vista.index].
+        """
+        if self._anomaly_scores is None:
+            with self._anomaly_lock:
+                if self._anomaly_scores is None:
+                    from deteccion_anomalias import SCORE_COLUMNS, detect_anomalies  # scikit-learn sólo si se usa la capa
+                    self._anomaly_scores = detect_anomalies(self.frame)[SCORE_COLUMNS]
+        return self._anomaly_scores
+
+    def present_months(self, ordinals: Iterable[int]) -> np.ndarray:
+        """Ordinales del conjunto que tienen filas, sin tocar el frame (búsqueda binaria sobre los ordinales)."""
+        ordinals = np.unique(np.asarray(list(ordinals), dtype=np.int64))
+        lo = np.searchsorted(self._ordinals, ordinals, side="left")
+        hi = np.searchsorted(self._ordinals, ordinals, side="right")
+        return ordinals[hi > lo]
+
+    def months(self, ordinals: Iterable[int]) -> pd.DataFrame:
+        """Filas de un conjunto de meses (ordinales), en orden cronológico."""
+        return self.filter(ordinals)
+
+    def filter(self, ordinals: Iterable[int], products: Optional[Iterable[str]] = None,
+               month_names: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Filas de un conjunto de meses y, opcionalmente, de algunos productos y nombres de mes.
+
+        Los meses acotan un slice posicional (vista sin copia) entre el primero y
+        el último; los huecos entre tramos y los demás filtros se aplican como
+        una sola máscara sobre esa vista. Si la máscara no descarta filas se
+        retorna la vista; si no, sólo se copian las filas que pasan.
+        """
+        ordinals = np.unique(np.asarray(list(ordinals), dtype=np.int64))
+        if ordinals.size == 0 or self.frame.empty:
+            return self.frame.iloc[0:0]
+        lo = int(np.searchsorted(self._ordinals, ordinals[0], side="left"))
+        hi = int(np.searchsorted(self._ordinals, ordinals[-1], side="right"))
+        view = self.frame.iloc[lo:hi]
+        mask = np.ones(hi - lo, dtype=bool)
+        if ordinals[-1] - ordinals[0] + 1 != ordinals.size:  # tramos no contiguos
+            mask &= np.isin(self._ordinals[lo:hi], ordinals)
+        if products is not None:
+            wanted = PRODUCT_DTYPE.categories.get_indexer(list(products))
+            mask &= np.isin(view["producto"].cat.codes.to_numpy(), wanted[wanted >= 0])
+        if month_names is not None:
+            wanted = MONTH_DTYPE.categories.get_indexer(list(month_names))
+            mask &= np.isin(view["mes"].cat.codes.to_numpy(), wanted[wanted >= 0])
+        return view if mask.all() else view[mask]
+
+    def scope(self, years_config: Dict[str, List[str]]) -> pd.DataFrame:
+        """Filas de los meses de una configuración {año: [meses]} como la que arma la barra lateral."""
+        return self.months(scope_ordinals(years_config))
+
+
+def scope_ordinals(years_config: Dict[str, List[str]]) -> List[int]:
+    """Ordinales de los meses de una configuración {año: [meses]} de la barra lateral."""
+    return [
+        period_ordinal(int(year_str), int(mm_str))
+        for year_str, months in years_config.items()
+        for mm_str in (months or [])
+    ]
@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, TypeVar
+from urllib.parse import urlsplit
+
+from metricas import current_metrics
+
+if TYPE_CHECKING:
+    import requests
+
+T = TypeVar("T")
+
+# --- Configuración ---
+# Se puede apuntar a otro servidor (p. ej. un espejo local para benchmarks) con CBA_BASE_URL
+BASE_URL = os.environ.get("CBA_BASE_URL", "https://observatorio.ministeriodesarrollosocial.gob.cl")
+DEFAULT_MAX_WORKERS = int(os.environ.get("CBA_FETCH_WORKERS", "8"))
+REQUEST_TIMEOUT = 20          # segundos por solicitud
+MAX_RETRIES = 3               # reintentos ante errores transitorios
+RETRY_STATUS = {429, 500, 502, 503, 504}
+NOT_PUBLISHED_STATUS = {404, 410}  # el informe aún no existe; otro error no dice nada sobre su publicación
+PDF_CACHE_DIR = os.path.join(
+    os.environ.get("CBA_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")), "pdf"
+)
+PDF_CACHE_MAX_AGE = 3600 * 12  # segundos en que un PDF cacheado se usa sin revalidar
+
+
+def build_report_url(year_str: str, mm_str: str, base_url: str = BASE_URL) -> str:
+    """Construye la URL del informe mensual publicado por el Observatorio Social."""
+    return (
+        f"{base_url}"
+        f"/storage/docs/cba/nueva_serie/{year_str}"
+        f"/Valor_CBA_y_LPs_{year_str[2:]}.{mm_str}.pdf"
+    )
+
+
+class FetchFailed(Exception):
+    """La descarga falló (red, timeout, 5xx tras los reintentos, respuesta que no es un PDF).
+
+    A diferencia de un None (informe no publicado), no indica nada sobre el mes:
+    la ingesta lo reintenta pronto en vez de tratarlo como faltante.
+    """
+
+
+class HostBackoff:
+    """Espera exponencial compartida por host: un error transitorio frena a todos los hilos que apuntan a ese host."""
+
+    def __init__(self, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._failures: Dict[str, int] = {}
+        self._not_before: Dict[str, float] = {}
+
+    def wait(self, host: str) -> None:
+        with self._lock:
+            delay = self._not_before.get(host, 0.0) - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def penalize(self, host: str, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            delay = retry_after if retry_after is not None else self.base_delay * 2 ** (failures - 1)
+            delay = min(delay, self.max_delay)
+            self._not_before[host] = max(self._not_before.get(host, 0.0), time.monotonic() + delay)
+
+    def reset(self, host: str) -> None:
+        with self._lock:
+            self._failures.pop(host, None)
+
+
+def fetch_concurrently(
+    urls: Iterable[str],
+    fetch_fn: Callable[[str], T],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> List[T]:
+    """Aplica fetch_fn a cada URL con un pool acotado de hilos. Conserva el orden de entrada."""
+    urls = list(urls)
+    if not urls: return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls)))) as pool:
+        return list(pool.map(fetch_fn, urls))
+
+
+class PdfBlobCache:
+    """Caché local de PDFs direccionada por contenido, con validadores HTTP.
+
+    Cada PDF se guarda una sola vez como blobs/<sha256>.pdf; un índice JSON asocia
+    cada URL a su blob, su ETag/Last-Modified y la hora de la última validación.
+    Dentro de max_age el blob se entrega sin red (hit); después se revalida con
+    If-None-Match/If-Modified-Since y un 304 reutiliza el blob (revalidated).
+    """
+
+    def __init__(self, directory: str = PDF_CACHE_DIR, max_age: float = PDF_CACHE_MAX_AGE):
+        self.directory = directory
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(directory, "index.json")
+        self._index: Dict[str, Dict] = {}
+        self._stats = {"hits": 0, "misses": 0, "revalidated": 0}
+        try:
+            with open(self._index_path, encoding="utf-8") as fh:
+                self._index = json.load(fh)
+        except (OSError, ValueError):
+            pass
+
+    def _blob_path(self, sha: str) -> str:
+        return os.path.join(self.directory, "blobs", f"{sha}.pdf")
+
+    def entry(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            return self._index.get(url)
+
+    def is_fresh(self, entry: Dict) -> bool:
+        return time.time() - entry["validated_at"] < self.max_age
+
+    def read(self, entry: Dict) -> Optional[bytes]:
+        try:
+            with open(self._blob_path(entry["sha256"]), "rb") as fh:
+                return fh.read()
+        except OSError:
+            return None
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+        headers = {}
+        if entry and entry.get("etag"): headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"): headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            self._stats[outcome] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def mark_revalidated(self, url: str) -> None:
+        with self._lock:
+            self._index[url]["validated_at"] = time.time()
+            self._save_index()
+
+    def put(self, url: str, content: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+        sha = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(sha)
+        try:
+            if not os.path.exists(path):  # contenido idéntico bajo otra URL: se reutiliza el blob
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+                with open(tmp_path, "wb") as fh:
+                    fh.write(content)
+                os.replace(tmp_path, path)
+        except OSError:
+            return
+        with self._lock:
+            self._index[url] = {
+                "sha256": sha, "etag": etag, "last_modified": last_modified, "validated_at": time.time(),
+            }
+            self._save_index()
+
+    def _save_index(self) -> None:
+        try:
+            tmp_path = f"{self._index_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump(self._index, fh)
+            os.replace(tmp_path, self._index_path)
+        except OSError:
+            pass
+
+
+class PdfFetcher:
+    """Descarga PDFs sobre una única requests.Session (conexiones keep-alive reutilizadas entre hilos)."""
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        timeout: float = REQUEST_TIMEOUT,
+        max_retries: int = MAX_RETRIES,
+        backoff: Optional[HostBackoff] = None,
+        cache: Optional[PdfBlobCache] = None,
+    ):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff or HostBackoff()
+        self.cache = cache
+        import requests  # la pila HTTP sólo se carga cuando hay algo que descargar
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        # Un slot de conexión por hilo para que el pool no serialice las descargas
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(max_workers, 1))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def fetch(self, url: str) -> Optional[bytes]:
+        """Retorna el contenido del PDF o None si no está publicado (404/410).
+
+        Levanta FetchFailed si la descarga falla tras los reintentos.
+        """
+        with current_metrics().timer("descarga", url=url):
+            return self._fetch(url)
+
+    def _fetch(self, url: str) -> Optional[bytes]:
+        metrics = current_metrics()
+        entry = self.cache.entry(url) if self.cache else None
+        if entry and self.cache.is_fresh(entry):
+            content = self.cache.read(entry)
+            if content is not None:
+                self.cache.count("hits")
+                metrics.count("descarga_cache_hits")
+                return content
+            entry = None  # Blob perdido: descargar de nuevo sin condiciones
+        import requests
+        host = urlsplit(url).netloc
+        last_error = "304 sin copia local"
+        for _ in range(self.max_retries + 1):
+            self.backoff.wait(host)
+            try:
+                r = self.session.get(url, timeout=self.timeout, headers=PdfBlobCache.conditional_headers(entry))
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exc:
+                self.backoff.penalize(host)
+                last_error = type(exc).__name__
+                continue
+            except requests.exceptions.RequestException as exc:
+                metrics.fail(url, f"{type(exc).__name__}: {exc}")
+                raise FetchFailed(url) from exc
+            metrics.count(f"descarga_http_{r.status_code}")
+            if r.status_code in RETRY_STATUS:
+                last_error = f"HTTP {r.status_code}"
+                self.backoff.penalize(host, _retry_after_seconds(r))
+                continue
+            self.backoff.reset(host)
+            if r.status_code == 304 and entry:
+                content = self.cache.read(entry)
+                if content is not None:
+                    self.cache.mark_revalidated(url)
+                    self.cache.count("revalidated")
+                    metrics.count("descarga_revalidadas")
+                    return content
+                entry = None
+                continue
+            if r.status_code in NOT_PUBLISHED_STATUS: return None  # el informe aún no se publica
+            if not r.ok or b"%PDF" not in r.content[:1024]:  # otro error, o una página de error servida con 200
+                metrics.fail(url, f"HTTP {r.status_code}" if not r.ok else "la respuesta no es un PDF")
+                raise FetchFailed(url)
+            if self.cache:
+                self.cache.put(url, r.content, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+                self.cache.count("misses")
+            metrics.count("descarga_bytes", len(r.content))
+            return r.content
+        metrics.fail(url, f"sin respuesta tras {self.max_retries + 1} intentos ({last_error})")
+        raise FetchFailed(url)
+
+    def fetch_or_none(self, url: str) -> Optional[bytes]:
+        """Como fetch, pero una descarga fallida también retorna None (la falla queda en las métricas)."""
+        try:
+            return self.fetch(url)
+        except FetchFailed:
+            return None
+
+    def fetch_many(self, urls: Iterable[str]) -> Dict[str, Optional[bytes]]:
+        urls = list(urls)
+        return dict(zip(urls, fetch_concurrently(urls, self.fetch_or_none, self.max_workers)))
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def _retry_after_seconds(response: "requests.Response") -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
@@ -1,41 +1,391 @@
+"""Detección de anomalías en las variaciones mensuales por producto.
+
+Motor por lotes sobre toda la historia: z-score por producto, desvío contra una
+línea base móvil (últimos ROLLING_WINDOW meses) y contra la estacionalidad del
+producto (mismo mes calendario), umbral absoluto, e IsolationForest sobre esas
+variables. Todo vectorizado (sin funciones Python por grupo).
+
+Modo en línea (--en-linea, sobre el almacén de la app): mantiene por producto
+estadísticas acumuladas (media/varianza de Welford, EWMA y los últimos
+ROLLING_WINDOW valores para cuantiles) persistidas en
+cache/anomalias_estado.json, junto con el hash de PDF de cada mes puntuado.
+Los meses nuevos o re-ingeridos salen del registro de ingesta (ingesta.py),
+así que cada ejecución lee y puntúa sólo sus filas, en O(productos) por mes,
+y agrega sus anomalías a output/anomalias_en_linea.csv (un mes re-ingerido
+reemplaza sus filas). Un mes anterior al último puntuado (un faltante que
+llegó tarde, un mes de la semilla reemplazado por su PDF) hace recorrer de
+nuevo la historia de ese producto. --reconstruir descarta el estado y recorre
+toda la historia; también se reconstruye si el estado o el CSV faltan o el
+CSV tiene otro encabezado.
+
+Uso: python deteccion_anomalias.py [--fuente output|almacen] [--en-linea [--reconstruir]]
+  output  : output/variaciones_productos (parser_canasta2.py); año y mes salen del nombre del PDF
+  almacen : historia completa de la app (cache/meses_parseados.parquet)
+  --en-linea usa siempre el almacén y el registro de ingesta
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
 import pandas as pd
-from sklearn.ensemble import IsolationForest
+
+from acumulados import period_ordinal
+from almacen_meses import CACHE_DIR, MonthKey, ParsedMonthStore
+from datos import PERIOD_COLUMN
+from extraccion_pdf import NUM2MONTH
+from salidas import OUTPUT_DIR, CsvSink, read_header, read_output
+
+if TYPE_CHECKING:
+    from ingesta import IngestionLedger
 
 # --- Configuración ---
-CSV_PATH   = 'output/variaciones_productos.csv'
-ABS_THRESH = 5.0   # umbral absoluto en % (|variación| > 5)
-CONTAM     = 0.1   # porcentaje estimado de outliers para IsolationForest
-
-# --- Carga de datos ---
-df = pd.read_csv(CSV_PATH)
-# Extraer mes de la columna file
-df['mes'] = (
-    df['file']
-      .str.extract(r'_(ENE|FEB|MAR)_')[0]
-      .map({'ENE':'Enero','FEB':'Febrero','MAR':'Marzo'})
-)
-
-# --- Detección 1: Z-score suave (|z| > 1) ---
-df['z_score'] = df.groupby('producto')['variacion']\
-                  .transform(lambda x: (x - x.mean()) / x.std(ddof=1))
-df['anomaly_z1'] = df['z_score'].abs() > 1
-
-# --- Detección 2: Umbral absoluto (|variación| > ABS_THRESH) ---
-df['anomaly_abs'] = df['variacion'].abs() > ABS_THRESH
-
-# --- Detección 3: Isolation Forest ---
-model = IsolationForest(contamination=CONTAM, random_state=42)
-df['anomaly_if'] = model.fit_predict(df[['variacion']])
-# IsolationForest da -1 para outliers, +1 para normales
-df['anomaly_if'] = df['anomaly_if'] == -1
-
-# --- Resultados ---
-# Filtrar filas donde cualquier método marque anomalía
-anomalies = df[df[['anomaly_z1','anomaly_abs','anomaly_if']].any(axis=1)]
-
-print("Productos/Meses marcados como anomalía:")
-print(anomalies[['producto','mes','variacion','z_score','anomaly_abs','anomaly_if']])
-
-# Opcional: guardar en CSV
-anomalies.to_csv('output/anomalias_detectadas.csv', index=False)
-print("\n✅ Anomalías guardadas en: output/anomalias_detectadas.csv")
+ABS_THRESH = 5.0      # umbral absoluto en % (|variación| > 5)
+Z_THRESH = 1.0        # z-score suave (|z| > 1)
+CONTAM = 0.1          # porcentaje estimado de outliers para IsolationForest
+ROLLING_WINDOW = 12   # meses de la línea base móvil por producto
+MIN_PERIODS = 3       # meses mínimos para una línea base móvil
+N_ESTIMATORS = 100
+ANOMALY_FLAGS = ['anomaly_z1', 'anomaly_abs', 'anomaly_if']
+ANOMALY_LABELS = {'anomaly_z1': 'z-score', 'anomaly_abs': f'|variación| > {ABS_THRESH:g}%', 'anomaly_if': 'IsolationForest'}
+FEATURES = ['variacion', 'z_score', 'rolling_z', 'seasonal_dev']
+# Columnas que detect_anomalies agrega a cada fila
+SCORE_COLUMNS = FEATURES[1:] + ['if_score', 'anomaly_votes', 'anomaly'] + ANOMALY_FLAGS
+ANOMALIES_FILENAME = 'anomalias_detectadas.csv'
+
+# --- Modo en línea ---
+ONLINE_STATE_FILENAME = 'anomalias_estado.json'
+ONLINE_STATE_VERSION = 2  # Subir al cambiar el formato del estado: uno de otra versión se reconstruye
+ONLINE_ANOMALIES_FILENAME = 'anomalias_en_linea.csv'  # aparte del CSV del modo por lotes (otras columnas)
+EWMA_ALPHA = 0.2      # peso del mes nuevo en la media/varianza exponencial
+EWMA_THRESH = 3.0     # |variación - EWMA| / desviación EWMA
+QUANTILES = (0.05, 0.95)  # rango habitual dentro de la ventana móvil
+ONLINE_FLAGS = ['anomaly_z1', 'anomaly_abs', 'anomaly_ewma', 'anomaly_quantile']
+ONLINE_COLUMNS = [
+    'producto', 'year', 'mes_num', 'mes', 'variacion', 'z_score', 'ewma_z', 'q_low', 'q_high',
+] + ONLINE_FLAGS
+
+# Meses abreviados en los nombres de los PDFs locales (Valor_cb_ENE_2025.pdf)
+FILE_MONTHS = {
+    'ENE': '01', 'FEB': '02', 'MAR': '03', 'ABR': '04', 'MAY': '05', 'JUN': '06',
+    'JUL': '07', 'AGO': '08', 'SEP': '09', 'OCT': '10', 'NOV': '11', 'DIC': '12',
+}
+FILE_PERIOD_REGEX = r'_(' + '|'.join(FILE_MONTHS) + r')_(\d{4})'
+
+
+def history_from_output(output_dir: str = OUTPUT_DIR) -> pd.DataFrame:
+    """Variaciones de parser_canasta2.py con year, mes_num y mes deducidos del nombre de cada PDF."""
+    df = read_output('variaciones_productos', output_dir)
+    period = df['file'].str.extract(FILE_PERIOD_REGEX)
+    df = df[period[0].notna()].copy()
+    period = period.loc[df.index]
+    df['year'] = period[1].astype(int)
+    df['mes_num'] = period[0].map(FILE_MONTHS).astype(int)
+    df['mes'] = period[0].map(FILE_MONTHS).map(NUM2MONTH)
+    return df.reset_index(drop=True)
+
+
+def history_from_store() -> pd.DataFrame:
+    """Historia completa ingerida por la app o por ingesta.py."""
+    store = ParsedMonthStore()
+    return store.get_rows(store.months())
+
+
+def add_features(df: pd.DataFrame, window: int = ROLLING_WINDOW) -> pd.DataFrame:
+    """Agrega z_score, rolling_mean/rolling_z (meses previos) y seasonal_dev por producto."""
+    df = df.copy()
+    v = df['variacion'].astype(float)
+    by_product = v.groupby(df['producto'], observed=True, sort=False)
+    df['z_score'] = (v - by_product.transform('mean')) / by_product.transform('std')
+
+    # Línea base móvil: sólo meses anteriores (shift) dentro de cada producto, en orden cronológico
+    order = np.lexsort((df['mes_num'].to_numpy(), df['year'].to_numpy(), df['producto'].astype(str).to_numpy()))
+    ordered = df.iloc[order]
+    ordered_v = ordered['variacion'].astype(float)
+    product_codes = pd.factorize(ordered['producto'])[0]
+    previous = ordered_v.groupby(product_codes).shift(1)
+    rolling = previous.groupby(product_codes).rolling(window, min_periods=MIN_PERIODS)
+    rolling_mean = rolling.mean().reset_index(level=0, drop=True)
+    rolling_std = rolling.std().reset_index(level=0, drop=True)
+    df['rolling_mean'] = rolling_mean.reindex(df.index)
+    df['rolling_z'] = ((ordered_v - rolling_mean) / rolling_std.where(rolling_std > 0)).reindex(df.index)
+
+    # Estacionalidad: desvío contra el promedio del producto en el mismo mes calendario
+    seasonal = v.groupby([df['producto'], df['mes_num']], observed=True, sort=False).transform('mean')
+    df['seasonal_dev'] = v - seasonal
+    return df
+
+
+def detect_anomalies(
+    df: pd.DataFrame,
+    abs_thresh: float = ABS_THRESH,
+    z_thresh: float = Z_THRESH,
+    contamination: float = CONTAM,
+    window: int = ROLLING_WINDOW,
+    n_jobs: int = -1,
+    random_state: Optional[int] = 42,
+) -> pd.DataFrame:
+    """Marca anomalías en df (filas producto/mes/variacion). Retorna df con features, flags e if_score."""
+    df = add_features(df, window)
+    # --- Detección 1: Z-score suave ---
+    df['anomaly_z1'] = df['z_score'].abs() > z_thresh
+    # --- Detección 2: Umbral absoluto ---
+    df['anomaly_abs'] = df['variacion'].abs() > abs_thresh
+    # --- Detección 3: Isolation Forest sobre las variables derivadas ---
+    df['if_score'] = np.nan
+    df['anomaly_if'] = False
+    if len(df) >= 2:
+        from sklearn.ensemble import IsolationForest  # ~1,5 s de importación: sólo cuando se ajusta un modelo
+        features = df[FEATURES].astype(float).fillna(0.0).to_numpy()
+        model = IsolationForest(
+            n_estimators=N_ESTIMATORS, contamination=contamination, random_state=random_state, n_jobs=n_jobs
+        )
+        # IsolationForest da -1 para outliers, +1 para normales; score menor = más anómalo
+        df['anomaly_if'] = model.fit_predict(features) == -1
+        df['if_score'] = model.score_samples(features)
+    df['anomaly_votes'] = df[ANOMALY_FLAGS].sum(axis=1)  # cuántos métodos coinciden
+    df['anomaly'] = df['anomaly_votes'] > 0
+    return df
+
+
+class OnlineAnomalyState:
+    """Estadísticas acumuladas por producto para puntuar meses nuevos sin reajustar nada.
+
+    Por producto guarda n, media y M2 (Welford), media y varianza EWMA, los
+    últimos ROLLING_WINDOW valores y el ordinal del último mes puntuado. Aparte,
+    por mes, el hash del PDF cuyas filas se puntuaron (el mismo que guarda el
+    registro de ingesta). Cada fila se puntúa contra el estado previo y luego lo
+    actualiza, así que un mes cuesta O(productos) sin importar el largo de la historia.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(CACHE_DIR, ONLINE_STATE_FILENAME)
+        self._lock = threading.Lock()
+        self._products: Dict[str, Dict] = {}
+        self._months: Dict[str, str] = {}
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("version") == ONLINE_STATE_VERSION:  # otro formato: se reconstruye
+            self._products, self._months = data["products"], data["months"]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._products = {}
+            self._months = {}
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return not self._products
+
+    def last_scored(self, product: str) -> int:
+        entry = self._products.get(product)
+        return entry["last"] if entry else -1
+
+    def reset_product(self, product: str) -> None:
+        with self._lock:
+            self._products.pop(product, None)
+
+    def scored_source(self, year: int, month: int) -> Optional[str]:
+        """Hash del PDF del mes ya puntuado, o None si el mes no se puntuó."""
+        with self._lock:
+            return self._months.get(f"{year:04d}-{month:02d}")
+
+    def mark_scored(self, sources: Dict[MonthKey, str]) -> None:
+        with self._lock:
+            self._months.update({f"{y:04d}-{m:02d}": source for (y, m), source in sources.items()})
+
+    def score(self, product: str, ordinal: int, value: float) -> Dict:
+        """Puntúa un valor contra el estado del producto y lo incorpora. Retorna métricas y flags."""
+        with self._lock:
+            entry = self._products.setdefault(
+                product, {"n": 0, "mean": 0.0, "m2": 0.0, "ewma": None, "ewvar": 0.0, "window": [], "last": -1}
+            )
+            n, mean = entry["n"], entry["mean"]
+            std = math.sqrt(entry["m2"] / (n - 1)) if n >= 2 else 0.0
+            z_score = (value - mean) / std if std > 0 else float("nan")
+            ew_std = math.sqrt(entry["ewvar"]) if entry["ewvar"] > 0 else 0.0
+            ewma_z = (value - entry["ewma"]) / ew_std if ew_std > 0 else float("nan")
+            window = entry["window"]
+            if len(window) >= MIN_PERIODS:
+                q_low, q_high = (float(q) for q in np.quantile(window, QUANTILES))
+            else:
+                q_low = q_high = float("nan")
+
+            # Actualizar: Welford, EWMA (media y varianza) y ventana móvil
+            n += 1
+            delta = value - mean
+            mean += delta / n
+            entry["m2"] += delta * (value - mean)
+            entry["n"], entry["mean"] = n, mean
+            if entry["ewma"] is None:
+                entry["ewma"] = value
+            else:
+                diff = value - entry["ewma"]
+                increment = EWMA_ALPHA * diff
+                entry["ewma"] += increment
+                entry["ewvar"] = (1 - EWMA_ALPHA) * (entry["ewvar"] + diff * increment)
+            window.append(value)
+            del window[:-ROLLING_WINDOW]
+            entry["last"] = max(entry["last"], ordinal)
+
+        return {
+            "z_score": z_score,
+            "ewma_z": ewma_z,
+            "q_low": q_low,
+            "q_high": q_high,
+            "anomaly_z1": abs(z_score) > Z_THRESH,
+            "anomaly_abs": abs(value) > ABS_THRESH,
+            "anomaly_ewma": abs(ewma_z) > EWMA_THRESH,
+            "anomaly_quantile": not math.isnan(q_low) and not q_low <= value <= q_high,
+        }
+
+    def save(self) -> None:
+        with self._lock:
+            data = json.dumps({"version": ONLINE_STATE_VERSION, "products": self._products, "months": self._months})
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                fh.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass  # Sin disco escribible el estado sólo vive en memoria
+
+
+def _month_rows(store: ParsedMonthStore, months: Iterable[MonthKey]) -> pd.DataFrame:
+    """Filas de los meses en el almacén, una por (producto, mes), como las carga la app."""
+    return store.get_rows(months).drop_duplicates(subset=['year', 'mes_num', 'producto'], keep='first')
+
+
+def _score_rows(df: pd.DataFrame, state: OnlineAnomalyState, report_months: Optional[Set[int]] = None) -> List[Dict]:
+    """Puntúa las filas de df producto por producto, en orden cronológico; reporta las de report_months (todas si None)."""
+    years = df['year'].to_numpy(dtype=np.int64)
+    months = df['mes_num'].to_numpy(dtype=np.int64)
+    ordinals = period_ordinal(years, months)
+    products = df['producto'].astype(str).to_numpy()
+    values = np.round(df['variacion'].to_numpy(dtype=float), 6)  # float32 del almacén -> decimales originales
+    codes, _ = pd.factorize(products)
+    scored = []
+    for i in np.lexsort((ordinals, codes)):  # filas de cada producto, en orden cronológico
+        result = state.score(products[i], int(ordinals[i]), float(values[i]))
+        if report_months is not None and int(ordinals[i]) not in report_months: continue
+        scored.append({
+            'producto': products[i], 'year': int(years[i]), 'mes_num': int(months[i]),
+            'mes': NUM2MONTH[f"{int(months[i]):02d}"], 'variacion': float(values[i]), **result,
+        })
+    return scored
+
+
+def score_new_months(store: ParsedMonthStore, ledger: "IngestionLedger", state: OnlineAnomalyState) -> Tuple[List[Dict], List[MonthKey]]:
+    """Puntúa los meses ingeridos (o re-ingeridos con otro PDF) desde la última ejecución.
+
+    Los meses nuevos salen de comparar el hash de PDF de cada mes en el registro
+    de ingesta con el del estado, sin recorrer la historia: sólo se leen las filas
+    de esos meses. Con el estado vacío se puntúa toda la historia del almacén.
+    Si las filas nuevas de un producto son posteriores a su último mes puntuado,
+    se puntúan sobre el estado actual; si no (un mes que llegó tarde o que
+    cambió), se reconstruye el estado de ese producto recorriendo su historia.
+    Retorna las filas puntuadas, en orden cronológico, y los meses re-puntuados
+    que ya se habían puntuado antes (sus filas previas quedan obsoletas).
+    """
+    sources = {key: source for key, source in ledger.sources().items() if store.has(*key)}
+    if state.is_empty():
+        months = store.months()
+    else:
+        months = [key for key, source in sorted(sources.items()) if state.scored_source(*key) != source]
+    if not months: return [], []
+    replaced = [key for key in months if state.scored_source(*key) is not None]
+    new_rows = _month_rows(store, months)
+    if new_rows.empty: return [], replaced
+
+    # Productos con filas nuevas anteriores a su último mes puntuado: se recorren completos
+    first_new = new_rows.groupby(new_rows['producto'].astype(str), sort=False)[PERIOD_COLUMN].min()
+    replay = [product for product, ordinal in first_new.items() if ordinal <= state.last_scored(product)]
+    scored = _score_rows(new_rows[~new_rows['producto'].astype(str).isin(replay)], state)
+    if replay:
+        for product in replay: state.reset_product(product)
+        history = _month_rows(store, store.months())
+        report_months = set(period_ordinal(np.array([y for y, _ in months]), np.array([m for _, m in months])).tolist())
+        scored += _score_rows(history[history['producto'].astype(str).isin(replay)], state, report_months)
+    state.mark_scored({key: sources[key] for key in months if key in sources})
+    scored.sort(key=lambda row: period_ordinal(row['year'], row['mes_num']))  # estable: productos en orden de aparición
+    return scored, replaced
+
+
+def _replace_month_rows(path: str, rows: List[Dict], months: Iterable[MonthKey]) -> None:
+    """Reescribe el CSV sin las filas de esos meses y con las nuevas al final (reemplazo atómico)."""
+    months = set(months)
+    with open(path, newline='', encoding='utf-8') as fh:
+        kept = [row for row in csv.DictReader(fh) if (int(row['year']), int(row['mes_num'])) not in months]
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with CsvSink(tmp_path, ONLINE_COLUMNS) as sink:
+        sink.write(kept)
+        sink.write(rows)
+    os.replace(tmp_path, path)
+
+
+def run_online(store: ParsedMonthStore, ledger: "IngestionLedger", rebuild: bool = False,
+               state: Optional[OnlineAnomalyState] = None, output_path: Optional[str] = None) -> List[Dict]:
+    """Puntúa los meses nuevos, actualiza el CSV de anomalías y persiste el estado. Retorna las anomalías nuevas.
+
+    Con el estado vacío (o --reconstruir, o un CSV que falta o tiene otro
+    encabezado) se recorre toda la historia y el CSV se reescribe desde cero.
+    Un mes re-ingerido reemplaza sus filas del CSV en vez de duplicarlas.
+    """
+    state = state or OnlineAnomalyState()
+    output_path = output_path or os.path.join(OUTPUT_DIR, ONLINE_ANOMALIES_FILENAME)
+    # El estado y el CSV se corresponden: si falta uno de los dos, se rehacen ambos
+    if rebuild or state.is_empty() or read_header(output_path) != ONLINE_COLUMNS:
+        state.reset()
+    fresh = state.is_empty()
+    scored, replaced = score_new_months(store, ledger, state)
+    anomalies = [row for row in scored if any(row[flag] for flag in ONLINE_FLAGS)]
+    if replaced and not fresh:
+        _replace_month_rows(output_path, anomalies, replaced)
+    else:
+        with CsvSink(output_path, ONLINE_COLUMNS, append=not fresh) as sink:
+            sink.write(anomalies)
+    state.save()
+    return anomalies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fuente', choices=['output', 'almacen'], default='output')
+    parser.add_argument('--en-linea', action='store_true', help='puntuar sólo los meses nuevos con el estado persistido')
+    parser.add_argument('--reconstruir', action='store_true', help='con --en-linea: descartar el estado y recorrer toda la historia')
+    args = parser.parse_args()
+
+    if args.en_linea:
+        from ingesta import IngestionLedger  # la pila de descarga sólo se carga en el modo en línea
+        online_path = os.path.join(OUTPUT_DIR, ONLINE_ANOMALIES_FILENAME)
+        anomalies = run_online(ParsedMonthStore(), IngestionLedger(), rebuild=args.reconstruir, output_path=online_path)
+        print(f"✅ {len(anomalies)} anomalía(s) nueva(s) en: {online_path}")
+        return
+
+    df = history_from_output() if args.fuente == 'output' else history_from_store()
+    output_path = os.path.join(OUTPUT_DIR, ANOMALIES_FILENAME)
+
+    df = detect_anomalies(df)
+
+    # --- Resultados ---
+    # Filtrar filas donde cualquier método marque anomalía
+    anomalies = df[df['anomaly']]
+
+    print("Productos/Meses marcados como anomalía:")
+    print(anomalies[['producto', 'year', 'mes', 'variacion', 'z_score', 'rolling_z', 'anomaly_abs', 'anomaly_if']])
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    anomalies.to_csv(output_path, index=False)
+    print(f"\n✅ {len(anomalies)} anomalías guardadas en: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
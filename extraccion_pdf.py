@@ -0,0 +1,427 @@
+import multiprocessing
+import os
+import re
+import time
+import unicodedata
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from metricas import Metrics, collecting, current_metrics
+
+# --- Configuración de extracción (compartida por la app y los scripts offline) ---
+SKIP_PAGES = 4
+# Subir al cambiar la lógica de extracción: invalida las filas ya persistidas por almacen_meses
+PARSER_VERSION = 4
+DEFAULT_PARSE_WORKERS = int(os.environ.get("CBA_PARSE_WORKERS", str(os.cpu_count() or 1)))
+# Los procesos de parseo no se crean con fork: la app los lanza desde el servidor de Streamlit, con
+# hilos (loop de tornado, pool de descargas) cuyos locks (logging, métricas) podrían quedar tomados
+# en el hijo. forkserver parte de un proceso limpio; donde no existe (Windows) se usa spawn.
+PARSE_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+NUM2MONTH = {
+    '01': 'Enero', '02': 'Febrero', '03': 'Marzo', '04': 'Abril', '05': 'Mayo', '06': 'Junio',
+    '07': 'Julio', '08': 'Agosto', '09': 'Septiembre', '10': 'Octubre', '11': 'Noviembre', '12': 'Diciembre'
+}
+LINE_REGEX = re.compile(r"^(.+?)\s+(-?\d+[.,]\d+)$")
+# Columna numérica de los anexos ("-2,2"); una línea puede traer varias y la variación es la última
+NUMBER_REGEX = re.compile(r"-?\d+[.,]\d+")
+MAX_ABS_VARIATION = 250 # Umbral amplio
+ANNEX_HEADER_REGEX = re.compile(r"^\s*Anexo 2\b", re.MULTILINE)
+# Formato de los informes locales de pdf/ (parser_canasta2): líneas del anexo y 'Cuadro 1'
+ANNEX_LINE_REGEX = re.compile(r"^(.+?)\s+(-?\d+[.,]?\d*)$")
+SUMMARY_REGEX = re.compile(
+    r"CBA\s+(\d+[.,]?\d*)|LP por persona equivalente\s+(\d+[.,]?\d*)|LPE por persona equivalente\s+(\d+[.,]?\d*)",
+    re.IGNORECASE
+)
+SUMMARY_SKIP_PAGES = 1
+SUMMARY_KEYS = ["CBA", "LP", "LPE"]
+
+FIXED_PRODUCTS = [
+    "Arroz","Pan corriente sin envasar","Espiral","Galleta dulce","Galleta no dulce",
+    "Torta 15 o 20 personas","Prepizza familiar","Harina de trigo","Avena","Asiento",
+    "Carne molida","Chuleta de cerdo centro o vetada","Costillar de cerdo","Pulpa de cerdo",
+    "Carne de pavo molida","Pechuga de pollo","Pollo entero","Trutro de pollo",
+    "Pulpa de cordero fresco o refrigerado","Salchicha y vienesa de ave",
+    "Salchicha y vienesa tradicional","Longaniza","Jamón de cerdo","Pate",
+    "Merluza fresca o refrigerada","Choritos frescos o refrigerados en su concha",
+    "Jurel en conserva","Surtido en conserva","Leche líquida entera",
+    "Leche en polvo entera instantánea","Yogurt","Queso Gouda",
+    "Quesillo y queso fresco con sal","Queso crema","Huevo de gallina",
+    "Mantequilla con sal","Margarina","Aceite vegetal combinado o puro",
+    "Plátano","Manzana","Maní salado","Poroto","Lenteja","Lechuga","Zapallo",
+    "Limón","Palta","Tomate","Zanahoria","Cebolla nueva","Choclo congelado",
+    "Papa de guarda","Azúcar","Chocolate","Caramelo","Helado familiar un sabor",
+    "Salsa de tomate","Sucedáneo de café","Te para preparar","Agua mineral",
+    "Bebida gaseosa tradicional","Bebida energizante","Refresco isotónico",
+    "Jugo líquido","Néctar líquido","Refresco en polvo","Completo","Papas fritas",
+    "Té corriente","Biscochos dulces y medialunas","Entrada (ensalada o sopa)",
+    "Postre para almuerzo","Promoción de comida rápida",
+    "Tostadas (palta o mantequilla o mermelada o mezcla de estas)",
+    "Aliado (jamón queso) o Barros Jarpa","Pollo asado entero","Empanada de horno",
+    "Colación o menú del día o almuerzo ejecutivo","Plato de fondo para almuerzo"
+]
+
+# Variantes de nombre ya normalizadas (ver normalize_product_name) que no se deducen de las reglas
+PRODUCT_ALIASES = {
+    "helado familiar 1 sabor": "Helado familiar un sabor",
+}
+_MEAL_SUFFIX_REGEX = re.compile(r"\s+para (desayuno|almuerzo|once|cena)$")
+_ESTABLISHMENT_REGEX = re.compile(r"\s*\(segun establecimiento\)")
+
+
+def normalize_product_name(name: str) -> str:
+    """Clave de comparación: minúsculas, sin tildes, guiones como espacios y espacios colapsados."""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(ch for ch in name if not unicodedata.combining(ch)).lower().replace("-", " ")
+    name = " ".join(name.split())
+    return name.replace("( ", "(").replace(" )", ")")
+
+
+class ProductMatcher:
+    """Reconoce productos de la canasta en líneas de texto de los informes.
+
+    Un nombre idéntico a uno de FIXED_PRODUCTS se resuelve con un dict; si no,
+    se compara su forma normalizada (tildes, guiones, sufijos " - para
+    desayuno" y "(según establecimiento)") contra un dict precalculado. Sólo
+    cuentan las líneas con una única columna numérica, como las del anexo, y
+    las unidades al final no se quitan: "Avena G 5,1 0,1 196,6" es una fila
+    de la tabla de composición, no una variación. Una línea con valor cuyo nombre no se reconoce puede estar
+    cortada: se reintenta uniéndola a la línea siguiente (o a la anterior) sin
+    valor.
+    """
+
+    def __init__(self, products: Iterable[str] = FIXED_PRODUCTS, aliases: Optional[Dict[str, str]] = None):
+        self._exact = {product: product for product in products}
+        self._normalized = {normalize_product_name(product): product for product in self._exact}
+        self._normalized.update(PRODUCT_ALIASES if aliases is None else aliases)
+        # Los informes repiten las mismas líneas mes a mes: cada nombre se normaliza una sola vez
+        self._resolved: Dict[str, Optional[str]] = dict(self._exact)
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Nombre canónico del producto, o None si no es uno de la canasta."""
+        try:
+            return self._resolved[name]
+        except KeyError:
+            pass
+        product = None
+        key = normalize_product_name(name)
+        for candidate in (key, _MEAL_SUFFIX_REGEX.sub("", key)):
+            for variant in (candidate, _ESTABLISHMENT_REGEX.sub("", candidate)):
+                product = self._normalized.get(variant)
+                if product is not None: break
+            if product is not None: break
+        if len(self._resolved) < 100_000: self._resolved[name] = product
+        return product
+
+    @staticmethod
+    def split_values(line: str) -> Optional[Tuple[str, str]]:
+        """Separa 'nombre col1 col2 ...' en (nombre, última columna); None si la línea no termina en número."""
+        name, _, tail = line.rpartition(" ")
+        if not name or not NUMBER_REGEX.fullmatch(tail): return None
+        while True:  # columnas numéricas adicionales (p. ej. precios) antes de la variación
+            head, _, previous = name.rpartition(" ")
+            if not head or not previous[-1].isdigit() or not NUMBER_REGEX.fullmatch(previous): break
+            name = head
+        return name.rstrip(), tail
+
+    def iter_matches(self, lines: Iterable[str]) -> Iterator[Tuple[str, float]]:
+        """Genera (producto, variación) en el orden de las líneas, en una sola pasada.
+
+        Al terminar registra líneas leídas, reconocidas y descartadas (con valor
+        pero sin producto) y el tiempo de la pasada (incluye al consumidor, que en
+        iter_month_rows sólo arma un dict por fila).
+        """
+        carry = ""      # última línea sin valor: posible comienzo de un nombre cortado
+        pending = None  # (nombre, valor) con valor pero sin producto reconocido
+        n_lines = n_matched = n_rejected = 0
+        t0 = time.perf_counter()
+        try:
+            for raw_line in lines:
+                n_lines += 1
+                line = raw_line.strip()
+                if not line: continue
+                parts = self.split_values(line) if line[-1].isdigit() else None
+                if parts is None:
+                    if pending is not None:
+                        (name, value), pending = pending, None
+                        product = self.resolve(f"{name} {line}")
+                        if product is None:
+                            n_rejected += 1
+                        else:
+                            n_matched += 1
+                            yield product, value
+                    carry = line
+                    continue
+                if pending is not None: n_rejected += 1  # el valor pendiente no se completó
+                if parts[0] != line.rpartition(" ")[0].rstrip():
+                    # Varias columnas numéricas ("Limón 19,2 -8,2", "Avena G 5,1 0,1 196,6"): tablas del
+                    # cuerpo del informe, no del anexo (una sola columna); la última no es la variación
+                    n_rejected += 1
+                    carry, pending = "", None
+                    continue
+                name, value = parts[0], float(parts[1].replace(",", "."))
+                product = self.resolve(name)
+                if product is None and carry:
+                    product = self.resolve(f"{carry} {name}")
+                carry = ""
+                if product is None:
+                    pending = (name, value)
+                else:
+                    pending = None
+                    n_matched += 1
+                    yield product, value
+            if pending is not None: n_rejected += 1
+        finally:
+            metrics = current_metrics()
+            metrics.count("lineas", n_lines)
+            metrics.count("lineas_reconocidas", n_matched)
+            metrics.count("lineas_descartadas", n_rejected)
+            metrics.add_time("reconocimiento_lineas", time.perf_counter() - t0)
+
+
+PRODUCT_MATCHER = ProductMatcher()
+
+# (año "YYYY", mes "MM", contenido del PDF)
+MonthJob = Tuple[str, str, bytes]
+PdfSource = Union[bytes, str]
+
+
+def locate_annex_pages(pdf_source: PdfSource) -> Optional[range]:
+    """Ubica las páginas del 'Anexo 2' (desde su encabezado hasta el final del informe).
+
+    Sondea el texto crudo de cada página con pypdfium2, sin el análisis de layout
+    de pdfplumber, recorriendo desde el final porque el anexo cierra el informe.
+    Retorna None si no encuentra el encabezado.
+    """
+    with current_metrics().timer("sondeo_anexo"):
+        return _locate_annex_pages(pdf_source)
+
+
+def _locate_annex_pages(pdf_source: PdfSource) -> Optional[range]:
+    import pypdfium2 as pdfium  # librerías de PDF sólo cuando hay que parsear (arranque de la app)
+    try:
+        doc = pdfium.PdfDocument(pdf_source)
+    except Exception: # pylint: disable=broad-except
+        return None
+    try:
+        n_pages = len(doc)
+        for i in range(n_pages - 1, -1, -1):
+            page = doc[i]
+            textpage = page.get_textpage()
+            text = textpage.get_text_range()
+            textpage.close()
+            page.close()
+            if ANNEX_HEADER_REGEX.search(text):
+                return range(i, n_pages)
+        return None
+    finally:
+        doc.close()
+
+
+def iter_page_texts(pdf_source: PdfSource, first_page: int = 0, last_page: Optional[int] = None) -> Iterator[str]:
+    """Genera el texto de cada página, una a la vez; cada página se libera tras extraerla.
+
+    La memoria queda acotada a una página aunque el informe sea largo.
+    """
+    import pdfplumber
+    metrics = current_metrics()
+    with metrics.timer("pdf_apertura"):
+        pdf = pdfplumber.open(BytesIO(pdf_source) if isinstance(pdf_source, bytes) else pdf_source)
+    with pdf:
+        for page in pdf.pages[first_page:last_page]:
+            yield _page_text(page, metrics)
+
+
+def _page_text(page, metrics: Metrics) -> str:
+    """Texto de una página, midiendo la extracción; la página se libera tras extraerla."""
+    t0 = time.perf_counter()
+    text = page.extract_text() or ""
+    page.close()  # descarta los objetos de layout cacheados de la página
+    metrics.add_time("extraccion_pagina", time.perf_counter() - t0)
+    metrics.count("paginas")
+    return text
+
+
+def iter_month_rows(pdf_bytes: bytes, year_str: str, mm_str: str, locate_pages: bool = True) -> Iterator[Dict]:
+    """Genera las filas (producto, variación) del informe de un mes, página por página."""
+    month_name = NUM2MONTH[mm_str]
+    annex_pages = locate_annex_pages(pdf_bytes) if locate_pages else None
+    # Extraer sólo el anexo; si no se ubica, todas las páginas tras SKIP_PAGES
+    first_page = max(annex_pages.start, SKIP_PAGES) if annex_pages else SKIP_PAGES
+    lines = (line for page_text in iter_page_texts(pdf_bytes, first_page) for line in page_text.split("\n"))
+    for product_name, value in PRODUCT_MATCHER.iter_matches(lines):
+        if abs(value) > MAX_ABS_VARIATION: continue
+        yield {
+            "year": int(year_str),
+            "mes_num": int(mm_str),
+            "mes": month_name,
+            "producto": product_name,
+            "variacion": value
+        }
+
+
+def parse_month_pdf(pdf_bytes: bytes, year_str: str, mm_str: str, locate_pages: bool = True) -> List[Dict]:
+    """Extrae las filas (producto, variación) del informe de un mes.
+
+    Un PDF ilegible, o sin variaciones reconocidas, retorna [] y queda
+    registrado como falla del mes ("YYYY-MM").
+    """
+    metrics = current_metrics()
+    try:
+        with metrics.timer("parseo_mes", mes=f"{year_str}-{mm_str}"):
+            rows = list(iter_month_rows(pdf_bytes, year_str, mm_str, locate_pages))
+    except Exception as exc: # pylint: disable=broad-except
+        metrics.fail(f"{year_str}-{mm_str}", f"{type(exc).__name__}: {exc}")
+        return []
+    metrics.count("meses_parseados")
+    if not rows: metrics.fail(f"{year_str}-{mm_str}", "PDF sin variaciones reconocidas")
+    return rows
+
+
+def _parse_summary(text: str) -> Dict[str, float]:
+    summary = {}
+    for match in SUMMARY_REGEX.finditer(text):
+        for key, value in zip(SUMMARY_KEYS, match.groups()):
+            if value: summary[key] = float(value.replace('.', '').replace(',', '.'))
+    return summary
+
+
+def _match_annex_lines(page_texts: Iterable[str]) -> Iterator[Dict]:
+    """Líneas 'producto valor' posteriores al encabezado 'Anexo 2', sin filtrar productos."""
+    table_start = False
+    for page_text in page_texts:
+        for line in page_text.split('\n'):
+            # Marcar inicio de la sección Anexo 2
+            if 'Anexo 2' in line:
+                table_start = True
+                continue
+            if not table_start:
+                continue
+            match = ANNEX_LINE_REGEX.match(line.strip())
+            if match:
+                yield {'producto': match.group(1).strip(), 'variacion': float(match.group(2).replace(',', '.'))}
+
+
+def extract_summary(pdf_source: PdfSource) -> Dict[str, float]:
+    """Métricas generales (CBA, LP, LPE) del 'Cuadro 1', en las primeras páginas del informe."""
+    return _parse_summary("".join(iter_page_texts(pdf_source, 0, SUMMARY_SKIP_PAGES + 2)))
+
+
+def iter_annex_records(pdf_source: PdfSource) -> Iterator[Dict]:
+    """Genera todas las líneas 'producto valor' del 'Anexo 2', sin filtrar productos."""
+    # Saltar directo a la página del anexo en vez de extraer todo el informe
+    annex_pages = locate_annex_pages(pdf_source)
+    return _match_annex_lines(iter_page_texts(pdf_source, annex_pages.start if annex_pages else 0))
+
+
+def extract_report(pdf_source: PdfSource) -> Tuple[Dict[str, float], Iterator[Dict]]:
+    """Resumen y variaciones de un informe abriéndolo una sola vez con pdfplumber.
+
+    El resumen sale de las primeras páginas y se retorna de inmediato; las
+    variaciones son un generador que sigue sobre el mismo documento abierto y lo
+    cierra al agotarse. El anexo se ubica en ese mismo documento, extrayendo
+    desde la última página hacia atrás hasta su encabezado: esas páginas son
+    justo las del anexo, así que ninguna se extrae dos veces ni hace falta un
+    sondeo aparte (las del resumen se reutilizan).
+    """
+    import pdfplumber
+    metrics = current_metrics()
+    with metrics.timer("pdf_apertura"):
+        pdf = pdfplumber.open(BytesIO(pdf_source) if isinstance(pdf_source, bytes) else pdf_source)
+    try:
+        n_summary = min(SUMMARY_SKIP_PAGES + 2, len(pdf.pages))
+        summary_texts = [_page_text(page, metrics) for page in pdf.pages[:n_summary]]
+        summary = _parse_summary("".join(summary_texts))
+    except Exception:
+        pdf.close()
+        raise
+
+    def annex_texts() -> Iterator[str]:
+        # Desde el final hasta el encabezado; sin encabezado quedan todas las páginas
+        texts = []
+        try:
+            for i in range(len(pdf.pages) - 1, -1, -1):
+                text = summary_texts[i] if i < n_summary else _page_text(pdf.pages[i], metrics)
+                texts.append(text)
+                if ANNEX_HEADER_REGEX.search(text): break
+        finally:
+            pdf.close()
+        yield from reversed(texts)
+
+    return summary, _match_annex_lines(annex_texts())
+
+
+def process_report_file(path: str) -> Tuple[Dict, List[Dict]]:
+    """Resumen y variaciones de un informe local (unidad de trabajo de cada proceso)."""
+    summary, records = extract_report(path)
+    return summary, list(records)
+
+
+def list_report_files(pdf_dirs: Union[str, Iterable[str]]) -> List[str]:
+    """Rutas de los PDFs de una o varias carpetas; cada carpeta en orden alfabético."""
+    if isinstance(pdf_dirs, str): pdf_dirs = [pdf_dirs]
+    return [
+        os.path.join(pdf_dir, name)
+        for pdf_dir in pdf_dirs
+        for name in sorted(os.listdir(pdf_dir))
+        if name.lower().endswith('.pdf')
+    ]
+
+
+def iter_report_dir(
+    pdf_dirs: Union[str, Iterable[str]], max_workers: int = DEFAULT_PARSE_WORKERS
+) -> Iterator[Tuple[str, Dict, Iterable[Dict]]]:
+    """Genera (archivo, resumen, variaciones) por cada PDF de una o varias carpetas.
+
+    Todos los PDFs de todas las carpetas comparten un mismo pool de procesos, y
+    cada informe se abre una sola vez (extract_report). En secuencial las
+    variaciones llegan como generador (página por página). En paralelo cada
+    proceso entrega un informe completo y sólo hay a lo más 2 * max_workers
+    informes en vuelo, de modo que la memoria no crece con la cantidad de PDFs.
+    """
+    paths = list_report_files(pdf_dirs)
+    if max_workers <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield (os.path.basename(path), *extract_report(path))
+        return
+    with _process_pool(min(max_workers, len(paths))) as pool:
+        in_flight = deque()
+        for path in paths:
+            in_flight.append((os.path.basename(path), pool.submit(process_report_file, path)))
+            if len(in_flight) >= 2 * max_workers:
+                done_name, future = in_flight.popleft()
+                yield (done_name, *future.result())
+        while in_flight:
+            done_name, future = in_flight.popleft()
+            yield (done_name, *future.result())
+
+
+def _process_pool(max_workers: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(PARSE_START_METHOD))
+
+
+def _parse_month_job(job: MonthJob) -> Tuple[List[Dict], Dict]:
+    """(filas, snapshot de métricas del job): el proceso principal suma las métricas."""
+    year_str, mm_str, pdf_bytes = job
+    with collecting() as metrics:
+        rows = parse_month_pdf(pdf_bytes, year_str, mm_str)
+    return rows, metrics.snapshot()
+
+
+def parse_month_pdfs(jobs: Iterable[MonthJob], max_workers: int = DEFAULT_PARSE_WORKERS) -> List[List[Dict]]:
+    """Parsea varios meses repartiendo un PDF por proceso.
+
+    Retorna un lote de filas por job, en el mismo orden de entrada, de modo que
+    concatenarlos da el mismo resultado que el recorrido secuencial.
+    """
+    jobs = list(jobs)
+    if max_workers <= 1 or len(jobs) <= 1:
+        results = [_parse_month_job(job) for job in jobs]
+    else:
+        with _process_pool(min(max_workers, len(jobs))) as pool:
+            results = list(pool.map(_parse_month_job, jobs))
+    metrics = current_metrics()
+    for _, snapshot in results:
+        metrics.merge(snapshot)
+    return [rows for rows, _ in results]
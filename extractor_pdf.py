@@ -1,6 +1,7 @@
-import pdfplumber
 import os
 
+from extraccion_pdf import iter_page_texts
+
 # Carpeta de PDFs
 pdf_dir = 'pdf'
 
@@ -10,8 +11,7 @@ for filename in sorted(os.listdir(pdf_dir)):
         ruta = os.path.join(pdf_dir, filename)
         print(f"\n📄 Procesando archivo: {filename}")
 
-        with pdfplumber.open(ruta) as pdf:
-            for i, page in enumerate(pdf.pages):
-                print(f"\n--- Página {i+1} ---")
-                texto = page.extract_text()
-                print(texto[:1000])  # Mostrar los primeros 1000 caracteres
+        # Una página a la vez: el texto de cada página se imprime y se descarta
+        for i, texto in enumerate(iter_page_texts(ruta)):
+            print(f"\n--- Página {i+1} ---")
+            print(texto[:1000])  # Mostrar los primeros 1000 caracteres
@@ -0,0 +1,169 @@
+"""Normaliza los CSV históricos (variaciones_canasta*.csv) y los guarda como semilla columnar.
+
+Los CSV vienen de una versión anterior del scraper y mezclan las variaciones
+con texto narrativo ("pobreza alcanzó $368.389 pesos ..."), líneas del resumen
+(CBA, LP, IPC) y la tabla de composición de la canasta ("Arroz G 22,2",
+"arroz g 22,2 81,1": gramos o cc por persona al día, no variaciones). La
+normalización separa los números pegados al nombre, descarta la composición,
+resuelve el producto canónico de FIXED_PRODUCTS con PRODUCT_MATCHER, convierte
+el mes en español a número y deja el resultado en el esquema compacto de
+datos.compact_frame, guardado en cache/semilla_historica.parquet.
+
+La app e ingesta.py cargan la semilla en el almacén de meses al arrancar
+(seed_store) como respaldo, no como meses ingeridos: los CSV no traen todos
+los productos del informe (p. ej. faltan "Té corriente" y "Tostadas ..." en
+2025), así que la ingesta sigue pidiendo el PDF de cada mes sembrado
+(seeded_months) y lo reemplaza por sus filas parseadas en cuanto lo obtiene.
+Mientras el PDF no esté disponible, el dashboard muestra las filas de la semilla.
+
+Uso: python historico.py [--csv variaciones_canasta.csv variaciones_canasta_limpio.csv]
+"""
+import argparse
+import json
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from almacen_meses import CACHE_DIR, MonthKey, ParsedMonthStore, content_hash
+from datos import compact_frame, rows_to_frame
+from extraccion_pdf import MAX_ABS_VARIATION, NUM2MONTH, PARSER_VERSION, PRODUCT_MATCHER
+
+# --- Configuración ---
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORICAL_CSVS = [
+    os.path.join(_BASE_DIR, "variaciones_canasta.csv"),
+    os.path.join(_BASE_DIR, "variaciones_canasta_limpio.csv"),
+]
+SEED_FILENAME = "semilla_historica.parquet"
+SEED_SOURCE_PREFIX = "semilla-"  # Prefijo del "hash de origen" de los meses sembrados en el almacén
+_METADATA_KEY = b"canasta_semilla"
+MONTH2NUM = {name.lower(): int(num) for num, name in NUM2MONTH.items()}
+# Unidad de la tabla de composición al final del nombre ("Arroz G", "Leche líquida entera CC", "G")
+_COMPOSITION_UNIT_REGEX = re.compile(r"(^|\s)(g|cc)$", re.IGNORECASE)
+
+
+def classify_row(raw_name: str, raw_value: str, raw_month: str, raw_year: str) -> Tuple[str, Optional[Dict]]:
+    """(motivo, fila): la fila normalizada con motivo 'ok', o None y el motivo del descarte."""
+    month = MONTH2NUM.get(str(raw_month).strip().lower())
+    try:
+        year = int(raw_year)
+    except (TypeError, ValueError):
+        year = None
+    if month is None or year is None: return "mes_invalido", None
+
+    name = str(raw_name).strip()
+    parts = PRODUCT_MATCHER.split_values(name) if name[-1:].isdigit() else None
+    if parts is not None: name = parts[0]  # "arroz g 22,2 81,1" -> "arroz g"
+    if _COMPOSITION_UNIT_REGEX.search(name): return "composicion", None
+    product = PRODUCT_MATCHER.resolve(name)
+    if product is None: return "sin_producto", None
+
+    try:
+        value = float(str(raw_value).replace(",", "."))
+    except ValueError:
+        return "valor_invalido", None
+    if abs(value) > MAX_ABS_VARIATION: return "fuera_de_rango", None
+    return "ok", {"year": year, "mes_num": month, "producto": product, "variacion": value}
+
+
+def normalize_historical(paths: Iterable[str] = HISTORICAL_CSVS) -> Tuple[pd.DataFrame, Counter]:
+    """Frame compacto con las variaciones válidas de los CSV y el conteo de filas por motivo."""
+    rows: List[Dict] = []
+    seen = set()
+    report: Counter = Counter()
+    for path in paths:
+        raw = pd.read_csv(path, dtype=str, keep_default_na=False)
+        for raw_name, raw_value, raw_month, raw_year in raw[["producto", "valor", "mes", "año"]].itertuples(index=False):
+            reason, row = classify_row(raw_name, raw_value, raw_month, raw_year)
+            if row is not None:
+                key = (row["year"], row["mes_num"], row["producto"])
+                if key in seen: reason, row = "duplicado", None
+                else: seen.add(key)
+            report[reason] += 1
+            if row is not None: rows.append(row)
+    return rows_to_frame([rows]), report
+
+
+def sources_hash(paths: Iterable[str]) -> str:
+    digest = []
+    for path in paths:
+        with open(path, "rb") as fh:
+            digest.append(content_hash(fh.read()))
+    return content_hash("".join(digest).encode())
+
+
+def write_seed(seed: pd.DataFrame, source: str, path: str) -> None:
+    try:
+        table = pa.Table.from_pandas(seed, preserve_index=False)
+        meta = {"parser_version": PARSER_VERSION, "source": source}
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), _METADATA_KEY: json.dumps(meta).encode()})
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # Sin disco escribible la semilla se recalcula en cada arranque
+
+
+def load_seed(paths: Iterable[str] = HISTORICAL_CSVS, path: Optional[str] = None) -> Tuple[pd.DataFrame, str]:
+    """(semilla, hash de los CSV). Lee el Parquet si corresponde a los CSV actuales; si no, lo regenera."""
+    paths = [p for p in paths if os.path.exists(p)]
+    if not paths: return compact_frame(pd.DataFrame()), ""
+    path = path or os.path.join(CACHE_DIR, SEED_FILENAME)
+    source = sources_hash(paths)
+    try:
+        table = pq.read_table(path)
+        meta = json.loads((table.schema.metadata or {}).get(_METADATA_KEY, b"{}"))
+        if meta == {"parser_version": PARSER_VERSION, "source": source}:
+            return compact_frame(table.to_pandas()), source
+    except Exception: # pylint: disable=broad-except
+        pass  # Falta, está corrupta o es de otros CSV: se regenera
+    seed, _ = normalize_historical(paths)
+    write_seed(seed, source, path)
+    return seed, source
+
+
+def seeded_months(store: ParsedMonthStore) -> Set[MonthKey]:
+    """Meses del almacén que aún tienen las filas de la semilla (sin PDF parseado)."""
+    return {key for key in store.months() if (store.source_hash(*key) or "").startswith(SEED_SOURCE_PREFIX)}
+
+
+def seed_store(store: ParsedMonthStore, paths: Iterable[str] = HISTORICAL_CSVS) -> int:
+    """Carga en el almacén los meses de la semilla que aún no tiene. Retorna cuántos meses agregó.
+
+    Son un respaldo: la ingesta los sigue tratando como pendientes (ver seeded_months).
+    """
+    seed, source = load_seed(paths)
+    if seed.empty: return 0
+    parsed = [
+        ((int(year), int(month)), f"{SEED_SOURCE_PREFIX}{source}", [
+            {"year": int(year), "mes_num": int(month), "producto": str(product), "variacion": float(value)}
+            for product, value in zip(group["producto"], group["variacion"])
+        ])
+        for (year, month), group in seed.groupby(["year", "mes_num"], sort=True)
+        if not store.has(int(year), int(month))
+    ]
+    store.put_months(parsed)
+    return len(parsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', nargs='+', default=HISTORICAL_CSVS, help='CSV históricos (producto, valor, mes, año)')
+    args = parser.parse_args()
+
+    seed, report = normalize_historical(args.csv)
+    path = os.path.join(CACHE_DIR, SEED_FILENAME)
+    write_seed(seed, sources_hash(args.csv), path)
+    months = seed.groupby(["year", "mes_num"]).size()
+    print(f"✅ {len(seed)} variaciones de {len(months)} mes(es) en {path}")
+    print("Filas por motivo: " + ", ".join(f"{reason} {n}" for reason, n in report.most_common()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Indicadores del dashboard (KPIs por periodo presidencial).
+
+Viven fuera de streamlit_app.py para poder usarlos y medirlos sin levantar la
+app (benchmarks/suite.py).
+"""
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from acumulados import CumulativeIndex
+from datos import PERIOD_COLUMN
+
+
+def months_in(df: pd.DataFrame):
+    """Ordinales (year * 12 + mes - 1) de los meses presentes en df."""
+    return df[PERIOD_COLUMN].to_numpy()
+
+
+def get_presidential_kpis(df_presidency_scope: pd.DataFrame, all_products_in_period_scope: pd.DataFrame, selected_prods_for_avg: List[str], cumulative_index: Optional[CumulativeIndex] = None) -> Dict:
+    kpis = {
+        "avg_cumulative_variation": None,
+        "max_increase_product": None, "max_increase_value": None,
+        "max_decrease_product": None, "max_decrease_value": None,
+    }
+    if df_presidency_scope.empty: return kpis
+    if cumulative_index is None:
+        cumulative_index = CumulativeIndex(all_products_in_period_scope)
+
+    # 1. Variación acumulada promedio (para productos seleccionados en el filtro general)
+    if selected_prods_for_avg:
+        cumulative_variations_selected_prods = cumulative_index.over_months(months_in(df_presidency_scope))
+        cumulative_variations_selected_prods = cumulative_variations_selected_prods[
+            cumulative_variations_selected_prods.index.isin(selected_prods_for_avg)
+        ].dropna()
+        if not cumulative_variations_selected_prods.empty:
+            kpis["avg_cumulative_variation"] = cumulative_variations_selected_prods.mean()
+
+    # 2. Producto con mayor alza/baja (considerando TODOS los productos en FIXED_PRODUCTS que tengan datos en el periodo)
+    # Usar all_products_in_period_scope que ya está filtrado por el periodo presidencial
+    product_cumulative_variations = cumulative_index.over_months(months_in(all_products_in_period_scope)).dropna()
+    
+    if not product_cumulative_variations.empty:
+        max_prod = product_cumulative_variations.idxmax()
+        min_prod = product_cumulative_variations.idxmin()
+        kpis["max_increase_product"] = max_prod
+        kpis["max_increase_value"] = product_cumulative_variations[max_prod]
+        kpis["max_decrease_product"] = min_prod
+        kpis["max_decrease_value"] = product_cumulative_variations[min_prod]
+        
+    return kpis
@@ -0,0 +1,331 @@
+"""Ingesta incremental de informes mensuales.
+
+Lleva un registro (cache/ingesta.json) de cada (año, mes) sondeado: si se
+ingirió, si la URL respondió sin informe (404) o si el intento falló (red,
+5xx tras los reintentos, un PDF sin variaciones reconocidas), y cuándo se
+sondeó por última vez.
+En cada actualización sólo se piden:
+  - los meses de la frontera: los primeros FRONTIER_SIZE meses posteriores al
+    último mes ingerido (los próximos por publicarse), a lo más cada FRONTIER_RETRY;
+  - los meses faltantes anteriores a la frontera, con espera exponencial entre intentos;
+  - los meses fallidos, con una espera exponencial más corta (no son informes ausentes).
+En régimen estable una actualización cuesta una o dos solicitudes HTTP.
+
+Con --revalidar además se vuelven a pedir los meses ya ingeridos: la caché de
+PDFs (descarga_pdf.PdfBlobCache) los revalida con ETag/Last-Modified y sólo se
+re-parsean los informes cuyo contenido cambió.
+
+Antes de planificar se cargan en el almacén los meses de los CSV históricos
+(historico.seed_store) como respaldo: siguen pendientes hasta que se ingiere
+su PDF y no cuentan para la frontera.
+
+Con --anomalias, al terminar se puntúan los meses recién ingeridos con el modo
+en línea de deteccion_anomalias (sin reajustar modelos): los identifica por el
+hash del PDF que este registro guarda para cada mes ingerido.
+
+Uso: python ingesta.py [--desde 2015] [--revalidar] [--anomalias]
+"""
+import argparse
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from almacen_meses import CACHE_DIR, ParsedMonthStore, content_hash
+from descarga_pdf import PDF_CACHE_MAX_AGE, FetchFailed, PdfBlobCache, PdfFetcher, build_report_url, fetch_concurrently
+from extraccion_pdf import DEFAULT_PARSE_WORKERS, parse_month_pdfs
+from historico import seed_store, seeded_months
+from metricas import Metrics, configure_logging, current_metrics, log_event
+
+# --- Configuración ---
+LEDGER_FILENAME = "ingesta.json"
+FRONTIER_SIZE = 2                     # meses por publicarse que se sondean en cada actualización
+FRONTIER_RETRY = 3600                 # segundos mínimos entre sondeos de un mes de la frontera
+MISSING_RETRY_BASE = 24 * 3600        # primer reintento de un mes faltante histórico
+MISSING_RETRY_MAX = 30 * 24 * 3600    # tope de la espera exponencial
+FAILED_RETRY_BASE = 15 * 60           # primer reintento de un mes cuya descarga o parseo falló
+FAILED_RETRY_MAX = 24 * 3600          # tope de la espera exponencial de los meses fallidos
+
+MonthKey = Tuple[int, int]
+
+
+def _key(year: int, month: int) -> str:
+    return f"{year:04d}-{month:02d}"
+
+
+def frontier_months(ingested: Iterable[MonthKey], today: Optional[datetime.date] = None) -> List[MonthKey]:
+    """Primeros FRONTIER_SIZE meses posteriores al último ingerido, sin pasar del mes en curso."""
+    ingested = list(ingested)
+    if not ingested: return []
+    today = today or datetime.date.today()
+    year, month = max(ingested)
+    frontier = []
+    for _ in range(FRONTIER_SIZE):
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        if (year, month) > (today.year, today.month): break
+        frontier.append((year, month))
+    return frontier
+
+
+class IngestionLedger:
+    """Registro persistente de sondeos por (año, mes): estado, último sondeo e intentos fallidos."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(CACHE_DIR, LEDGER_FILENAME)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                self._entries = json.load(fh)
+        except (OSError, ValueError):
+            pass
+
+    def entry(self, year: int, month: int) -> Optional[Dict]:
+        with self._lock:
+            return self._entries.get(_key(year, month))
+
+    def is_due(self, year: int, month: int, frontier: bool = False, now: Optional[float] = None) -> bool:
+        """¿Corresponde volver a pedir este mes? Los nunca sondeados siempre corresponden."""
+        entry = self.entry(year, month)
+        if entry is None or entry["status"] == "ingested": return True
+        now = now if now is not None else time.time()
+        if entry["status"] == "failed":
+            wait = min(FAILED_RETRY_BASE * 2 ** (entry.get("failures", 1) - 1), FAILED_RETRY_MAX)
+        elif frontier:
+            wait = FRONTIER_RETRY
+        else:
+            wait = min(MISSING_RETRY_BASE * 2 ** (entry["attempts"] - 1), MISSING_RETRY_MAX)
+        return now - entry["last_probe"] >= wait
+
+    def record(self, year: int, month: int, status: str, now: Optional[float] = None, source: Optional[str] = None) -> None:
+        """Registra un sondeo: "ingested", "missing" (sin informe publicado) o "failed" (reintentar pronto).
+
+        Un intento fallido no cuenta como intento de un mes faltante. source es el
+        hash del PDF cuyas filas quedaron en el almacén; se conserva mientras no se
+        ingiera otro.
+        """
+        now = now if now is not None else time.time()
+        with self._lock:
+            previous = self._entries.get(_key(year, month), {})
+            attempts = previous.get("attempts", 0)
+            if status == "ingested": attempts = 0
+            elif status == "missing": attempts += 1
+            entry = {
+                "status": status,
+                "last_probe": now,
+                "attempts": attempts,
+                "failures": previous.get("failures", 0) + 1 if status == "failed" else 0,
+            }
+            if source or previous.get("source"): entry["source"] = source or previous["source"]
+            self._entries[_key(year, month)] = entry
+
+    def sources(self) -> Dict[MonthKey, str]:
+        """Hash del PDF ingerido de cada mes que tiene uno: cambia cuando el mes se ingiere de nuevo con otro contenido."""
+        with self._lock:
+            return {
+                (int(key[:4]), int(key[5:])): entry["source"]
+                for key, entry in self._entries.items() if entry.get("source")
+            }
+
+    def save(self) -> None:
+        with self._lock:
+            data = json.dumps(self._entries, indent=1, sort_keys=True)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                fh.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass  # Sin disco escribible el registro sólo vive en memoria
+
+
+def pending_months(months: Iterable[MonthKey], store: ParsedMonthStore) -> List[MonthKey]:
+    """Meses sin filas en el almacén o sólo con las de la semilla histórica (sin su PDF)."""
+    seeded = seeded_months(store)
+    return [(y, m) for y, m in months if not store.has(y, m) or (y, m) in seeded]
+
+
+def _probe(fetch_fn: Callable[[str], Optional[bytes]], url: str) -> Tuple[Optional[bytes], bool]:
+    """(contenido, falló): un None sin falla es un informe aún no publicado."""
+    try:
+        return fetch_fn(url), False
+    except FetchFailed:
+        return None, True
+
+
+def plan_fetch(
+    pending: Iterable[MonthKey],
+    store: ParsedMonthStore,
+    ledger: IngestionLedger,
+    today: Optional[datetime.date] = None,
+    now: Optional[float] = None,
+) -> List[MonthKey]:
+    """Filtra los meses pendientes (ver pending_months) a los que vale la pena pedir.
+
+    Sin ningún PDF ingerido aún (almacén vacío o sólo con la semilla) se piden todos. Si no, se piden la frontera (si pasó
+    FRONTIER_RETRY desde el último sondeo) y los faltantes anteriores a ella cuya
+    espera exponencial ya venció; los meses más allá de la frontera se omiten.
+    """
+    pending = list(pending)
+    seeded = seeded_months(store)
+    ingested = [key for key in store.months() if key not in seeded]  # sólo meses con PDF parseado
+    if not ingested: return pending
+    frontier = set(frontier_months(ingested, today))
+    last_ingested = max(ingested)
+    plan = []
+    for year, month in pending:
+        if (year, month) in frontier:
+            if ledger.is_due(year, month, frontier=True, now=now): plan.append((year, month))
+        elif (year, month) < last_ingested:
+            if ledger.is_due(year, month, now=now): plan.append((year, month))
+    return plan
+
+
+def ingest_months(
+    months: Iterable[MonthKey],
+    fetch_fn: Callable[[str], Optional[bytes]],
+    store: ParsedMonthStore,
+    ledger: IngestionLedger,
+    fetch_workers: int,
+    parse_workers: int = DEFAULT_PARSE_WORKERS,
+) -> int:
+    """Descarga, parsea y guarda los meses indicados; registra cada sondeo. Retorna los meses (re)parseados."""
+    months = list(months)
+    if not months: return 0
+    metrics = current_metrics()
+    with metrics.timer("ingesta", meses=len(months)):
+        n_parsed = _ingest_months(months, fetch_fn, store, ledger, fetch_workers, parse_workers, metrics)
+    log_event("ingesta", sondeados=len(months), parseados=n_parsed)
+    return n_parsed
+
+
+def _ingest_months(
+    months: List[MonthKey],
+    fetch_fn: Callable[[str], Optional[bytes]],
+    store: ParsedMonthStore,
+    ledger: IngestionLedger,
+    fetch_workers: int,
+    parse_workers: int,
+    metrics: Metrics,
+) -> int:
+    # Descargar en paralelo
+    urls = [build_report_url(f"{y:04d}", f"{m:02d}") for y, m in months]
+    probes = fetch_concurrently(urls, functools.partial(_probe, fetch_fn), fetch_workers)
+    contents = [pdf_bytes for pdf_bytes, _ in probes]
+    failed = {(y, m) for (y, m), (_, fetch_failed) in zip(months, probes) if fetch_failed}
+    metrics.count("meses_no_publicados", sum(1 for pdf_bytes, fetch_failed in probes if not pdf_bytes and not fetch_failed))
+    metrics.count("meses_descarga_fallida", len(failed))
+
+    # Parsear en paralelo (un PDF por proceso); los lotes vuelven en el mismo orden.
+    # Un PDF idéntico al que ya produjo las filas guardadas (p. ej. tras un 304) no se re-parsea.
+    fetched = [
+        (y, m, pdf_bytes)
+        for (y, m), pdf_bytes in zip(months, contents)
+        if pdf_bytes and store.source_hash(y, m) != content_hash(pdf_bytes)
+    ]
+    batches = parse_month_pdfs([(f"{y:04d}", f"{m:02d}", pdf_bytes) for y, m, pdf_bytes in fetched], parse_workers)
+    # Un parseo vacío (PDF ilegible, error transitorio) no se guarda: el mes queda pendiente y se reintenta
+    parsed = [((y, m), content_hash(pdf_bytes), batch) for (y, m, pdf_bytes), batch in zip(fetched, batches) if batch]
+    failed |= {(y, m) for (y, m, _), batch in zip(fetched, batches) if not batch}
+    store.put_months(parsed)
+
+    for (y, m), pdf_bytes in zip(months, contents):
+        if (y, m) in failed: ledger.record(y, m, "failed")
+        elif pdf_bytes: ledger.record(y, m, "ingested", source=content_hash(pdf_bytes))
+        else: ledger.record(y, m, "missing")
+    ledger.save()
+    return len(parsed)
+
+
+def load_months(
+    months: Iterable[MonthKey],
+    fetch_fn: Callable[[str], Optional[bytes]],
+    store: ParsedMonthStore,
+    ledger: IngestionLedger,
+    fetch_workers: int,
+    parse_workers: int = DEFAULT_PARSE_WORKERS,
+) -> pd.DataFrame:
+    """Filas de los meses pedidos en el esquema compacto (carga de la app).
+
+    Antes ingiere sólo los meses pendientes (ver ingest_pending).
+    """
+    months = list(months)
+    ingest_pending(months, fetch_fn, store, ledger, fetch_workers, parse_workers)
+    return read_months(months, store)
+
+
+def ingest_pending(
+    months: Iterable[MonthKey],
+    fetch_fn: Callable[[str], Optional[bytes]],
+    store: ParsedMonthStore,
+    ledger: IngestionLedger,
+    fetch_workers: int,
+    parse_workers: int = DEFAULT_PARSE_WORKERS,
+) -> int:
+    """Ingiere los meses pendientes (sin filas o sólo con la semilla) que plan_fetch considera
+    vigentes (frontera de publicación o reintento programado). Retorna los meses (re)parseados.
+
+    Sin nada que sondear no lee las filas del almacén: sólo su índice.
+    """
+    plan = plan_fetch(pending_months(months, store), store, ledger)
+    return ingest_months(plan, fetch_fn, store, ledger, fetch_workers, parse_workers)
+
+
+def read_months(months: Iterable[MonthKey], store: ParsedMonthStore) -> pd.DataFrame:
+    """Filas ya ingeridas de los meses pedidos, sin duplicados por (año, mes, producto)."""
+    df = store.get_rows(months)
+    if df.empty: return df
+    return df.drop_duplicates(subset=["year", "mes_num", "producto"], keep='first')
+
+
+def months_since(start_year: int, today: Optional[datetime.date] = None) -> List[MonthKey]:
+    today = today or datetime.date.today()
+    return [
+        (y, m)
+        for y in range(start_year, today.year + 1)
+        for m in range(1, 13)
+        if (y, m) <= (today.year, today.month)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--desde', type=int, default=2015, help='primer año de la serie')
+    parser.add_argument('--revalidar', action='store_true', help='revalidar también los meses ya ingeridos')
+    parser.add_argument('--anomalias', action='store_true', help='puntuar los meses nuevos en output/anomalias_en_linea.csv')
+    args = parser.parse_args()
+
+    configure_logging()
+    store = ParsedMonthStore()
+    n_seeded = seed_store(store)
+    if n_seeded: print(f"🌱 {n_seeded} mes(es) cargado(s) desde los CSV históricos")
+    ledger = IngestionLedger()
+    pending = pending_months(months_since(args.desde), store)
+    plan = plan_fetch(pending, store, ledger)
+    if args.revalidar:
+        plan = sorted(set(plan) | {(y, m) for y, m in store.months() if y >= args.desde})
+    print(f"{len(store.months())} meses en el almacén, {len(pending)} pendientes, {len(plan)} por sondear")
+
+    fetcher = PdfFetcher(cache=PdfBlobCache(max_age=0 if args.revalidar else PDF_CACHE_MAX_AGE))
+    try:
+        n_ingested = ingest_months(plan, fetcher.fetch, store, ledger, fetcher.max_workers)
+    finally:
+        fetcher.close()
+    print(f"✅ {n_ingested} mes(es) parseado(s) | caché de PDFs: {fetcher.cache.stats()}")
+    for key, reason in current_metrics().snapshot()["failures"].items():
+        print(f"⚠️ {key}: {reason}")
+
+    if args.anomalias:
+        from deteccion_anomalias import run_online  # scikit-learn sólo se carga si se pide
+        anomalies = run_online(store, ledger)
+        print(f"✅ {len(anomalies)} anomalía(s) nueva(s) en output/anomalias_en_linea.csv")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""Instantánea del dataset normalizado: archivo Arrow IPC inmutable, versionado y mapeado en memoria.
+
+get_dataset (st.cache_resource) publica el dataset como
+cache/dataset/dataset-<versión>.arrow (IPC sin compresión, para poder mapearlo)
+y lo abre con pa.memory_map: las columnas del DataFrame son vistas de sólo
+lectura sobre las páginas del archivo, que el sistema operativo comparte entre
+todos los procesos de la app (réplicas, workers, reinicios), y los filtros de
+CanastaDataset (months/scope) son slices de esas vistas, sin copias.
+
+La versión es CanastaDataset.version (hash del contenido): un archivo nunca se
+modifica. Publicar una versión nueva escribe su archivo aparte y reemplaza de
+forma atómica el puntero actual.json; quien tenga mapeada la versión anterior
+la sigue usando hasta su próxima recarga. Se conservan las SNAPSHOT_KEEP
+versiones más recientes.
+
+El puntero guarda también la huella del almacén de meses de la que salió la
+versión (ParsedMonthStore.fingerprint). Al arrancar, open_current abre la
+versión apuntada si esa huella coincide con la del almacén: un proceso nuevo
+mapea el archivo sin leer el almacén ni armar el CanastaDataset.
+
+Junto a cada versión se publica su cubo de agregados por categoría
+(cubo-<versión>.arrow, ver agregados.py), también mapeado: los procesos que
+abren la instantánea no vuelven a agrupar el dataset.
+"""
+import glob
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+from almacen_meses import CACHE_DIR
+from datos import CanastaDataset
+from metricas import current_metrics
+
+# --- Configuración ---
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, "dataset")
+POINTER_FILENAME = "actual.json"
+SNAPSHOT_KEEP = 3  # Versiones que se conservan en disco (la actual y las anteriores aún mapeadas)
+_METADATA_KEY = b"canasta_instantanea"
+
+
+def snapshot_path(version: str, directory: str = SNAPSHOT_DIR) -> str:
+    return os.path.join(directory, f"dataset-{version}.arrow")
+
+
+def rollup_path(version: str, directory: str = SNAPSHOT_DIR) -> str:
+    return os.path.join(directory, f"cubo-{version}.arrow")
+
+
+def _read_pointer(directory: str) -> Dict[str, str]:
+    try:
+        with open(os.path.join(directory, POINTER_FILENAME), encoding="utf-8") as fh:
+            pointer = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    return pointer if isinstance(pointer, dict) else {}
+
+
+def current_version(directory: str = SNAPSHOT_DIR) -> Optional[str]:
+    """Versión publicada más reciente según el puntero, o None si no hay."""
+    return _read_pointer(directory).get("version")
+
+
+def _write_table(frame: pd.DataFrame, path: str, version: str, stage: str) -> None:
+    """Escribe el frame como Arrow IPC con la versión en los metadatos; aparece completo o no aparece."""
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    meta = {_METADATA_KEY: json.dumps({"version": version}).encode()}
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), **meta})
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with current_metrics().timer(stage, filas=table.num_rows):
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def _read_table(path: str) -> pa.Table:
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+def publish_snapshot(dataset: CanastaDataset, directory: str = SNAPSHOT_DIR, source: Optional[str] = None) -> Optional[str]:
+    """Escribe la versión del dataset y su cubo (si aún no existen) y la deja como actual. Retorna su ruta.
+
+    source es la huella del almacén de la que salió el dataset (ver open_current).
+    Sin disco escribible retorna None: la app sigue con el dataset en memoria.
+    """
+    version = dataset.version
+    path = snapshot_path(version, directory)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(path):
+            _write_table(dataset.frame, path, version, "instantanea_escritura")
+        cube_path = rollup_path(version, directory)
+        if not os.path.exists(cube_path):
+            _write_table(dataset.rollup, cube_path, version, "cubo_escritura")
+        pointer_state = {"version": version, "source": source}
+        if _read_pointer(directory) != pointer_state:
+            pointer = os.path.join(directory, POINTER_FILENAME)
+            tmp_pointer = f"{pointer}.tmp-{os.getpid()}-{threading.get_ident()}"
+            with open(tmp_pointer, "w", encoding="utf-8") as fh:
+                json.dump(pointer_state, fh)
+            os.replace(tmp_pointer, pointer)
+    except OSError:
+        return None
+    _prune(directory, keep=path)
+    return path
+
+
+def _prune(directory: str, keep: str) -> None:
+    paths = sorted(glob.glob(os.path.join(directory, "dataset-*.arrow")), key=os.path.getmtime, reverse=True)
+    stale = [p for p in paths if p != keep][SNAPSHOT_KEEP - 1:]
+    for path in stale:
+        version = os.path.basename(path)[len("dataset-"):-len(".arrow")]
+        for stale_path in (path, rollup_path(version, directory)):
+            try:
+                os.remove(stale_path)  # en POSIX un proceso que aún lo tenga mapeado conserva sus páginas
+            except OSError:
+                pass
+
+
+def open_snapshot(path: str) -> CanastaDataset:
+    """Dataset sobre el archivo mapeado en memoria: columnas de sólo lectura, sin copiar filas.
+
+    Si junto al archivo está el cubo de la misma versión, queda como dataset.rollup.
+    """
+    with current_metrics().timer("instantanea_apertura"):
+        table = _read_table(path)
+        meta = json.loads((table.schema.metadata or {}).get(_METADATA_KEY, b"{}"))
+        rollup = None
+        if meta.get("version"):
+            try:
+                rollup = _read_table(rollup_path(meta["version"], os.path.dirname(path))).to_pandas(split_blocks=True)
+            except (OSError, pa.ArrowInvalid):
+                pass  # Sin cubo publicado: se arma en el primer uso
+        # split_blocks: una columna por bloque, cada una vista directa del buffer de Arrow
+        return CanastaDataset(table.to_pandas(split_blocks=True), version=meta.get("version"), rollup=rollup)
+
+
+def open_current(source: str, directory: str = SNAPSHOT_DIR) -> Optional[CanastaDataset]:
+    """La versión apuntada por actual.json si se publicó desde un almacén con esta huella; si no, None."""
+    pointer = _read_pointer(directory)
+    if not pointer.get("version") or pointer.get("source") != source: return None
+    try:
+        return open_snapshot(snapshot_path(pointer["version"], directory))
+    except (OSError, pa.ArrowInvalid):
+        return None  # Archivo borrado o incompleto: se vuelve a publicar
+
+
+def shared_dataset(dataset: CanastaDataset, directory: str = SNAPSHOT_DIR, source: Optional[str] = None) -> CanastaDataset:
+    """Publica el dataset y retorna su versión mapeada; sin disco escribible, el mismo dataset."""
+    path = publish_snapshot(dataset, directory, source)
+    return open_snapshot(path) if path else dataset
@@ -0,0 +1,168 @@
+"""Instrumentación del pipeline: tiempos por etapa, contadores, fallas y logs estructurados.
+
+Cada etapa (descarga, apertura del PDF, extracción de páginas, reconocimiento
+de líneas, armado del DataFrame, KPIs, gráficos) se mide con timer() y sus
+volúmenes con count() sobre el registro vigente (current_metrics()). Los
+eventos se emiten como una línea JSON en el logger "canasta" y se acumulan en
+memoria, por proceso, para el panel de diagnóstico de la app (?admin=1).
+
+Los procesos de parseo registran en un colector propio (collecting()) y
+devuelven su snapshot, que el proceso principal suma con merge(): los totales
+no dependen de si se parseó en serie o en paralelo.
+"""
+import io
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List
+
+# --- Configuración ---
+LOGGER_NAME = "canasta"
+LOG_LEVEL = os.environ.get("CBA_LOG_LEVEL", "INFO")
+MAX_FAILURES = 200 # Fallas recientes guardadas (una por clave: URL o mes)
+PROFILE_TOP = 40   # Funciones listadas en el perfil de cProfile
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+def log_event(event: str, level: int = logging.INFO, **fields) -> None:
+    """Emite un evento como una línea JSON: {"evento": ..., campos...}."""
+    if logger.isEnabledFor(level):
+        logger.log(level, json.dumps({"evento": event, **fields}, ensure_ascii=False, default=str))
+
+
+def configure_logging(level: str = LOG_LEVEL) -> None:
+    """Handler de consola para los eventos (lo llaman la app y los CLI; los módulos sólo emiten)."""
+    if logger.handlers: return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('{"ts": "%(asctime)s", "nivel": "%(levelname)s", "datos": %(message)s}'))
+    logger.addHandler(handler)
+    logger.setLevel(level.upper())
+    logger.propagate = False
+
+
+class Metrics:
+    """Contadores, tiempos por etapa ([n, total s, máximo s]) y fallas recientes; seguro entre hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Counter = Counter()
+        self.timings: Dict[str, List[float]] = {}
+        self.failures: Dict[str, str] = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.timings.clear()
+            self.failures.clear()
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+
+    def add_time(self, stage: str, seconds: float, n: int = 1) -> None:
+        with self._lock:
+            entry = self.timings.setdefault(stage, [0, 0.0, 0.0])
+            entry[0] += n
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds / max(n, 1))
+
+    def fail(self, key: str, reason: str) -> None:
+        """Registra una falla (la más reciente por clave) y la emite como WARNING."""
+        with self._lock:
+            self.counters["fallas"] += 1
+            self._remember_failure(key, reason)
+        log_event("falla", logging.WARNING, clave=key, motivo=reason)
+
+    def _remember_failure(self, key: str, reason: str) -> None:
+        self.failures.pop(key, None)
+        self.failures[key] = reason
+        if len(self.failures) > MAX_FAILURES:
+            self.failures.pop(next(iter(self.failures)))
+
+    @contextmanager
+    def timer(self, stage: str, **fields) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            self.add_time(stage, elapsed)
+            log_event("etapa", logging.DEBUG, etapa=stage, ms=round(elapsed * 1000, 2), **fields)
+
+    def snapshot(self) -> Dict:
+        """Copia serializable (se puede devolver desde un proceso de parseo)."""
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "timings": {stage: list(entry) for stage, entry in self.timings.items()},
+                "failures": dict(self.failures),
+            }
+
+    def merge(self, snapshot: Dict) -> None:
+        with self._lock:
+            self.counters.update(snapshot["counters"])
+            for stage, (n, total, peak) in snapshot["timings"].items():
+                entry = self.timings.setdefault(stage, [0, 0.0, 0.0])
+                entry[0] += n
+                entry[1] += total
+                entry[2] = max(entry[2], peak)
+            for key, reason in snapshot["failures"].items():
+                self._remember_failure(key, reason)
+
+
+METRICS = Metrics()  # Registro del proceso (hilos de descarga, reruns de la app, CLI)
+_current: ContextVar[Metrics] = ContextVar("canasta_metrics", default=METRICS)
+
+
+def current_metrics() -> Metrics:
+    return _current.get()
+
+
+@contextmanager
+def collecting() -> Iterator[Metrics]:
+    """Registra en un colector nuevo dentro del bloque (p. ej. un job de parseo en otro proceso)."""
+    local = Metrics()
+    token = _current.set(local)
+    try:
+        yield local
+    finally:
+        _current.reset(token)
+
+
+class RerunProfile:
+    """Perfil de un solo rerun: cProfile, o pyinstrument si se pide y está instalado."""
+
+    def __init__(self, kind: str = "cprofile"):
+        self.kind = "cprofile"
+        if kind == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+                self._profiler = Profiler()
+                self.kind = "pyinstrument"
+            except ImportError:
+                pass  # Dependencia opcional: se cae a cProfile
+        if self.kind == "cprofile":
+            import cProfile
+            self._profiler = cProfile.Profile()
+
+    def start(self) -> "RerunProfile":
+        if self.kind == "pyinstrument": self._profiler.start()
+        else: self._profiler.enable()
+        return self
+
+    def stop(self) -> str:
+        """Detiene el perfil y retorna el reporte en texto."""
+        if self.kind == "pyinstrument":
+            self._profiler.stop()
+            return self._profiler.output_text(unicode=True)
+        import pstats
+        self._profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        return out.getvalue()
@@ -1,93 +1,63 @@
-import pdfplumber
-import re
+"""Extrae el resumen ('Cuadro 1') y las variaciones del 'Anexo 2' de los PDFs de una o más carpetas.
+
+Cada PDF se abre una sola vez y su texto alimenta ambos extractores; los
+registros se generan página por página (extraccion_pdf.iter_report_dir) y se
+escriben de forma incremental en output/resumen_canasta y
+output/variaciones_productos (CSV o Parquet), así que la memoria no depende de
+cuántos PDFs haya en las carpetas.
+
+Uso: python parser_canasta2.py [--pdf-dir pdf [otra_carpeta ...]] [--output-dir output] [--formato csv|parquet] [--workers N]
+"""
+import argparse
 import os
-import pandas as pd
+
+import pyarrow as pa
+
+from extraccion_pdf import SUMMARY_KEYS, iter_report_dir, list_report_files
+from salidas import OUTPUT_DIR, open_sink
 
 # Carpeta que contiene los archivos PDF
 pdf_dir = 'pdf'
-# Páginas a omitir al inicio de cada PDF (metadatos/intros)
-skip_pages = 1
+# Procesos para extraer los PDFs en paralelo (1 = secuencial)
+max_workers = os.cpu_count() or 1
+
+SUMMARY_SCHEMA = pa.schema([(key, pa.float64()) for key in SUMMARY_KEYS] + [('file', pa.string())])
+VARIATIONS_SCHEMA = pa.schema([('producto', pa.string()), ('variacion', pa.float64()), ('file', pa.string())])
 
-# Construir lista dinámica de archivos PDF en la carpeta
-def list_pdf_files(directory):
-    return [f for f in sorted(os.listdir(directory)) if f.lower().endswith('.pdf')]
 
-# Función para extraer métricas generales (CBA, LP, LPE) de 'Cuadro 1'
-def extract_summary(pdf_path):
-    summary = {}
-    pattern = re.compile(
-        r"CBA\s+(\d+[.,]?\d*)|LP por persona equivalente\s+(\d+[.,]?\d*)|LPE por persona equivalente\s+(\d+[.,]?\d*)",
-        re.IGNORECASE
-    )
-    with pdfplumber.open(pdf_path) as pdf:
-        # Leer primeras páginas donde suele estar Cuadro 1
-        text = "".join(page.extract_text() or '' for page in pdf.pages[:skip_pages + 2])
-        for match in pattern.finditer(text):
-            if match.group(1): summary['CBA'] = float(match.group(1).replace('.', '').replace(',', '.'))
-            if match.group(2): summary['LP']  = float(match.group(2).replace('.', '').replace(',', '.'))
-            if match.group(3): summary['LPE'] = float(match.group(3).replace('.', '').replace(',', '.'))
-    return summary
+def run(pdf_dirs, output_dir: str, fmt: str = 'csv', workers: int = max_workers):
+    """Recorre las carpetas y escribe ambos archivos a medida que llegan los informes. Retorna (pdfs, variaciones)."""
+    n_pdfs = 0
+    with open_sink(os.path.join(output_dir, 'resumen_canasta'), SUMMARY_SCHEMA, fmt) as summary_sink, \
+            open_sink(os.path.join(output_dir, 'variaciones_productos'), VARIATIONS_SCHEMA, fmt) as variations_sink:
+        for pdf_name, summary, records in iter_report_dir(pdf_dirs, workers):
+            summary_sink.write([{**summary, 'file': pdf_name}])
+            variations_sink.write({**record, 'file': pdf_name} for record in records)
+            n_pdfs += 1
+    return n_pdfs, variations_sink.rows_written
 
-# Función para extraer variaciones de productos de 'Anexo 2'
-def extract_variations(pdf_path):
-    records = []
-    table_start = False
-    pattern = re.compile(r"^(.+?)\s+(-?\d+[.,]?\d*)$")
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text() or ''
-            for line in text.split('\n'):
-                # Marcar inicio de la sección Anexo 2
-                if 'Anexo 2' in line:
-                    table_start = True
-                    continue
-                if not table_start:
-                    continue
-                match = pattern.match(line.strip())
-                if match:
-                    producto = match.group(1).strip()
-                    valor = float(match.group(2).replace(',', '.'))
-                    records.append({'producto': producto, 'variacion': valor})
-    return pd.DataFrame(records)
 
 # Script principal
 def main():
-    pdf_files = list_pdf_files(pdf_dir)
-    if not pdf_files:
-        print(f"🚫 No se encontraron archivos PDF en la carpeta '{pdf_dir}'")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pdf-dir', nargs='+', default=[pdf_dir], help='carpeta(s) con los informes PDF')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help='carpeta de salida')
+    parser.add_argument('--formato', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--workers', type=int, default=max_workers, help='procesos para extraer (1 = secuencial)')
+    args = parser.parse_args()
+
+    missing = [d for d in args.pdf_dir if not os.path.isdir(d)]
+    if missing or not list_report_files(args.pdf_dir):
+        print(f"🚫 No se encontraron archivos PDF en la carpeta '{', '.join(missing or args.pdf_dir)}'")
         return
 
-    summaries = []
-    variations = []
-
-    for pdf_name in pdf_files:
-        path = os.path.join(pdf_dir, pdf_name)
-        print(f"Procesando {pdf_name}...")
-
-        # Extraer resumen
-        summary = extract_summary(path)
-        summary['file'] = pdf_name
-        summaries.append(summary)
-
-        # Extraer variaciones
-        df_var = extract_variations(path)
-        if not df_var.empty:
-            df_var['file'] = pdf_name
-            variations.append(df_var)
-
-    # Consolidar resultados
-    df_summary    = pd.DataFrame(summaries)
-    df_variations = pd.concat(variations, ignore_index=True) if variations else pd.DataFrame()
-
-    # Guardar outputs
-    output_dir = 'output'
-    os.makedirs(output_dir, exist_ok=True)
-    df_summary.to_csv(os.path.join(output_dir, 'resumen_canasta.csv'), index=False)
-    df_variations.to_csv(os.path.join(output_dir, 'variaciones_productos.csv'), index=False)
+    print(f"Procesando PDFs de '{', '.join(args.pdf_dir)}' con hasta {args.workers} proceso(s)...")
+    n_pdfs, n_variations = run(args.pdf_dir, args.output_dir, args.formato, args.workers)
 
-    print("\n✅ Extracción completa")
-    print(f"- Resumen guardado en: {output_dir}/resumen_canasta.csv")
-    print(f"- Variaciones guardado en: {output_dir}/variaciones_productos.csv")
+    ext = args.formato
+    print(f"\n✅ Extracción completa ({n_pdfs} PDFs, {n_variations} variaciones)")
+    print(f"- Resumen guardado en: {args.output_dir}/resumen_canasta.{ext}")
+    print(f"- Variaciones guardado en: {args.output_dir}/variaciones_productos.{ext}")
 
 if __name__ == '__main__':
     main()
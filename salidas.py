@@ -0,0 +1,108 @@
+import csv
+import os
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# --- Configuración ---
+OUTPUT_DIR = 'output'
+FLUSH_ROWS = 10_000  # filas acumuladas antes de escribir un row group Parquet
+
+
+class CsvSink:
+    """Escritor CSV incremental: el encabezado se escribe al abrir y cada lote se agrega al final.
+
+    Las columnas son fijas; una clave ausente en una fila queda vacía. Con
+    append=True se agregan filas a un archivo previo con el mismo encabezado.
+    """
+
+    def __init__(self, path: str, columns: List[str], append: bool = False):
+        self.path = path
+        self.columns = columns
+        self.rows_written = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Con append se continúa un archivo existente sólo si tiene el mismo encabezado
+        self.appending = append and read_header(path) == columns
+        self._fh = open(path, 'a' if self.appending else 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._fh, fieldnames=columns, extrasaction='ignore', lineterminator='\n')
+        if not self.appending: self._writer.writeheader()
+
+    def write(self, rows: Iterable[Dict]) -> None:
+        for row in rows:
+            self._writer.writerow(row)
+            self.rows_written += 1
+        self._fh.flush()
+
+    def close(self) -> None:
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_header(path: str) -> Optional[List[str]]:
+    """Encabezado de un CSV existente, o None si no existe o está vacío."""
+    try:
+        with open(path, newline='', encoding='utf-8') as fh:
+            return next(csv.reader(fh), None)
+    except OSError:
+        return None
+
+
+class ParquetSink:
+    """Escritor Parquet incremental con esquema fijo; acumula hasta FLUSH_ROWS filas por row group."""
+
+    def __init__(self, path: str, schema: pa.Schema, flush_rows: int = FLUSH_ROWS):
+        self.path = path
+        self.schema = schema
+        self.flush_rows = flush_rows
+        self.rows_written = 0
+        self._buffer: List[Dict] = []
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._writer = pq.ParquetWriter(path, schema)
+
+    def write(self, rows: Iterable[Dict]) -> None:
+        for row in rows:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.flush_rows: self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer: return
+        columns = {name: [row.get(name) for row in self._buffer] for name in self.schema.names}
+        self._writer.write_table(pa.Table.from_pydict(columns, schema=self.schema))
+        self.rows_written += len(self._buffer)
+        self._buffer = []
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_sink(path_without_ext: str, schema: pa.Schema, fmt: str = 'csv', flush_rows: Optional[int] = None):
+    """Abre un escritor incremental '<ruta>.csv' o '<ruta>.parquet' con las columnas del esquema."""
+    if fmt == 'parquet':
+        return ParquetSink(f"{path_without_ext}.parquet", schema, flush_rows or FLUSH_ROWS)
+    if fmt == 'csv':
+        return CsvSink(f"{path_without_ext}.csv", schema.names)
+    raise ValueError(f"formato de salida desconocido: {fmt}")
+
+
+def read_output(name: str, output_dir: str = OUTPUT_DIR) -> pd.DataFrame:
+    """Lee '<output_dir>/<name>' en el formato escrito más recientemente (Parquet o CSV)."""
+    candidates = [os.path.join(output_dir, f"{name}.{ext}") for ext in ('parquet', 'csv')]
+    existing = [path for path in candidates if os.path.exists(path)]
+    if not existing:
+        raise FileNotFoundError(f"No existe {candidates[1]}; ejecuta primero parser_canasta2.py")
+    path = max(existing, key=os.path.getmtime)
+    return pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
@@ -1,13 +1,29 @@
 import streamlit as st
 import pandas as pd
-import pdfplumber
-import requests
-import re
-from io import BytesIO
+import numpy as np
 import datetime
+import hashlib
+import json
+import os
 import plotly.express as px
 import plotly.graph_objects as go
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from agregados import BASKET, category_cumulative, rollup_months
+from almacen_meses import MonthKey, ParsedMonthStore
+from datos import PERIOD_COLUMN, CanastaDataset, period_labels, scope_ordinals
+from descarga_pdf import DEFAULT_MAX_WORKERS, PdfBlobCache, PdfFetcher
+from deteccion_anomalias import ANOMALY_FLAGS, ANOMALY_LABELS
+from configuracion import (
+    CATEGORY_OPTIONS, DEFAULT_CATEGORIES, START_YEAR_DATA, max_years_config, products_for_categories,
+    valid_presidential_periods,
+)
+from extraccion_pdf import DEFAULT_PARSE_WORKERS, NUM2MONTH
+from historico import seed_store
+from indicadores import get_presidential_kpis, months_in
+from instantanea import open_current, shared_dataset
+from ingesta import IngestionLedger, ingest_pending, read_months
+from metricas import METRICS, RerunProfile, configure_logging, current_metrics
 
 # ====== CONFIGURACIÓN DE DISEÑO Y ESTILO ======
 # Paleta de colores (ejemplo)
@@ -168,212 +184,216 @@ footer {{
 """
 
 # ====== CONFIGURACIÓN DE DATOS ======
-START_YEAR_DATA = 2015
-current_year = datetime.date.today().year
-MAX_YEARS_CONFIG: Dict[str, List[str]] = {}
-for year_num in range(START_YEAR_DATA, current_year + 1):
-    year_str = str(year_num)
-    if year_num < current_year:
-        MAX_YEARS_CONFIG[year_str] = [f"{i:02d}" for i in range(1, 13)]
-    else:
-        current_month_for_data = datetime.date.today().month
-        if datetime.date.today().day < 20: # Asumir que los datos del mes anterior están disponibles después del día 20
-            current_month_for_data -= 1
-        if current_month_for_data == 0:
-            if str(current_year - 1) in MAX_YEARS_CONFIG:
-                 MAX_YEARS_CONFIG[str(current_year - 1)] = [f"{i:02d}" for i in range(1, 13)]
-            if year_str == str(current_year): # No agregar meses para el año actual si es Enero muy temprano
-                 MAX_YEARS_CONFIG[year_str] = [] # Inicializar vacío
-        else:
-            MAX_YEARS_CONFIG[year_str] = [f"{i:02d}" for i in range(1, current_month_for_data + 1)]
-
-SKIP_PAGES = 4
-NUM2MONTH = {
-    '01': 'Enero', '02': 'Febrero', '03': 'Marzo', '04': 'Abril', '05': 'Mayo', '06': 'Junio',
-    '07': 'Julio', '08': 'Agosto', '09': 'Septiembre', '10': 'Octubre', '11': 'Noviembre', '12': 'Diciembre'
-}
-LINE_REGEX = re.compile(r"^(.+?)\s+(-?\d+[.,]\d+)$")
-
-FIXED_PRODUCTS = [
-    "Arroz","Pan corriente sin envasar","Espiral","Galleta dulce","Galleta no dulce",
-    "Torta 15 o 20 personas","Prepizza familiar","Harina de trigo","Avena","Asiento",
-    "Carne molida","Chuleta de cerdo centro o vetada","Costillar de cerdo","Pulpa de cerdo",
-    "Carne de pavo molida","Pechuga de pollo","Pollo entero","Trutro de pollo",
-    "Pulpa de cordero fresco o refrigerado","Salchicha y vienesa de ave",
-    "Salchicha y vienesa tradicional","Longaniza","Jamón de cerdo","Pate",
-    "Merluza fresca o refrigerada","Choritos frescos o refrigerados en su concha",
-    "Jurel en conserva","Surtido en conserva","Leche líquida entera",
-    "Leche en polvo entera instantánea","Yogurt","Queso Gouda",
-    "Quesillo y queso fresco con sal","Queso crema","Huevo de gallina",
-    "Mantequilla con sal","Margarina","Aceite vegetal combinado o puro",
-    "Plátano","Manzana","Maní salado","Poroto","Lenteja","Lechuga","Zapallo",
-    "Limón","Palta","Tomate","Zanahoria","Cebolla nueva","Choclo congelado",
-    "Papa de guarda","Azúcar","Chocolate","Caramelo","Helado familiar un sabor",
-    "Salsa de tomate","Sucedáneo de café","Te para preparar","Agua mineral",
-    "Bebida gaseosa tradicional","Bebida energizante","Refresco isotónico",
-    "Jugo líquido","Néctar líquido","Refresco en polvo","Completo","Papas fritas",
-    "Té corriente","Biscochos dulces y medialunas","Entrada (ensalada o sopa)",
-    "Postre para almuerzo","Promoción de comida rápida",
-    "Tostadas (palta o mantequilla o mermelada o mezcla de estas)",
-    "Aliado (jamón queso) o Barros Jarpa","Pollo asado entero","Empanada de horno",
-    "Colación o menú del día o almuerzo ejecutivo","Plato de fondo para almuerzo"
-]
-
-PRODUCT_CATEGORIES = {
-    "Cereales y Harinas": ["Arroz", "Harina de trigo", "Avena", "Espiral"],
-    "Panadería y Masas": ["Pan corriente sin envasar", "Torta 15 o 20 personas", "Prepizza familiar", "Biscochos dulces y medialunas", "Tostadas (palta o mantequilla o mermelada o mezcla de estas)"],
-    "Carnes Rojas y Procesados": ["Carne molida", "Chuleta de cerdo centro o vetada", "Costillar de cerdo", "Pulpa de cerdo", "Jamón de cerdo", "Longaniza", "Salchicha y vienesa tradicional", "Pate", "Aliado (jamón queso) o Barros Jarpa", "Asiento"],
-    "Aves y Derivados": ["Pollo entero", "Pechuga de pollo", "Trutro de pollo", "Carne de pavo molida", "Salchicha y vienesa de ave", "Pollo asado entero"],
-    "Cordero": ["Pulpa de cordero fresco o refrigerado"],
-    "Pescados y Mariscos": ["Merluza fresca o refrigerada", "Choritos frescos o refrigerados en su concha", "Jurel en conserva", "Surtido en conserva"],
-    "Lácteos y Huevos": ["Leche líquida entera", "Leche en polvo entera instantánea", "Yogurt", "Queso Gouda", "Quesillo y queso fresco con sal", "Queso crema", "Mantequilla con sal", "Margarina", "Huevo de gallina"],
-    "Aceites y Grasas": ["Aceite vegetal combinado o puro"],
-    "Frutas": ["Plátano", "Manzana", "Limón", "Palta"],
-    "Legumbres y Frutos Secos": ["Poroto", "Lenteja", "Maní salado"],
-    "Verduras y Tubérculos": ["Lechuga", "Zapallo", "Tomate", "Zanahoria", "Cebolla nueva", "Papa de guarda", "Choclo congelado"],
-    "Azúcares y Dulces": ["Azúcar", "Chocolate", "Caramelo", "Helado familiar un sabor", "Galleta dulce"],
-    "Snacks Salados": ["Galleta no dulce", "Papas fritas"],
-    "Salsas y Condimentos": ["Salsa de tomate"],
-    "Bebestibles (Café, Té)": ["Sucedáneo de café", "Te para preparar", "Té corriente"],
-    "Bebidas Frías y Refrescos": ["Agua mineral", "Bebida gaseosa tradicional", "Bebida energizante", "Refresco isotónico", "Jugo líquido", "Néctar líquido", "Refresco en polvo"],
-    "Comidas Preparadas y Rápidas": ["Completo", "Entrada (ensalada o sopa)", "Postre para almuerzo", "Promoción de comida rápida", "Empanada de horno", "Colación o menú del día o almuerzo ejecutivo", "Plato de fondo para almuerzo"],
-    "Sin Categoría": [] # Se poblará automáticamente
-}
-
-PRESIDENTIAL_PERIODS = {
-    "Todos los Periodos": None,
-    "Gabriel Boric (Mar 2022 - Actualidad)": {"start_year": 2022, "start_month": 3, "end_year": current_year, "end_month": datetime.date.today().month},
-    "Sebastián Piñera II (Mar 2018 - Mar 2022)": {"start_year": 2018, "start_month": 3, "end_year": 2022, "end_month": 3},
-    "Michelle Bachelet II (Mar 2014 - Mar 2018)": {"start_year": 2014, "start_month": 3, "end_year": 2018, "end_month": 3},
-    # Añadir más periodos si START_YEAR_DATA lo permite y se tienen los datos
-}
-# Filtrar periodos presidenciales para que solo incluyan años desde START_YEAR_DATA
-VALID_PRESIDENTIAL_PERIODS = {"Todos los Periodos": None}
-for name, details in PRESIDENTIAL_PERIODS.items():
-    if name == "Todos los Periodos": continue
-    if details and details["end_year"] >= START_YEAR_DATA:
-        # Ajustar el año de inicio si es anterior a START_YEAR_DATA
-        if details["start_year"] < START_YEAR_DATA:
-            adjusted_details = details.copy()
-            adjusted_details["start_year"] = START_YEAR_DATA
-            adjusted_details["start_month"] = 1 # Empezar desde enero del START_YEAR_DATA
-            VALID_PRESIDENTIAL_PERIODS[name] = adjusted_details
-        else:
-            VALID_PRESIDENTIAL_PERIODS[name] = details
+# Derivada una vez por proceso (y por día) en configuracion.py: cada rerun sólo consulta
+today = datetime.date.today()
+current_year = today.year
+MAX_YEARS_CONFIG = max_years_config(today)
+VALID_PRESIDENTIAL_PERIODS = valid_presidential_periods(today)
+
+PDF_FETCH_WORKERS = DEFAULT_MAX_WORKERS # Descargas simultáneas hacia el servidor del ministerio
+PDF_PARSE_WORKERS = DEFAULT_PARSE_WORKERS # Procesos para extraer texto de los PDFs
+ANOMALY_MIN_VOTES = 2 # Métodos de deteccion_anomalias que deben coincidir para marcar un movimiento inusual
+FIGURE_CACHE_ENTRIES = 64 # Combinaciones de filtros con gráficos en memoria (LRU compartido entre sesiones)
+LARGE_CHART_POINTS = 2000 # Puntos (productos x periodos) desde los que el gráfico de líneas usa WebGL y arreglos compactos
+CHART_MAX_POINTS = 6000 # Sobre este número de puntos se agrega por trimestre (o año) antes de enviar al navegador
+CHART_GRANULARITIES = [("mes", 1), ("trimestre", 3), ("año", 12)] # (nombre, meses por punto)
+PROFILE_KINDS = ("cprofile", "pyinstrument") # Valores de ?perfil= (perfil de un solo rerun)
+# ?admin=1 y ?perfil= exponen tiempos, URLs fallidas y perfiles: sólo se atienden en un despliegue con CBA_DIAGNOSTICO=1
+DIAGNOSTICS_ENABLED = os.environ.get("CBA_DIAGNOSTICO") == "1"
+
+configure_logging() # Eventos JSON del pipeline en la consola del servidor (nivel: CBA_LOG_LEVEL)
 
 
 # ====== FUNCIONES DE CARGA Y PROCESAMIENTO DE DATOS ======
-@st.cache_data(ttl=3600 * 12) # Cachear PDFs por 12 horas
-def fetch_pdf_content_cached(url: str) -> Optional[bytes]:
-    try:
-        r = requests.get(url, timeout=20)
-        r.raise_for_status()
-        return r.content
-    except requests.exceptions.RequestException:
-        return None
-
-@st.cache_data(ttl=3600 * 4) # Cachear datos procesados por 4 horas
-def load_data(years_to_fetch_config: Dict[str, List[str]]) -> pd.DataFrame:
-    rows = []
-    # st.write(f"Debug: load_data called with years_to_fetch_config: {years_to_fetch_config}") # Para depuración
-    sorted_years_keys = sorted(years_to_fetch_config.keys())
-
-    for year_str in sorted_years_keys:
-        meses_str = years_to_fetch_config[year_str]
-        if not meses_str: continue
-        short_year = year_str[2:]
-        for mm_str in meses_str:
-            url = (
-                f"https://observatorio.ministeriodesarrollosocial.gob.cl"
-                f"/storage/docs/cba/nueva_serie/{year_str}"
-                f"/Valor_CBA_y_LPs_{short_year}.{mm_str}.pdf"
+@st.cache_resource(show_spinner=False)
+def get_pdf_fetcher() -> PdfFetcher:
+    # Una sola sesión HTTP (keep-alive) compartida por todas las descargas del proceso,
+    # con caché local de PDFs que se revalida con ETag/Last-Modified
+    return PdfFetcher(max_workers=PDF_FETCH_WORKERS, cache=PdfBlobCache())
+
+@st.cache_resource(show_spinner=False)
+def get_month_store() -> ParsedMonthStore:
+    # Meses ya parseados, persistidos en disco: sobreviven a reinicios del contenedor
+    store = ParsedMonthStore()
+    seed_store(store)  # Meses de los CSV históricos: respaldo hasta que se ingiere su PDF
+    return store
+
+@st.cache_resource(show_spinner=False)
+def get_ingestion_ledger() -> IngestionLedger:
+    # Qué meses se sondearon, cuáles faltan y cuándo reintentarlos
+    return IngestionLedger()
+
+# Sin st.cache_data: cachear un 404 por horas ocultaría un informe recién publicado.
+# Los PDFs descargados quedan en la caché en disco del fetcher (PdfBlobCache)
+def fetch_pdf_content(url: str) -> Optional[bytes]:
+    return get_pdf_fetcher().fetch(url)
+
+def requested_months(years_to_fetch_config: Dict[str, List[str]]) -> List[MonthKey]:
+    return [
+        (int(year_str), int(mm_str))
+        for year_str in sorted(years_to_fetch_config.keys())
+        for mm_str in (years_to_fetch_config[year_str] or [])
+    ]
+
+@st.cache_resource(ttl=3600 * 4, show_spinner=False) # Dataset completo, compartido y renovado cada 4 horas
+def get_dataset() -> CanastaDataset:
+    # Se carga una sola vez todo MAX_YEARS_CONFIG y se publica como instantánea Arrow mapeada en
+    # memoria: todas las sesiones (y procesos) leen las mismas páginas; los filtros son vistas sin copia
+    with current_metrics().timer("carga_datos"):
+        months = requested_months(MAX_YEARS_CONFIG)
+        store = get_month_store()
+        # Sólo se ingieren los meses que faltan en el almacén persistente y que el registro de
+        # ingesta considera vigentes; las filas vuelven en el esquema compacto
+        ingest_pending(months, fetch_pdf_content, store, get_ingestion_ledger(), PDF_FETCH_WORKERS, PDF_PARSE_WORKERS)
+        # Si nada cambió desde la última publicación (de este u otro proceso), se mapea esa
+        # instantánea sin leer las filas del almacén ni rearmar el dataset
+        source = store.fingerprint(months)
+        return open_current(source) or shared_dataset(CanastaDataset(read_months(months, store)), source=source)
+
+def filter_cache_key(dataset_version: str, years_config: Dict[str, List[str]], months: List[str], products: List[str], show_anomalies: bool) -> str:
+    """Hash estable del estado de los filtros: no depende del orden de selección en los multiselect."""
+    state = [
+        dataset_version,
+        sorted((year, sorted(mms or [])) for year, mms in years_config.items()),
+        sorted(months), sorted(products), show_anomalies,
+    ]
+    return hashlib.sha256(json.dumps(state, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+class VariationCharts(NamedTuple):
+    fig_line: Optional[go.Figure]
+    fig_bar_tops: Optional[go.Figure]
+    df_unusual: pd.DataFrame
+    line_note: Optional[str] = None
+
+def bucket_labels(buckets: np.ndarray, months_per_bucket: int) -> List[str]:
+    """Etiquetas de ordinal // months_per_bucket: "2024 Enero", "2024 T1" o "2024"."""
+    if months_per_bucket == 1: return period_labels(buckets)
+    if months_per_bucket == 3: return [f"{b // 4} T{b % 4 + 1}" for b in buckets]
+    return [str(b) for b in buckets]
+
+def large_line_chart(monthly_pivot: pd.DataFrame, df_unusual: pd.DataFrame) -> Tuple[go.Figure, Optional[str]]:
+    """Gráfico de líneas para selecciones grandes (pivote indexado por ordinal del mes).
+
+    Usa Scattergl y envía cada serie como un arreglo float32 redondeado a 2
+    decimales (Plotly lo serializa en binario) en lugar del DataFrame ancho de
+    px.line. Sobre CHART_MAX_POINTS agrega los meses por trimestre o por año.
+    """
+    ordinals = monthly_pivot.index.to_numpy()
+    for granularity, months_per_bucket in CHART_GRANULARITIES:
+        buckets = ordinals // months_per_bucket
+        if np.unique(buckets).size * monthly_pivot.shape[1] <= CHART_MAX_POINTS: break
+    values = monthly_pivot.groupby(buckets).mean() if months_per_bucket > 1 else monthly_pivot
+    labels = bucket_labels(values.index.to_numpy(), months_per_bucket)
+    series = values.to_numpy(dtype=np.float64).round(2).astype(np.float32)
+
+    fig = go.Figure([
+        go.Scattergl(
+            x=labels, y=series[:, j], mode='lines', name=product,
+            line=dict(color=px.colors.qualitative.Plotly[j % len(px.colors.qualitative.Plotly)]),
+            hovertemplate=f'{product}<br>%{{x}}: %{{y:.2f}}%<extra></extra>'
+        )
+        for j, product in enumerate(values.columns)
+    ])
+    if not df_unusual.empty:
+        fig.add_trace(go.Scattergl(
+            x=bucket_labels(df_unusual[PERIOD_COLUMN].to_numpy() // months_per_bucket, months_per_bucket),
+            y=df_unusual['variacion'].to_numpy(dtype=np.float32), mode='markers', name='Movimiento inusual',
+            text=(df_unusual['producto'].astype(str) + " (" + df_unusual['mes'].astype(str) + ")").tolist(),
+            marker=dict(symbol='x', size=10, color=COLOR_ACCENT_DANGER),
+            hovertemplate='%{text}: %{y:.2f}%<extra>Inusual</extra>'
+        ))
+    fig.update_layout(
+        height=500, legend_title_text='Productos', xaxis_tickangle=-45, xaxis_type='category',
+        yaxis_title='Variación (%)', xaxis_title='Período',
+        hovermode="closest", paper_bgcolor=COLOR_BACKGROUND_MAIN, plot_bgcolor=COLOR_BACKGROUND_MAIN,
+        font=dict(family=FONT_FAMILY_SANS_SERIF, color=COLOR_PRIMARY_TEXT)
+    )
+    note = None
+    if months_per_bucket > 1:
+        note = f"Selección grande ({monthly_pivot.size:,} puntos): se muestra la variación mensual promedio por {granularity}. Acota productos o años para ver cada mes."
+    return fig, note
+
+# Compartido entre sesiones y sin copiar: los gráficos devueltos no deben modificarse
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def build_variation_charts(filter_key: str, _df_filtered: pd.DataFrame, _anomaly_scores: Optional[pd.DataFrame]) -> VariationCharts:
+    """Pivote, top 5 y gráficos de la sección de variaciones; se recalculan sólo si cambia filter_key."""
+    current_metrics().count("graficos_cache_miss")
+    with current_metrics().timer("graficos", clave=filter_key):
+        monthly_pivot = _df_filtered.pivot_table(
+            index=PERIOD_COLUMN, columns="producto", values="variacion", aggfunc="mean", observed=True
+        ).dropna(how='all', axis=0)
+        monthly_pivot.columns = monthly_pivot.columns.astype(str)
+
+        # Movimientos inusuales: puntajes precalculados del dataset, alineados por índice (sin ajustar modelos aquí)
+        df_unusual = pd.DataFrame()
+        if _anomaly_scores is not None:
+            df_scored = _df_filtered.join(_anomaly_scores.loc[_df_filtered.index])
+            df_unusual = df_scored[df_scored['anomaly_votes'] >= ANOMALY_MIN_VOTES]
+
+        fig_line, line_note = None, None
+        if monthly_pivot.size > LARGE_CHART_POINTS:
+            fig_line, line_note = large_line_chart(monthly_pivot, df_unusual)
+        elif not monthly_pivot.empty:
+            monthly_pivot.index = pd.Index(period_labels(monthly_pivot.index), name="periodo")
+            fig_line = px.line(
+                monthly_pivot, x=monthly_pivot.index.astype(str), y=monthly_pivot.columns,
+                labels={'value': 'Variación (%)', 'periodo': 'Período', 'producto': 'Producto'},
+                color_discrete_sequence=px.colors.qualitative.Plotly # Paleta de colores
             )
-            pdf_bytes = fetch_pdf_content_cached(url)
-            if not pdf_bytes: continue
-
-            month_name = NUM2MONTH[mm_str]
-            try:
-                with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
-                    for i, page in enumerate(pdf.pages):
-                        if i < SKIP_PAGES: continue
-                        page_text = page.extract_text() or ""
-                        for line in page_text.split("\n"):
-                            match = LINE_REGEX.match(line.strip())
-                            if not match: continue
-                            product_name = match.group(1).strip()
-                            try:
-                                value = float(match.group(2).replace(",", "."))
-                            except ValueError: continue
-                            if product_name.lower() == "cba": continue
-                            if product_name not in FIXED_PRODUCTS: continue
-                            if abs(value) > 250: continue # Umbral amplio
-                            rows.append({
-                                "year": int(year_str),
-                                "mes_num": int(mm_str),
-                                "mes": month_name,
-                                "producto": product_name,
-                                "variacion": value
-                            })
-            except Exception: # pylint: disable=broad-except
-                # Consider logging this error if running in production
-                # st.warning(f"Error procesando PDF para {month_name} {year_str}. URL: {url}. Error: {e}")
-                continue
-    
-    df = pd.DataFrame(rows)
-    if df.empty: return df
-    
-    df['year'] = df['year'].astype(int)
-    df['mes_num'] = df['mes_num'].astype(int)
-    return df.drop_duplicates(subset=["year", "mes_num", "producto"], keep='first')
+            fig_line.update_layout(
+                height=500, legend_title_text='Productos', xaxis_tickangle=-45, 
+                hovermode="x unified", paper_bgcolor=COLOR_BACKGROUND_MAIN, plot_bgcolor=COLOR_BACKGROUND_MAIN,
+                font=dict(family=FONT_FAMILY_SANS_SERIF, color=COLOR_PRIMARY_TEXT)
+            )
+            if not df_unusual.empty:
+                fig_line.add_trace(go.Scatter(
+                    x=period_labels(df_unusual[PERIOD_COLUMN]), y=df_unusual['variacion'], mode='markers',
+                    name='Movimiento inusual', text=df_unusual['producto'].astype(str),
+                    marker=dict(symbol='x', size=10, color=COLOR_ACCENT_DANGER),
+                    hovertemplate='%{text}: %{y:.2f}%<extra>Inusual</extra>'
+                ))
+
+        avg_variation_per_product = _df_filtered.groupby('producto', observed=True)['variacion'].mean().sort_values()
+        top_increases = avg_variation_per_product[avg_variation_per_product > 0].nlargest(5).sort_values(ascending=False)
+        top_decreases = avg_variation_per_product[avg_variation_per_product <= 0].nsmallest(5).sort_values(ascending=True)
+        combined_tops = pd.concat([top_decreases, top_increases.iloc[::-1]] ).sort_values()
 
-def calculate_period_cumulative_variation(df_period_product: pd.DataFrame) -> float:
-    """Calcula la variación acumulada para un producto sobre un período de varios meses/años."""
-    if df_period_product.empty: return 0.0
-    
-    # Asegurar orden cronológico
-    df_sorted = df_period_product.sort_values(['year', 'mes_num'])
-    
-    cumulative_factor = 1.0
-    for var_monthly in df_sorted['variacion']:
-        cumulative_factor *= (1 + var_monthly / 100.0)
-    return (cumulative_factor - 1) * 100.0
-
-def get_presidential_kpis(df_presidency_scope: pd.DataFrame, all_products_in_period_scope: pd.DataFrame, selected_prods_for_avg: List[str]) -> Dict:
-    kpis = {
-        "avg_cumulative_variation": None,
-        "max_increase_product": None, "max_increase_value": None,
-        "max_decrease_product": None, "max_decrease_value": None,
-    }
-    if df_presidency_scope.empty: return kpis
-
-    # 1. Variación acumulada promedio (para productos seleccionados en el filtro general)
-    cumulative_variations_selected_prods = []
-    if selected_prods_for_avg:
-        for prod in selected_prods_for_avg:
-            df_prod_period = df_presidency_scope[df_presidency_scope['producto'] == prod]
-            if not df_prod_period.empty:
-                cum_var = calculate_period_cumulative_variation(df_prod_period)
-                cumulative_variations_selected_prods.append(cum_var)
-        if cumulative_variations_selected_prods:
-            kpis["avg_cumulative_variation"] = sum(cumulative_variations_selected_prods) / len(cumulative_variations_selected_prods)
-
-    # 2. Producto con mayor alza/baja (considerando TODOS los productos en FIXED_PRODUCTS que tengan datos en el periodo)
-    product_cumulative_variations = {}
-    # Usar all_products_in_period_scope que ya está filtrado por el periodo presidencial
-    for prod_name in all_products_in_period_scope['producto'].unique():
-        df_prod_full_period = all_products_in_period_scope[all_products_in_period_scope['producto'] == prod_name]
-        if not df_prod_full_period.empty:
-            product_cumulative_variations[prod_name] = calculate_period_cumulative_variation(df_prod_full_period)
-    
-    if product_cumulative_variations:
-        max_prod = max(product_cumulative_variations, key=product_cumulative_variations.get)
-        min_prod = min(product_cumulative_variations, key=product_cumulative_variations.get)
-        kpis["max_increase_product"] = max_prod
-        kpis["max_increase_value"] = product_cumulative_variations[max_prod]
-        kpis["max_decrease_product"] = min_prod
-        kpis["max_decrease_value"] = product_cumulative_variations[min_prod]
-        
-    return kpis
+        fig_bar_tops = None
+        if not combined_tops.empty:
+            colors = [COLOR_ACCENT_DANGER if v < 0 else (COLOR_ACCENT_SUCCESS if v > 0 else COLOR_SECONDARY_TEXT) for v in combined_tops.values]
+            fig_bar_tops = go.Figure(go.Bar(
+                y=combined_tops.index, x=combined_tops.values, orientation='h',
+                marker_color=colors, text=combined_tops.values, texttemplate='%{text:.2f}%', textposition='outside'
+            ))
+            fig_bar_tops.update_layout(
+                xaxis_title="Variación Promedio Mensual (%)", yaxis_title="Producto",
+                height=max(400, len(combined_tops) * 40 + 100), 
+                yaxis_autorange="reversed", paper_bgcolor=COLOR_BACKGROUND_MAIN, plot_bgcolor=COLOR_BACKGROUND_MAIN,
+                font=dict(family=FONT_FAMILY_SANS_SERIF, color=COLOR_PRIMARY_TEXT)
+            )
+        return VariationCharts(fig_line, fig_bar_tops, df_unusual, line_note)
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def build_category_chart(dataset_version: str, ordinals: Tuple[int, ...], categories: Tuple[str, ...], _rollup: pd.DataFrame) -> Optional[go.Figure]:
+    """Índice encadenado (base 100) por categoría sobre los meses elegidos, desde el cubo precalculado."""
+    view = rollup_months(_rollup, ordinals, list(categories))
+    if view.empty: return None
+    view = view.assign(
+        indice_periodo=(1.0 + view["media"] / 100.0).groupby(view["categoria"], observed=True).cumprod() * 100.0,
+        periodo=period_labels(view[PERIOD_COLUMN]),
+    )
+    fig = px.line(
+        view, x="periodo", y="indice_periodo", color=view["categoria"].astype(str),
+        labels={'indice_periodo': 'Índice (base 100)', 'periodo': 'Período', 'color': 'Categoría'},
+        color_discrete_sequence=px.colors.qualitative.Plotly
+    )
+    fig.update_traces(line=dict(width=3), selector=dict(name=BASKET))
+    fig.update_layout(
+        height=450, legend_title_text='Categorías', xaxis_tickangle=-45, xaxis_type='category',
+        hovermode="x unified", paper_bgcolor=COLOR_BACKGROUND_MAIN, plot_bgcolor=COLOR_BACKGROUND_MAIN,
+        font=dict(family=FONT_FAMILY_SANS_SERIF, color=COLOR_PRIMARY_TEXT)
+    )
+    return fig
 
 def generate_years_to_load_from_filters(
     presidency_details: Optional[Dict], 
@@ -431,6 +451,9 @@ def generate_years_to_load_from_filters(
 
 # ====== INICIALIZACIÓN DE LA APP ======
 st.set_page_config(page_title="Monitor Canasta Básica Chile", layout="wide", initial_sidebar_state="expanded")
+# ?perfil=cprofile|pyinstrument perfila este rerun (los que terminan en st.stop() no muestran el reporte)
+profile_kind = st.query_params.get("perfil") if DIAGNOSTICS_ENABLED else None
+rerun_profile = RerunProfile(profile_kind).start() if profile_kind in PROFILE_KINDS else None
 st.markdown(f"<style>{CUSTOM_CSS}</style>", unsafe_allow_html=True)
 
 # --- Encabezado Fijo (Simulado) ---
@@ -517,19 +540,16 @@ with main_placeholder.container():
         # (ya sea por periodo presidencial o multiselect de años)
         
         # Primero, obtener todos los meses únicos de los años que se van a cargar
-        all_possible_months_in_active_load_config = set()
-        temp_df_for_month_extraction = load_data(active_years_to_load_config) # Carga preliminar para meses
-
-        if not temp_df_for_month_extraction.empty:
-            for year_val_str in active_years_to_load_config.keys():
-                if year_val_str in selected_years_str_list: # Solo considerar meses de años realmente seleccionados
-                    df_year_specific = temp_df_for_month_extraction[temp_df_for_month_extraction['year'] == int(year_val_str)]
-                    all_possible_months_in_active_load_config.update(df_year_specific['mes'].unique())
+        all_possible_months_in_active_load_config = set() # Números de mes (1-12)
+        dataset = get_dataset()
+        # Meses con datos, por búsqueda binaria sobre los ordinales del dataset (sin leer filas)
+        for ordinal in dataset.present_months(scope_ordinals(active_years_to_load_config)).tolist():
+            if str(ordinal // 12) in selected_years_str_list: # Solo considerar meses de años realmente seleccionados
+                all_possible_months_in_active_load_config.add(ordinal % 12 + 1)
         
-        ordered_available_months = sorted(
-            list(all_possible_months_in_active_load_config),
-            key=lambda m: list(NUM2MONTH.values()).index(m) if m in NUM2MONTH.values() else -1
-        )
+        ordered_available_months = [
+            NUM2MONTH[f"{mes_num:02d}"] for mes_num in sorted(all_possible_months_in_active_load_config)
+        ]
         selected_months_names = st.sidebar.multiselect(
             "Mes(es)",
             options=ordered_available_months,
@@ -540,40 +560,15 @@ with main_placeholder.container():
         # --- Filtro de Productos por Categoría ---
         st.sidebar.markdown("### Productos", unsafe_allow_html=True)
         
-        # Poblar "Sin Categoría"
-        all_categorized_prods = {prod for cat_prods in PRODUCT_CATEGORIES.values() for prod in cat_prods}
-        PRODUCT_CATEGORIES["Sin Categoría"] = sorted([
-            p for p in FIXED_PRODUCTS if p not in all_categorized_prods
-        ])
-
-        # Categorías activas (con productos presentes en FIXED_PRODUCTS)
-        active_product_categories = {
-            cat: sorted([p for p in prods if p in FIXED_PRODUCTS])
-            for cat, prods in PRODUCT_CATEGORIES.items()
-        }
-        active_product_categories = {cat: prods for cat, prods in active_product_categories.items() if prods}
-        
-        category_multiselect_options = sorted(list(active_product_categories.keys()))
-        default_categories = ["Panadería y Masas", "Lácteos y Huevos"]
-        # Asegurar que las categorías por defecto existan en las opciones
-        valid_default_categories = [cat for cat in default_categories if cat in category_multiselect_options]
-
-
         selected_category_names = st.sidebar.multiselect(
             "Categoría(s) de Producto",
-            category_multiselect_options,
-            default=valid_default_categories,
+            CATEGORY_OPTIONS,
+            default=DEFAULT_CATEGORIES,
             help="Selecciona una o más categorías para filtrar la lista de productos."
         )
 
-        products_for_multiselect = []
-        if not selected_category_names: # Si no se selecciona ninguna categoría, ofrecer todos los productos
-            products_for_multiselect = sorted(FIXED_PRODUCTS)
-        else:
-            for cat_name in selected_category_names:
-                if cat_name in active_product_categories:
-                    products_for_multiselect.extend(active_product_categories[cat_name])
-        products_for_multiselect = sorted(list(set(products_for_multiselect)))
+        # Si no se selecciona ninguna categoría, se ofrecen todos los productos
+        products_for_multiselect = products_for_categories(tuple(selected_category_names))
 
         selected_products = st.sidebar.multiselect(
             "Producto(s) Específico(s)",
@@ -582,6 +577,14 @@ with main_placeholder.container():
             help="Selecciona productos individuales. La lista se basa en las categorías elegidas."
         )
 
+        # --- Capa de Anomalías ---
+        st.sidebar.markdown("### Anomalías", unsafe_allow_html=True)
+        show_anomalies = st.sidebar.checkbox(
+            "Marcar movimientos inusuales",
+            value=False,
+            help=f"Marca los meses en que al menos {ANOMALY_MIN_VOTES} métodos (z-score, umbral absoluto, IsolationForest) coinciden. Los puntajes se precalculan una vez por versión de los datos."
+        )
+
 # --- Carga Principal de Datos (basada en filtros de tiempo) ---
 # Este spinner se mostrará DENTRO del placeholder si la carga es larga.
 with main_placeholder.container():
@@ -591,26 +594,24 @@ with main_placeholder.container():
         st.stop()
 
     with st.spinner(spinner_message):
-        df_data_loaded_scope = load_data(active_years_to_load_config)
+        scope_months = dataset.present_months(scope_ordinals(active_years_to_load_config))
 
 # --- Limpiar Placeholder y Mostrar Contenido ---
 main_placeholder.empty()
 
 
-if df_data_loaded_scope.empty:
+if scope_months.size == 0:
     st.error("⚠️ No se encontraron datos para el rango de tiempo y productos configurados. Verifica la disponibilidad de los PDFs en la fuente o ajusta los filtros.")
     st.stop()
 
-# Aplicar filtros finales de mes y producto al DataFrame cargado para el SCOPE
-df_final_filtered = df_data_loaded_scope.copy()
-if selected_months_names:
-    df_final_filtered = df_final_filtered[df_final_filtered["mes"].isin(selected_months_names)]
-if selected_products:
-    df_final_filtered = df_final_filtered[df_final_filtered["producto"].isin(selected_products)]
-else: # Si no se seleccionan productos explícitamente, mostrar un mensaje en lugar de error o todo
+if not selected_products: # Si no se seleccionan productos explícitamente, mostrar un mensaje en lugar de error o todo
     st.info("ℹ️ Por favor, selecciona al menos un producto en la barra lateral para visualizar los datos.")
     st.stop()
 
+# Filtros finales de mes y producto en un solo paso sobre la vista del scope: sólo se copian las filas
+# que pasan (sin filtros que descarten filas, la vista mapeada se usa tal cual)
+df_final_filtered = dataset.filter(scope_months, selected_products, selected_months_names or None)
+
 
 # ====== SECCIÓN DE KPIs PRESIDENCIALES ======
 if active_presidency_details: # Solo mostrar si se ha seleccionado un periodo presidencial específico
@@ -618,8 +619,11 @@ if active_presidency_details: # Solo mostrar si se ha seleccionado un periodo pr
     st.markdown(f"<h2>Análisis del Periodo Presidencial: {selected_presidential_period_name}</h2>", unsafe_allow_html=True)
     
     # Para los KPIs de min/max producto, necesitamos todos los datos del periodo presidencial, no solo los filtrados por producto en la sidebar.
-    # df_data_loaded_scope ya contiene los datos del periodo presidencial.
-    presidency_kpis = get_presidential_kpis(df_final_filtered, df_data_loaded_scope, selected_products)
+    # El periodo presidencial es un rango contiguo de meses: dataset.months lo entrega como vista sin copia.
+    with current_metrics().timer("kpis"):
+        presidency_kpis = get_presidential_kpis(
+            df_final_filtered, dataset.months(scope_months), selected_products, dataset.cumulative_index
+        )
 
     kpi_cols = st.columns(3)
     with kpi_cols[0]:
@@ -667,22 +671,20 @@ if not df_final_filtered.empty:
 
     if int(current_year_str_kpi) in selected_years_int_list:
         st.markdown(f"<h2>Resumen Año en Curso ({current_year_str_kpi})</h2>", unsafe_allow_html=True)
-        df_current_year_for_kpi_source = df_data_loaded_scope[ # Usar datos del scope cargado
-            (df_data_loaded_scope['year'] == int(current_year_str_kpi)) &
-            (df_data_loaded_scope['producto'].isin(selected_products))
-        ]
+        df_current_year_for_kpi_source = dataset.filter( # Meses del año en curso dentro del scope cargado
+            scope_months[scope_months // 12 == int(current_year_str_kpi)], selected_products
+        )
         
-        cumulative_variations_calc = []
         if not df_current_year_for_kpi_source.empty:
-            for prod_name_kpi in df_current_year_for_kpi_source['producto'].unique():
-                df_single_prod_curr_year = df_current_year_for_kpi_source[df_current_year_for_kpi_source['producto'] == prod_name_kpi]
-                if not df_single_prod_curr_year.empty:
-                    # Necesitamos una función que calcule la variación acumulada para un solo año.
-                    # Reutilizamos calculate_period_cumulative_variation, que funciona bien para un solo año también.
-                    cum_var = calculate_period_cumulative_variation(df_single_prod_curr_year)
-                    cumulative_variations_calc.append(cum_var)
-            if cumulative_variations_calc:
-                avg_cumulative_variation_year = sum(cumulative_variations_calc) / len(cumulative_variations_calc)
+            # Variación acumulada del año por producto, consultando el índice de prefijos
+            cumulative_variations_calc = dataset.cumulative_index.over_months(
+                months_in(df_current_year_for_kpi_source)
+            )
+            cumulative_variations_calc = cumulative_variations_calc[
+                cumulative_variations_calc.index.isin(selected_products)
+            ].dropna()
+            if not cumulative_variations_calc.empty:
+                avg_cumulative_variation_year = cumulative_variations_calc.mean()
                 st.metric(
                     label=f"Variación Acumulada Promedio {current_year_str_kpi} (Prod. Seleccionados)",
                     value=f"{avg_cumulative_variation_year:.2f}%",
@@ -695,65 +697,58 @@ if not df_final_filtered.empty:
         st.markdown("---")
 
     # --- Preparación de Periodo para Gráficos ---
-    df_final_filtered["periodo"] = df_final_filtered["year"].astype(str) + " " + df_final_filtered["mes"]
-    
-    # Ordenar periodos para el gráfico
-    # Usar todos los periodos posibles del df_data_loaded_scope como base para el orden global
-    df_scope_copy = df_data_loaded_scope.copy()
-    df_scope_copy['periodo_temp'] = df_scope_copy['year'].astype(str) + " " + df_scope_copy['mes']
-    all_periods_in_scope_ordered = sorted(
-        df_scope_copy["periodo_temp"].unique(),
-        key=lambda x: (int(x.split()[0]), list(NUM2MONTH.values()).index(x.split()[1]))
-    )
-    actual_periods_in_final_filtered = df_final_filtered["periodo"].unique()
-    ordered_periods_for_chart = [p for p in all_periods_in_scope_ordered if p in actual_periods_in_final_filtered]
+    # Los periodos se ordenan y pivotean por su ordinal entero; la etiqueta "2024 Enero" es sólo para mostrar
+    ordinals_in_final_filtered = np.unique(df_final_filtered[PERIOD_COLUMN].to_numpy())
+    ordered_periods_for_chart = period_labels(ordinals_in_final_filtered)
 
     if ordered_periods_for_chart:
-        df_final_filtered["periodo"] = pd.Categorical(
-            df_final_filtered["periodo"], categories=ordered_periods_for_chart, ordered=True
+        df_final_filtered["periodo"] = pd.Categorical.from_codes(
+            np.searchsorted(ordinals_in_final_filtered, df_final_filtered[PERIOD_COLUMN].to_numpy()),
+            categories=ordered_periods_for_chart, ordered=True
         )
 
         st.markdown("<h2>Análisis de Variaciones Mensuales</h2>", unsafe_allow_html=True)
         # st.subheader("Variación Porcentual Mensual por Producto")
-        monthly_pivot = df_final_filtered.pivot_table(
-            index="periodo", columns="producto", values="variacion", aggfunc="mean"
+        # Un rerun con los mismos filtros (p. ej. abrir el expander de datos) reutiliza los gráficos ya armados
+        current_metrics().count("graficos_solicitados")
+        charts = build_variation_charts(
+            filter_cache_key(dataset.version, active_years_to_load_config, selected_months_names, selected_products, show_anomalies),
+            df_final_filtered, dataset.anomaly_scores if show_anomalies else None
         )
-        monthly_pivot = monthly_pivot.reindex(ordered_periods_for_chart).dropna(how='all', axis=0)
+        df_unusual = charts.df_unusual
 
-        if not monthly_pivot.empty:
-            fig_line = px.line(
-                monthly_pivot, x=monthly_pivot.index.astype(str), y=monthly_pivot.columns,
-                labels={'value': 'Variación (%)', 'periodo': 'Período', 'producto': 'Producto'},
-                color_discrete_sequence=px.colors.qualitative.Plotly # Paleta de colores
-            )
-            fig_line.update_layout(
-                height=500, legend_title_text='Productos', xaxis_tickangle=-45, 
-                hovermode="x unified", paper_bgcolor=COLOR_BACKGROUND_MAIN, plot_bgcolor=COLOR_BACKGROUND_MAIN,
-                font=dict(family=FONT_FAMILY_SANS_SERIF, color=COLOR_PRIMARY_TEXT)
-            )
-            st.plotly_chart(fig_line, use_container_width=True)
+        if charts.fig_line is not None:
+            st.plotly_chart(charts.fig_line, use_container_width=True)
+            if charts.line_note: st.caption(charts.line_note)
         else:
             st.info("No hay datos suficientes para mostrar el gráfico de líneas con los filtros actuales.")
 
-        st.markdown("<h3>Top 5 Alzas y Bajas (Promedio en Período Seleccionado)</h3>", unsafe_allow_html=True)
-        avg_variation_per_product = df_final_filtered.groupby('producto')['variacion'].mean().sort_values()
-        top_increases = avg_variation_per_product[avg_variation_per_product > 0].nlargest(5).sort_values(ascending=False)
-        top_decreases = avg_variation_per_product[avg_variation_per_product <= 0].nsmallest(5).sort_values(ascending=True)
-        combined_tops = pd.concat([top_decreases, top_increases.iloc[::-1]] ).sort_values()
+        if show_anomalies:
+            st.markdown("<h3>⚠️ Movimientos Inusuales</h3>", unsafe_allow_html=True)
+            if not df_unusual.empty:
+                flag_labels = pd.Series([ANOMALY_LABELS[f] + ", " for f in ANOMALY_FLAGS], index=ANOMALY_FLAGS)
+                df_unusual_display = df_unusual.sort_values("if_score").assign(
+                    metodos=(df_unusual[ANOMALY_FLAGS] @ flag_labels).str.rstrip(", ")
+                )
+                st.dataframe(
+                    df_unusual_display[["periodo", "producto", "variacion", "z_score", "rolling_z", "metodos"]],
+                    column_config={
+                        "periodo": "Período", "producto": "Producto",
+                        "variacion": st.column_config.NumberColumn("Variación (%)", format="%.2f"),
+                        "z_score": st.column_config.NumberColumn("Z-score", format="%.2f"),
+                        "rolling_z": st.column_config.NumberColumn("Z vs. 12 meses previos", format="%.2f"),
+                        "metodos": "Métodos",
+                    },
+                    use_container_width=True,
+                    hide_index=True
+                )
+                st.caption("Ordenados del más al menos anómalo según IsolationForest.")
+            else:
+                st.info("No se detectaron movimientos inusuales con los filtros actuales.")
 
-        if not combined_tops.empty:
-            colors = [COLOR_ACCENT_DANGER if v < 0 else (COLOR_ACCENT_SUCCESS if v > 0 else COLOR_SECONDARY_TEXT) for v in combined_tops.values]
-            fig_bar_tops = go.Figure(go.Bar(
-                y=combined_tops.index, x=combined_tops.values, orientation='h',
-                marker_color=colors, text=combined_tops.values, texttemplate='%{text:.2f}%', textposition='outside'
-            ))
-            fig_bar_tops.update_layout(
-                xaxis_title="Variación Promedio Mensual (%)", yaxis_title="Producto",
-                height=max(400, len(combined_tops) * 40 + 100), 
-                yaxis_autorange="reversed", paper_bgcolor=COLOR_BACKGROUND_MAIN, plot_bgcolor=COLOR_BACKGROUND_MAIN,
-                font=dict(family=FONT_FAMILY_SANS_SERIF, color=COLOR_PRIMARY_TEXT)
-            )
-            st.plotly_chart(fig_bar_tops, use_container_width=True)
+        st.markdown("<h3>Top 5 Alzas y Bajas (Promedio en Período Seleccionado)</h3>", unsafe_allow_html=True)
+        if charts.fig_bar_tops is not None:
+            st.plotly_chart(charts.fig_bar_tops, use_container_width=True)
         else:
             st.info("No hay suficientes datos para mostrar el top de alzas y bajas con los filtros actuales.")
 
@@ -771,16 +766,47 @@ if not df_final_filtered.empty:
             st.markdown(f"<p class='interpretation-text'>- <b>Mayor baja mensual puntual</b> registrada: <i>{row_min_variation['producto']}</i> con <b>{row_min_variation['variacion']:.2f}%</b> en {row_min_variation['periodo']}.</p>", unsafe_allow_html=True)
         else:
             st.markdown("<p class='interpretation-text'>- No hay datos de variación disponibles para calcular interpretaciones con los filtros actuales.</p>", unsafe_allow_html=True)
+
+        # --- Categorías y canasta completa: cubo precalculado por versión del dataset (sin agrupar filas) ---
+        st.markdown("<h3>🧺 Análisis por Categoría</h3>", unsafe_allow_html=True)
+        chart_categories = tuple(selected_category_names or CATEGORY_OPTIONS) + (BASKET,)
+        chart_ordinals = tuple(int(o) for o in ordinals_in_final_filtered)
+        with current_metrics().timer("categorias"):
+            category_variations = category_cumulative(
+                rollup_months(dataset.rollup, chart_ordinals, list(chart_categories))
+            ).dropna()
+            fig_categories = build_category_chart(dataset.version, chart_ordinals, chart_categories, dataset.rollup)
+        by_category = category_variations.drop(BASKET, errors="ignore")
+        if BASKET in category_variations.index:
+            category_cols = st.columns(3)
+            with category_cols[0]:
+                st.metric(
+                    label="Var. Acumulada Canasta Completa",
+                    value=f"{category_variations[BASKET]:.2f}%",
+                    help="Índice encadenado de la variación mensual promedio de todos los productos monitoreados, en los meses filtrados."
+                )
+            if not by_category.empty:
+                with category_cols[1]:
+                    st.metric(label="Categoría con Mayor Alza", value=by_category.idxmax(),
+                              delta=f"{by_category.max():.2f}%", delta_color="inverse")
+                with category_cols[2]:
+                    st.metric(label="Categoría con Menor Alza", value=by_category.idxmin(),
+                              delta=f"{by_category.min():.2f}%", delta_color="inverse")
+        if fig_categories is not None:
+            st.plotly_chart(fig_categories, use_container_width=True)
+            st.caption("Cada categoría encadena la variación mensual promedio de sus productos (base 100 en el primer mes filtrado); la línea gruesa es la canasta completa.")
+        else:
+            st.info("No hay datos por categoría para los meses filtrados.")
     else:
         st.info("ℹ️ No hay datos de período para mostrar después de aplicar todos los filtros. Intenta ampliar el rango de fechas o la selección de productos.")
         
     with st.expander("📄 Ver Datos Detallados Filtrados", expanded=False):
         cols_to_show = ["year", "mes", "producto", "variacion"]
-        df_display_detailed = df_final_filtered.copy()
-        if "periodo" in df_display_detailed.columns:
-             df_display_detailed = df_display_detailed.sort_values(["periodo", "producto"])
+        # sort_values ya arma un frame nuevo con sólo las filas filtradas
+        if "periodo" in df_final_filtered.columns:
+             df_display_detailed = df_final_filtered.sort_values([PERIOD_COLUMN, "producto"])
         else: # Ordenar por año y mes_num si 'periodo' no está (debería estar)
-            df_display_detailed = df_display_detailed.sort_values(['year', 'mes_num', 'producto'])
+            df_display_detailed = df_final_filtered.sort_values(['year', 'mes_num', 'producto'])
 
         st.dataframe(
             df_display_detailed[cols_to_show],
@@ -805,3 +831,29 @@ st.markdown(f"""
 
 st.sidebar.markdown("---")
 st.sidebar.info("Los datos se actualizan según la disponibilidad en la fuente oficial. La primera carga puede ser más lenta.")
+
+# --- Diagnóstico (?admin=1, con CBA_DIAGNOSTICO=1) ---
+if DIAGNOSTICS_ENABLED and st.query_params.get("admin"):
+    with st.sidebar.expander("🛠️ Diagnóstico", expanded=False):
+        snapshot = METRICS.snapshot()
+        st.caption("Acumulado del proceso desde su arranque (todas las sesiones).")
+        st.markdown("**Etapas**")
+        st.dataframe(pd.DataFrame(
+            [
+                {"etapa": stage, "n": n, "total ms": round(total * 1000, 1),
+                 "media ms": round(total * 1000 / max(n, 1), 2), "máx ms": round(peak * 1000, 1)}
+                for stage, (n, total, peak) in sorted(snapshot["timings"].items())
+            ],
+            columns=["etapa", "n", "total ms", "media ms", "máx ms"]
+        ), hide_index=True, use_container_width=True)
+        st.markdown("**Contadores**")
+        st.json(dict(sorted(snapshot["counters"].items())), expanded=False)
+        st.markdown(f"**Fallas recientes** ({len(snapshot['failures'])})")
+        if snapshot["failures"]:
+            st.dataframe(pd.DataFrame(list(snapshot["failures"].items()), columns=["clave", "motivo"]), hide_index=True, use_container_width=True)
+        st.markdown("**Caché de PDFs**")
+        st.json(get_pdf_fetcher().cache.stats(), expanded=False)
+
+if rerun_profile is not None:
+    with st.expander(f"⏱️ Perfil de este rerun ({rerun_profile.kind})", expanded=True):
+        st.code(rerun_profile.stop(), language="text")